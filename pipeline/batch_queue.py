@@ -1,24 +1,186 @@
 import os, json, glob, time, uuid
-from pipeline.utils import log
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from pipeline import prepare
+from pipeline.utils import log, naming
+from pipeline.utils.hints import determine_capsule, load_rules
+from pipeline.utils.images import estimate_request_tokens
+
+
+def _sku_images(ready, sku):
+    folder = os.path.join(ready, sku)
+    imgs = sorted(glob.glob(os.path.join(folder, f"{sku}_*." + "*")))
+    return [os.path.basename(p) for p in imgs]
+
+
+def _batch_code(sku):
+    try:
+        return naming.parse_sku(sku)['batch_code']
+    except ValueError:
+        return ''
+
+
+def estimate_sku(folder: Path, images: List[str], config: Dict[str, Any], rules_tokens: int = 0) -> Dict[str, int]:
+    """Expected bytes read and request tokens for one SKU at post time.
+
+    Bytes are the prepared derivative's size when ``pair --prepare`` left a
+    current one, otherwise the scan itself (it will be decoded and
+    resized). Tokens cover every image at ``image_max_edge`` plus the rules
+    and the SKU's hint capsule.
+    """
+
+    max_edge = int(config.get('image_max_edge', 1024)) if config.get('compress_images', True) else None
+    total_bytes = tokens = 0
+    for name in images:
+        src = folder / name
+        try:
+            derivative = prepare.lookup(src, max_edge, config) if max_edge else None
+            total_bytes += (derivative or src).stat().st_size
+            tokens += estimate_request_tokens(derivative or src, max_edge)
+        except (OSError, ValueError):
+            continue
+    try:
+        capsule = determine_capsule(folder.name)
+    except ValueError:
+        # Not a SKU folder: queue it like the unbudgeted path does, without a capsule.
+        capsule = {}
+    tokens += rules_tokens + len(json.dumps(capsule, ensure_ascii=False)) // 4
+    return {'bytes': total_bytes, 'tokens': tokens}
+
+
+def _fits(batch, extra, max_bytes, max_tokens, max_count):
+    """Whether ``extra`` (an item's ``est`` plus a ``count``) fits on top of ``batch``."""
+
+    if not batch['items']:
+        return True
+    if max_count and len(batch['items']) + extra['count'] > max_count:
+        return False
+    if max_bytes and batch['bytes'] + extra['bytes'] > max_bytes:
+        return False
+    if max_tokens and batch['tokens'] + extra['tokens'] > max_tokens:
+        return False
+    return True
+
+
+def _add(batch, item):
+    batch['items'].append(item)
+    batch['bytes'] += item['est']['bytes']
+    batch['tokens'] += item['est']['tokens']
+
+
+def _new_batch():
+    return {'items': [], 'bytes': 0, 'tokens': 0}
+
+
+def pack_budgeted(
+    items: List[Dict[str, Any]],
+    max_bytes: Optional[int] = None,
+    max_tokens: Optional[int] = None,
+    max_count: Optional[int] = None,
+) -> List[List[Dict[str, Any]]]:
+    """Pack estimated items into batches that stay under every given budget.
+
+    Each batch code is packed on its own, in SKU order, so full batches share
+    one code (and its hint capsule and exemplars). Only the part-filled last
+    batch of each code is merged with others, largest first, wherever it
+    still fits. An item over budget on its own gets a batch to itself.
+    """
+
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for item in sorted(items, key=lambda item: item['sku']):
+        groups.setdefault(_batch_code(item['sku']), []).append(item)
+
+    full, tails = [], []
+    for code in sorted(groups):
+        batch = _new_batch()
+        chunks = []
+        for item in groups[code]:
+            if (max_bytes and item['est']['bytes'] > max_bytes) or (max_tokens and item['est']['tokens'] > max_tokens):
+                single = _new_batch()
+                _add(single, item)
+                full.append(single)
+                continue
+            if not _fits(batch, dict(item['est'], count=1), max_bytes, max_tokens, max_count):
+                chunks.append(batch)
+                batch = _new_batch()
+            _add(batch, item)
+        if batch['items']:
+            chunks.append(batch)
+        full.extend(chunks[:-1])
+        tails.extend(chunks[-1:])
+
+    merged: List[Dict[str, Any]] = []
+    for tail in sorted(tails, key=lambda batch: (-batch['tokens'], -batch['bytes'], batch['items'][0]['sku'])):
+        extra = {'count': len(tail['items']), 'bytes': tail['bytes'], 'tokens': tail['tokens']}
+        for batch in merged:
+            if _fits(batch, extra, max_bytes, max_tokens, max_count):
+                for item in tail['items']:
+                    _add(batch, item)
+                break
+        else:
+            merged.append(tail)
+
+    batches = full + merged
+    batches.sort(key=lambda batch: batch['items'][0]['sku'])
+    return [batch['items'] for batch in batches]
+
+
+def _write_batch(out, payload, **fields):
+    job_id = f'batch_{int(time.time())}_{uuid.uuid4().hex[:8]}'
+    with open(os.path.join(out, job_id+'.jsonl'),'w',encoding='utf-8') as f:
+        for item in payload:
+            f.write(json.dumps(item)+'\n')
+    log.event('queue', None, job_id=job_id, count=len(payload), **fields)
+    return job_id
+
+
+def build_batches(
+    ready='Scans_Ready',
+    out='pipeline/output/batches',
+    batch_size=20,
+    max_bytes=None,
+    max_tokens=None,
+    config=None,
+):
+    """Write batch files from ``ready`` and return their job ids.
+
+    Without a budget, sorted SKUs are cut into groups of ``batch_size``.
+    With ``max_bytes`` and/or ``max_tokens`` every SKU is estimated with
+    :func:`estimate_sku` and packed by :func:`pack_budgeted`, with
+    ``batch_size`` (if given) as an extra cap on cards per batch; each line
+    then carries its estimate under ``est``.
+    """
 
-def build_batches(ready='Scans_Ready', out='pipeline/output/batches', batch_size=20):
     os.makedirs(out, exist_ok=True)
     skus = [d for d in os.listdir(ready) if os.path.isdir(os.path.join(ready,d))]
     skus.sort()
     batches = []
-    for i in range(0, len(skus), batch_size):
-        batch = skus[i:i+batch_size]
-        if not batch: 
-            continue
-        job_id = f'batch_{int(time.time())}_{uuid.uuid4().hex[:8]}'
-        payload = []
-        for sku in batch:
-            folder = os.path.join(ready, sku)
-            imgs = sorted(glob.glob(os.path.join(folder, f"{sku}_*." + "*")))
-            payload.append({'sku': sku, 'images': [os.path.basename(p) for p in imgs]})
-        with open(os.path.join(out, job_id+'.jsonl'),'w',encoding='utf-8') as f:
-            for item in payload:
-                f.write(json.dumps(item)+'\n')
-        batches.append(job_id)
-        log.event('queue', None, job_id=job_id, count=len(payload))
+    if not max_bytes and not max_tokens:
+        batch_size = batch_size or 20
+        for i in range(0, len(skus), batch_size):
+            batch = skus[i:i+batch_size]
+            if not batch:
+                continue
+            payload = [{'sku': sku, 'images': _sku_images(ready, sku)} for sku in batch]
+            batches.append(_write_batch(out, payload))
+        return batches
+
+    config = config or {}
+    rules_tokens = len(load_rules()) // 4
+    items = []
+    for sku in skus:
+        images = _sku_images(ready, sku)
+        est = estimate_sku(Path(ready) / sku, images, config, rules_tokens)
+        items.append({'sku': sku, 'images': images, 'est': est})
+    for payload in pack_budgeted(items, max_bytes, max_tokens, batch_size):
+        batches.append(
+            _write_batch(
+                out,
+                payload,
+                bytes=sum(item['est']['bytes'] for item in payload),
+                tokens=sum(item['est']['tokens'] for item in payload),
+                codes=sorted({_batch_code(item['sku']) for item in payload}),
+            )
+        )
     return batches
@@ -1,4 +1,7 @@
 """Model provider adapters for the post-processing step."""
 from .provider_gpt5_vision import analyze_card as analyze_with_gpt5
+from .provider_gpt5_vision import analyze_cards as analyze_cards_with_gpt5
+from .provider_gpt5_vision import analyze_fields as analyze_fields_with_gpt5
+from .provider_gpt5_vision import PreparedPayload
 
-__all__ = ["analyze_with_gpt5"]
+__all__ = ["analyze_with_gpt5", "analyze_cards_with_gpt5", "analyze_fields_with_gpt5", "PreparedPayload"]
@@ -6,11 +6,16 @@ import json
 import logging
 import os
 import random
+import threading
 import time
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 from openai import OpenAI
 
+from pipeline.schemas import compact as compact_schema
+from pipeline.schemas.card_record import CardRecord
+from pipeline.utils.jsonstream import InvalidStreamOutput, StreamingJSONChecker
+
 try:  # pragma: no cover - optional exception imports
     from openai import APIStatusError, RateLimitError
 except ImportError:  # pragma: no cover - fallback for older SDKs
@@ -26,6 +31,20 @@ DEFAULT_TIMEOUT = 45
 MAX_ATTEMPTS = 4
 RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
 TELEMETRY_SAMPLE_RATE = int(os.getenv("PIPELINE_TELEMETRY_SAMPLE", "20") or 20)
+USAGE_KEY = "_usage"
+TIMING_KEY = "_timing"
+STREAM_ATTEMPTS = 2
+STREAM_KEYS = tuple(CardRecord.model_fields)
+PACKED_RULES = (
+    "Several cards follow, each introduced by its sku. Return a JSON array with "
+    "one object per card, in the same order, each including its sku."
+)
+FOLLOWUP_MAX_TOKENS = 120
+FOLLOWUP_RULES = (
+    "You are a card cataloger. Read only the requested fields from the image. "
+    "Return one JSON object with exactly these keys: {keys}. Use null for any "
+    "field that is not visible; conf is 0.0-1.0 for the fields returned."
+)
 
 LOGGER = logging.getLogger(__name__)
 
@@ -34,6 +53,10 @@ class MissingAPIKey(RuntimeError):
     """Raised when the AG5 API key cannot be located."""
 
 
+class DeadlineExceeded(TimeoutError):
+    """Raised when a call's deadline passes or its caller cancels it."""
+
+
 def _load_rules_text(hints: Dict[str, Any]) -> str:
     rules = hints.get("rules")
     if isinstance(rules, str) and rules.strip():
@@ -59,6 +82,71 @@ def _encode_image(path: str) -> Dict[str, Any]:
     }
 
 
+class PreparedPayload:
+    """Encoded image parts and static prompt sections for one SKU.
+
+    Every call for the SKU (first pass, escalation, nudge and follow-up
+    retries) pulls its parts from here, so each image file is read and
+    base64-encoded once and the rules and few-shot blocks are built once.
+    Pass it as ``hints["prepared"]`` and :meth:`release` it when the SKU is done.
+    """
+
+    def __init__(self) -> None:
+        self._images: Dict[str, Dict[str, Any]] = {}
+        self._texts: Dict[Any, Any] = {}
+
+    def image(self, path: str) -> Dict[str, Any]:
+        part = self._images.get(path)
+        if part is None:
+            part = self._images[path] = _encode_image(path)
+        return part
+
+    def rules(self, hints: Dict[str, Any]) -> str:
+        key = ("rules", hints.get("rules"), hints.get("rules_path"))
+        if key not in self._texts:
+            self._texts[key] = _load_rules_text(hints)
+        return self._texts[key]
+
+    def context(self, capsule_text: str, exemplars: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """``Hints`` and ``Few-shot`` text parts for the capsule and exemplars."""
+
+        examples = [_summarise_example(example) for example in exemplars[:2]]
+        key = ("context", capsule_text, tuple(examples))
+        parts = self._texts.get(key)
+        if parts is None:
+            parts = [{"type": "text", "text": f"Hints: {capsule_text}"}]
+            if examples:
+                parts.append({"type": "text", "text": "Few-shot:"})
+                parts.extend({"type": "text", "text": text} for text in examples)
+            self._texts[key] = parts
+        return list(parts)
+
+    def release(self) -> None:
+        self._images.clear()
+        self._texts.clear()
+
+
+def _prepared(hints: Dict[str, Any]) -> PreparedPayload:
+    prepared = hints.get("prepared")
+    return prepared if isinstance(prepared, PreparedPayload) else PreparedPayload()
+
+
+def _image_label(front_path: str, back_path: Optional[str], hints: Dict[str, Any]) -> str:
+    """Describe the attached image parts.
+
+    ``hints["back_label"]`` renames the second image (e.g. a number-region
+    crop); ``hints["composite"]`` marks a single front/back composite.
+    """
+
+    front_name = os.path.basename(front_path)
+    if back_path:
+        back_label = hints.get("back_label") or "back"
+        return f"Images: front={front_name}, {back_label}={os.path.basename(back_path)}"
+    if hints.get("composite"):
+        return "Image: one composite, left half=front, right half=back"
+    return f"Image: front={front_name} only; the back matches a known template (see hints)"
+
+
 def _summarise_example(example: Dict[str, Any]) -> str:
     body = {
         "input": example.get("input", ""),
@@ -67,15 +155,18 @@ def _summarise_example(example: Dict[str, Any]) -> str:
     return json.dumps(body, separators=(",", ":"))
 
 
-def analyze_card(front_path: str, back_path: str, hints: Dict[str, Any]) -> Dict[str, Any]:
+def analyze_card(front_path: str, back_path: Optional[str], hints: Dict[str, Any]) -> Dict[str, Any]:
     """Run the GPT-5 Vision model and return a JSON dictionary.
 
     Parameters
     ----------
     front_path: str
-        Path to the prepared (compressed) front image.
-    back_path: str
-        Path to the prepared (compressed) back image.
+        Path to the prepared (compressed) front image, or to a composite with
+        the front on the left and the back on the right.
+    back_path: Optional[str]
+        Path to the prepared (compressed) back image, or a crop of it when
+        ``back_label`` is set; ``None`` when ``front_path`` is a composite or
+        the back was omitted because it matched a known template.
     hints: Dict[str, Any]
         Metadata required to assemble the prompt. Expected keys include:
         - sku: card identifier
@@ -86,47 +177,47 @@ def analyze_card(front_path: str, back_path: str, hints: Dict[str, Any]) -> Dict
         - token_limit: optional maximum output token budget
         - model_name: override model name
         - nudge: optional retry nudge string
+        - composite: front_path is a front/back composite
+        - back_label: label for a cropped back image
+        - prepared: :class:`PreparedPayload` shared by the SKU's calls
+        - deadline: ``time.monotonic()`` value by which the call must finish
+        - cancel: ``threading.Event`` set by the caller to abandon the call
+        - stream: consume the response as a stream and validate it as it
+          arrives (see :func:`_stream_json`)
+        - compact: request the short-key strict-schema format from
+          :mod:`pipeline.schemas.compact`; the answer is expanded before return
 
     Returns
     -------
     Dict[str, Any]
-        Parsed JSON response from the model.
+        Parsed JSON response from the model. When the API reports token
+        usage it is attached under ``USAGE_KEY``; streamed calls also carry
+        ``TIMING_KEY`` with ``ttft_s``, ``generation_s`` and ``aborted``.
     """
 
-    api_key = os.getenv("AG5_API_KEY")
-    if not api_key:
-        raise MissingAPIKey(
-            "AG5_API_KEY is not set. Populate it in your .env or environment."
-        )
-
-    client = OpenAI(api_key=api_key)
-    model_name = hints.get("model_name") or os.getenv("MODEL_NAME") or DEFAULT_MODEL_NAME
+    client = _make_client()
+    model_name = _model_name(hints)
     max_tokens = int(hints.get("token_limit") or os.getenv("TOKEN_LIMIT") or 900)
-    timeout = int(hints.get("timeout") or os.getenv("PIPELINE_REQUEST_TIMEOUT", DEFAULT_TIMEOUT))
+    timeout = _request_timeout(hints)
 
+    prepared = _prepared(hints)
     capsule = hints.get("capsule") or {}
     capsule_text = json.dumps(capsule, ensure_ascii=False, separators=(",", ":"))
     exemplars: List[Dict[str, Any]] = hints.get("exemplars") or []
     sku = hints.get("sku", "")
-    rules_text = _load_rules_text(hints)
-
-    user_content: List[Dict[str, Any]] = []
-    user_content.append({"type": "text", "text": f"Hints: {capsule_text}"})
-    if exemplars:
-        user_content.append({"type": "text", "text": "Few-shot:"})
-        for example in exemplars[:2]:
-            user_content.append({"type": "text", "text": _summarise_example(example)})
+    compact = bool(hints.get("compact"))
+    rules_text = prepared.rules(hints)
+    if compact:
+        rules_text = f"{rules_text}\n{compact_schema.RULES}"
+
+    user_content = prepared.context(capsule_text, exemplars)
     nudge = hints.get("nudge")
     if nudge:
         user_content.append({"type": "text", "text": f"Nudge: {nudge}"})
-    user_content.append(
-        {
-            "type": "text",
-            "text": f"Images: front={os.path.basename(front_path)}, back={os.path.basename(back_path)}; sku={sku}",
-        }
-    )
-    user_content.append(_encode_image(front_path))
-    user_content.append(_encode_image(back_path))
+    user_content.append({"type": "text", "text": f"{_image_label(front_path, back_path, hints)}; sku={sku}"})
+    user_content.append(prepared.image(front_path))
+    if back_path:
+        user_content.append(prepared.image(back_path))
 
     if TELEMETRY_SAMPLE_RATE > 0 and random.randint(1, TELEMETRY_SAMPLE_RATE) == 1:
         LOGGER.info(
@@ -136,38 +227,232 @@ def analyze_card(front_path: str, back_path: str, hints: Dict[str, Any]) -> Dict
             len(capsule_text),
         )
 
-    def _send_request() -> Dict[str, Any]:
-        response = client.responses.create(
-            model=model_name,
-            input=[
-                {
-                    "role": "system",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": rules_text,
-                        }
-                    ],
-                },
-                {
-                    "role": "user",
-                    "content": user_content,
-                },
-            ],
-            temperature=0.1,
-            max_output_tokens=max_tokens,
-            timeout=timeout,
+    request = {
+        "model": model_name,
+        "input": [
+            {
+                "role": "system",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": rules_text,
+                    }
+                ],
+            },
+            {
+                "role": "user",
+                "content": user_content,
+            },
+        ],
+        "temperature": 0.1,
+        "max_output_tokens": max_tokens,
+        "timeout": timeout,
+    }
+    if compact:
+        request["text"] = {"format": compact_schema.RESPONSE_FORMAT}
+    if hints.get("stream"):
+        keys = compact_schema.KEYS if compact else STREAM_KEYS
+        data = _stream_json(client, request, *_deadline_of(hints), allowed_keys=keys)
+    else:
+        data = _parse_json_output(_send_with_retries(client, request, *_deadline_of(hints)))
+    return compact_schema.expand(data, sku) if compact else data
+
+
+def analyze_fields(image_path: str, hints: Dict[str, Any], fields: Sequence[str]) -> Dict[str, Any]:
+    """Ask the model for a few specific fields from a single image.
+
+    Used as a targeted follow-up when the first pass left ``fields`` empty or
+    came back with low confidence. Only one image, the known context and a
+    minimal output schema are sent, so the call is much smaller than a full
+    re-analysis.
+
+    Parameters
+    ----------
+    image_path: str
+        Path to the prepared image most likely to show the fields.
+    hints: Dict[str, Any]
+        Same hint dictionary as :func:`analyze_card`. ``known`` may hold the
+        fields already extracted by the first pass.
+    fields: Sequence[str]
+        Field names to request, e.g. ``("year", "num")``.
+
+    Returns
+    -------
+    Dict[str, Any]
+        Parsed JSON containing the requested fields and ``conf``.
+    """
+
+    if not fields:
+        raise ValueError("analyze_fields requires at least one field")
+    client = _make_client()
+    model_name = _model_name(hints)
+    timeout = _request_timeout(hints)
+    keys = ", ".join(list(fields) + ["conf"])
+    known = hints.get("known") or {}
+    known_text = json.dumps(known, ensure_ascii=False, separators=(",", ":"))
+    sku = hints.get("sku", "")
+
+    user_content: List[Dict[str, Any]] = [
+        {"type": "text", "text": f"Known: {known_text}"},
+        {"type": "text", "text": f"Read {', '.join(fields)} from the image; sku={sku}"},
+    ]
+    nudge = hints.get("nudge")
+    if nudge:
+        user_content.append({"type": "text", "text": f"Nudge: {nudge}"})
+    user_content.append(_prepared(hints).image(image_path))
+
+    request = {
+        "model": model_name,
+        "input": [
+            {
+                "role": "system",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": FOLLOWUP_RULES.format(keys=keys),
+                    }
+                ],
+            },
+            {
+                "role": "user",
+                "content": user_content,
+            },
+        ],
+        "temperature": 0.1,
+        "max_output_tokens": FOLLOWUP_MAX_TOKENS,
+        "timeout": timeout,
+    }
+    response = _send_with_retries(client, request, *_deadline_of(hints))
+    return _parse_json_output(response)
+
+
+def analyze_cards(cards: Sequence[Dict[str, Any]], hints: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Analyse several cards in one request and return one record per card.
+
+    The rules, hint capsule and exemplars are sent once for the whole group,
+    so their tokens are shared by every card in it.
+
+    Parameters
+    ----------
+    cards: Sequence[Dict[str, Any]]
+        One entry per card with ``sku``, ``front_path`` and ``back_path``
+        (``back_path`` may be ``None``), plus the optional ``composite``,
+        ``back_label`` and ``prepared`` entries described for :func:`analyze_card`.
+    hints: Dict[str, Any]
+        Shared hints, as for :func:`analyze_card`. ``token_limit`` is the
+        per-card budget and is scaled by the number of cards.
+
+    Returns
+    -------
+    List[Dict[str, Any]]
+        The records the model returned; callers must match them to cards by
+        ``sku`` and validate each one.
+    """
+
+    client = _make_client()
+    model_name = _model_name(hints)
+    max_tokens = int(hints.get("token_limit") or os.getenv("TOKEN_LIMIT") or 900) * len(cards)
+    timeout = _request_timeout(hints)
+
+    capsule = dict(hints.get("capsule") or {})
+    capsule.pop("sku", None)
+    capsule_text = json.dumps(capsule, ensure_ascii=False, separators=(",", ":"))
+    exemplars: List[Dict[str, Any]] = hints.get("exemplars") or []
+    rules_text = f"{_load_rules_text(hints)}\n{PACKED_RULES}"
+
+    user_content = _prepared(hints).context(capsule_text, exemplars)
+    user_content.append({"type": "text", "text": f"Cards: {len(cards)}"})
+    for card in cards:
+        prepared = _prepared(card)
+        back_path = card.get("back_path")
+        label = _image_label(card["front_path"], back_path, card)
+        user_content.append({"type": "text", "text": f"Card sku={card['sku']}: {label}"})
+        user_content.append(prepared.image(card["front_path"]))
+        if back_path:
+            user_content.append(prepared.image(back_path))
+
+    request = {
+        "model": model_name,
+        "input": [
+            {
+                "role": "system",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": rules_text,
+                    }
+                ],
+            },
+            {
+                "role": "user",
+                "content": user_content,
+            },
+        ],
+        "temperature": 0.1,
+        "max_output_tokens": max_tokens,
+        "timeout": timeout,
+    }
+    response = _send_with_retries(client, request, *_deadline_of(hints))
+    data = _parse_json_output(response)
+    if isinstance(data, dict):
+        data = data.get("cards") or data.get("records") or [data]
+    if not isinstance(data, list):
+        raise RuntimeError("Packed response was not a JSON array.")
+    return data
+
+
+def _make_client() -> OpenAI:
+    api_key = os.getenv("AG5_API_KEY")
+    if not api_key:
+        raise MissingAPIKey(
+            "AG5_API_KEY is not set. Populate it in your .env or environment."
         )
-        return response
+    # Retries are handled by _send_with_retries so they respect the deadline.
+    return OpenAI(api_key=api_key, max_retries=0)
+
+
+def _model_name(hints: Dict[str, Any]) -> str:
+    return hints.get("model_name") or os.getenv("MODEL_NAME") or DEFAULT_MODEL_NAME
+
+
+def _request_timeout(hints: Dict[str, Any]) -> int:
+    return int(hints.get("timeout") or os.getenv("PIPELINE_REQUEST_TIMEOUT", DEFAULT_TIMEOUT))
+
+
+def _deadline_of(hints: Dict[str, Any]) -> Tuple[Optional[float], Optional[threading.Event]]:
+    deadline = hints.get("deadline")
+    return (float(deadline) if deadline is not None else None), hints.get("cancel")
+
+
+def _send_with_retries(
+    client: OpenAI,
+    request: Dict[str, Any],
+    deadline: Optional[float] = None,
+    cancel: Optional[threading.Event] = None,
+) -> Any:
+    """Send ``request``, retrying transient errors with exponential backoff.
+
+    With a ``deadline`` each attempt's HTTP timeout is cut to the remaining
+    budget and no backoff sleeps past it; ``cancel`` interrupts the backoff
+    and stops further attempts.
+    """
 
     delay = 1.0
     attempts = 0
     last_exc: Exception | None = None
     response = None
+    base_timeout = request.get("timeout")
     while attempts < MAX_ATTEMPTS:
+        if cancel is not None and cancel.is_set():
+            raise DeadlineExceeded("Request cancelled by caller")
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise DeadlineExceeded("Deadline passed before the request was sent")
+            request["timeout"] = min(float(base_timeout), remaining) if base_timeout else remaining
         attempts += 1
         try:
-            response = _send_request()
+            response = client.responses.create(**request)
             break
         except (RateLimitError, APITimeoutError) as exc:
             last_exc = exc
@@ -178,15 +463,88 @@ def analyze_card(front_path: str, back_path: str, hints: Dict[str, Any]) -> Dict
                 raise
         except Exception:
             raise
+        assert last_exc is not None
         if attempts >= MAX_ATTEMPTS:
-            assert last_exc is not None
             raise last_exc
-        time.sleep(delay)
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            raise last_exc
+        if cancel is not None:
+            if cancel.wait(delay):
+                raise DeadlineExceeded("Request cancelled by caller") from last_exc
+        else:
+            time.sleep(delay)
         delay = min(delay * 2, 8.0)
 
     if response is None:  # pragma: no cover - safety net
         raise RuntimeError("Failed to receive response from GPT-5 Vision")
+    return response
+
 
+def _field(obj: Any, name: str) -> Any:
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+def _stream_json(
+    client: OpenAI,
+    request: Dict[str, Any],
+    deadline: Optional[float] = None,
+    cancel: Optional[threading.Event] = None,
+    allowed_keys: Sequence[str] = STREAM_KEYS,
+) -> Dict[str, Any]:
+    """Stream a card response, abandoning it as soon as it cannot be valid.
+
+    Output deltas go through :class:`StreamingJSONChecker`; a response that
+    stops looking like one card object (or ends early) is closed and the
+    request re-sent, up to ``STREAM_ATTEMPTS`` times.
+    """
+
+    aborted = 0
+    last_exc: Optional[InvalidStreamOutput] = None
+    for _ in range(STREAM_ATTEMPTS):
+        started = time.monotonic()
+        stream = _send_with_retries(client, dict(request, stream=True), deadline, cancel)
+        checker = StreamingJSONChecker(allowed_keys)
+        first_token: Optional[float] = None
+        usage: Dict[str, int] = {}
+        try:
+            for event in stream:
+                if cancel is not None and cancel.is_set():
+                    raise DeadlineExceeded("Request cancelled by caller")
+                kind = _field(event, "type")
+                if kind == "response.output_text.delta":
+                    if first_token is None:
+                        first_token = time.monotonic()
+                    checker.feed(_field(event, "delta") or "")
+                elif kind == "response.completed":
+                    usage = _usage_of(_field(event, "response"))
+                elif kind in ("response.failed", "response.incomplete", "error"):
+                    raise RuntimeError(f"Streaming response ended with {kind}")
+            data = checker.result()
+        except InvalidStreamOutput as exc:
+            aborted += 1
+            last_exc = exc
+            LOGGER.info("gpt5_stream_abort attempt=%d reason=%s", aborted, exc)
+            continue
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+        finished = time.monotonic()
+        first_token = first_token or finished
+        if usage:
+            data[USAGE_KEY] = usage
+        data[TIMING_KEY] = {
+            "ttft_s": first_token - started,
+            "generation_s": finished - first_token,
+            "aborted": aborted,
+        }
+        return data
+    raise RuntimeError(f"Model response was not valid JSON: {last_exc}") from last_exc
+
+
+def _parse_json_output(response: Any) -> Dict[str, Any]:
     # Collect the first text block returned.
     text_chunks: List[str] = []
     for item in response.output or []:
@@ -197,6 +555,24 @@ def analyze_card(front_path: str, back_path: str, hints: Dict[str, Any]) -> Dict
         raise RuntimeError("Model did not return any text content.")
     raw = "\n".join(text_chunks).strip()
     try:
-        return json.loads(raw)
+        data = json.loads(raw)
     except json.JSONDecodeError as exc:
         raise RuntimeError(f"Model response was not valid JSON: {raw}") from exc
+    usage = _usage_of(response)
+    if usage and isinstance(data, dict):
+        data[USAGE_KEY] = usage
+    return data
+
+
+def _usage_of(response: Any) -> Dict[str, int]:
+    usage = getattr(response, "usage", None)
+    if usage is None and isinstance(response, dict):
+        usage = response.get("usage")
+    if not usage:
+        return {}
+    counts: Dict[str, int] = {}
+    for key in ("input_tokens", "output_tokens"):
+        value = usage.get(key) if isinstance(usage, dict) else getattr(usage, key, None)
+        if value is not None:
+            counts[key] = int(value)
+    return counts
@@ -1,21 +1,56 @@
+import collections
 import concurrent.futures
+import contextlib
 import csv
+import itertools
 import json
 import os
 import shutil
+import threading
+import time
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
-
-from PIL import Image
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 from pipeline.models.provider_gpt5_vision import analyze_card as run_gpt5
-from pipeline.models.provider_gpt5_vision import MissingAPIKey
-from pipeline.schemas.card_record import CardRecord
-from pipeline.utils import log, naming
+from pipeline.models.provider_gpt5_vision import analyze_cards as run_gpt5_packed
+from pipeline.models.provider_gpt5_vision import analyze_fields as run_gpt5_fields
+from pipeline.models.provider_gpt5_vision import MissingAPIKey, PreparedPayload, TIMING_KEY, USAGE_KEY
+from pipeline.schemas.card_record import CardRecord, dump_records
+from pipeline import prepare
+from pipeline.scheduler import FairScheduler, box_of
+from pipeline.utils import fs, log, naming, quality
+from pipeline.utils.archive import (
+    ARCHIVE_NAME,
+    ResponseArchive,
+    archive_parts,
+    index_path,
+    part_name,
+    read_block,
+    read_index,
+)
+from pipeline.utils.batchfile import BatchReader, Progress
+from pipeline.utils.budget import MemoryBudget
+from pipeline.utils.hedging import Hedger
 from pipeline.utils.hints import build_hint_payload
+from pipeline.utils.leases import FINAL_MARKER, Heartbeat, LeaseStore
+from pipeline.utils.manifest import ContentManifest
+from pipeline.utils.images import (
+    TieredImage,
+    aspect_ratio,
+    composite_pair,
+    crop_region,
+    crop_to_card,
+    estimate_inflight_bytes,
+    open_rgb,
+    resize_to_edge,
+)
+from pipeline.utils.phash import PhashStore, image_signature
+from pipeline.utils.vocab import VOCAB_PATH, load_vocabulary
 from pydantic import ValidationError
 
 RESULT_SUBDIR = "results"
+LEASES_SUBDIR = "leases"
 DEFAULT_CONFIG = {
     "provider": "Mock",
     "model_name": "gpt-5.1-vision",
@@ -24,10 +59,66 @@ DEFAULT_CONFIG = {
     "image_max_edge": 1024,
     "per_item_timeout": 45,
     "max_failures": 5,
+    "retry_mode": "full",
+    "image_tiers": [],
+    "cascade": [],
+    "composite_images": False,
+    "composite_max_pixels": 1536 * 1024,
+    "pack_size": 1,
+    "dedupe": False,
+    "dedupe_radius": 3,
+    "dedupe_max_color_delta": 12,
+    "back_templates": False,
+    "back_template_radius": 8,
+    "back_template_min_support": 2,
+    "back_number_box": [0.0, 0.0, 1.0, 0.35],
+    "crop_borders": False,
+    "crop_margin": 0.02,
+    "deskew": False,
+    "quality_gate": False,
+    "quality_thresholds": dict(quality.DEFAULT_THRESHOLDS),
+    "concurrency": 1,
+    "memory_budget_mb": 2048,
+    "hedge_percentile": None,
+    "hedge_max_extra": 0.05,
+    "hedge_min_samples": 20,
+    "stream_responses": False,
+    "compact_output": False,
+    "archive_responses": True,
+    "canonical_names": False,
+    "canonical_min_score": 0.7,
+    "canonical_margin": 0.05,
+    "canonical_penalty": 0.1,
+    "fair_schedule": False,
+    "box_priorities": {},
+    "priority_aging_s": 120,
+    "lease_s": 60,
+    "lease_poll_s": 2,
+    "stream_poll_s": 1.0,
+    "stream_queue": 8,
+    "stream_linger_s": 2.0,
+    "progress_interval_s": 30,
 }
 CONFIG_PATH = Path("pipeline/config/model.json")
 RULES_PATH = Path("pipeline/prompts/rules_minimal.txt")
 TMP_DIR = Path("pipeline/tmp")
+PHASH_DB = Path("pipeline/cache/phash.sqlite")
+REQUIRED_FIELDS = ("year", "set", "num")
+RETRY_MODES = {"full", "targeted"}
+TEMPLATE_MODES = {"crop", "omit"}
+TEMPLATE_FIELDS = ("set", "brand", "year")
+TEMPLATE_ASPECT_TOLERANCE = 0.03
+# Fields that describe one physical copy rather than the printed card, with the
+# value a duplicate front starts from instead of inheriting them.
+COPY_FIELDS = {
+    "serial": None,
+    "auto": False,
+    "mem": False,
+    "grade": "raw",
+    "cond": None,
+    "notes": None,
+    "price_est": None,
+}
 
 
 def _load_env(project_root: Path) -> None:
@@ -75,30 +166,70 @@ def _find_front_back(folder: Path, images: List[str]) -> Tuple[Path, Path]:
     return front, back
 
 
-def _compress_image(src: Path, dest: Path, max_edge: int) -> None:
+def _compress_image(
+    src: Path, dest: Path, max_edge: int, crop_margin: Optional[float] = None, deskew: bool = False
+) -> None:
     dest.parent.mkdir(parents=True, exist_ok=True)
-    with Image.open(src) as img:
-        img = img.convert("RGB") if img.mode in {"P", "RGBA"} else img
-        width, height = img.size
-        scale = max(width, height)
-        if scale > max_edge:
-            ratio = max_edge / float(scale)
-            new_size = (int(width * ratio), int(height * ratio))
-            img = img.resize(new_size, Image.LANCZOS)
-        img.save(dest, format="WEBP", quality=85)
-
-
-def _prepare_images(front: Path, back: Path, sku: str, job_id: str, compress: bool, max_edge: int) -> Tuple[Path, Path]:
+    with open_rgb(src) as img:
+        if crop_margin is not None:
+            img = crop_to_card(img, crop_margin, deskew)
+        resize_to_edge(img, max_edge).save(dest, format="WEBP", quality=85)
+
+
+def _prepare_images(
+    front: Path,
+    back: Path,
+    sku: str,
+    job_id: str,
+    compress: bool,
+    max_edge: int,
+    crop_margin: Optional[float] = None,
+    deskew: bool = False,
+) -> Tuple[Path, Path]:
     if not compress:
         return front, back
     job_tmp = TMP_DIR / job_id / sku
     front_out = job_tmp / f"{front.stem}.webp"
     back_out = job_tmp / f"{back.stem}.webp"
-    _compress_image(front, front_out, max_edge)
-    _compress_image(back, back_out, max_edge)
+    _compress_image(front, front_out, max_edge, crop_margin, deskew)
+    _compress_image(back, back_out, max_edge, crop_margin, deskew)
     return front_out, back_out
 
 
+def _crop_settings(config: Dict[str, Any]) -> Tuple[Optional[float], bool]:
+    """``(margin, deskew)`` for the border-crop stage; margin is ``None`` when off."""
+
+    if not config.get("crop_borders"):
+        return None, False
+    return float(config.get("crop_margin", DEFAULT_CONFIG["crop_margin"])), bool(config.get("deskew"))
+
+
+def _resolution_tiers(config: Dict[str, Any]) -> List[int]:
+    """Ascending edge sizes for progressive escalation; empty when disabled."""
+
+    tiers = config.get("image_tiers") or []
+    if not config.get("compress_images", True) or not tiers:
+        return []
+    return sorted({int(edge) for edge in tiers})
+
+
+def _composite_budget(config: Dict[str, Any], capsule: Dict[str, Any]) -> Optional[int]:
+    """Pixel budget for a front/back composite, or ``None`` to send two images.
+
+    ``composite_images`` is either a bool or a list of categories (matched
+    against the capsule's ``likely_cat``) that should use the composite.
+    """
+
+    mode = config.get("composite_images")
+    if isinstance(mode, list):
+        enabled = capsule.get("likely_cat") in mode
+    else:
+        enabled = bool(mode)
+    if not enabled:
+        return None
+    return int(config.get("composite_max_pixels") or DEFAULT_CONFIG["composite_max_pixels"])
+
+
 def _fake_model_response(sku: str, capsule: Dict[str, Any]) -> Dict[str, Any]:
     base = naming.parse_sku(sku)
     guess_cat = capsule.get("likely_cat") or "other"
@@ -126,12 +257,41 @@ def _fake_model_response(sku: str, capsule: Dict[str, Any]) -> Dict[str, Any]:
 
 
 def _needs_retry(record: Dict[str, Any]) -> bool:
-    required_missing = any(not record.get(field) for field in ("year", "set", "num"))
+    required_missing = any(not record.get(field) for field in REQUIRED_FIELDS)
     return record.get("conf", 0.0) < 0.65 or required_missing
 
 
+def _followup_fields(record: Dict[str, Any]) -> List[str]:
+    """Fields a targeted follow-up should ask for.
+
+    Missing required fields are requested on their own; when all of them are
+    present but confidence is low, all required fields are re-read.
+    """
+
+    missing = [field for field in REQUIRED_FIELDS if not record.get(field)]
+    return missing or list(REQUIRED_FIELDS)
+
+
+def _merge_followup(record: Dict[str, Any], answer: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    merged = dict(record)
+    filled = 0
+    for name in fields:
+        value = answer.get(name)
+        if value in (None, ""):
+            continue
+        merged[name] = value
+        filled += 1
+    if filled == len(fields):
+        try:
+            answer_conf = float(answer.get("conf", 0.0))
+        except (TypeError, ValueError):
+            answer_conf = 0.0
+        merged["conf"] = max(float(record.get("conf", 0.0)), answer_conf)
+    return _normalise(merged)
+
+
 def _build_nudge(record: Dict[str, Any], capsule: Dict[str, Any]) -> str:
-    missing_fields = [field for field in ("year", "set", "num") if not record.get(field)]
+    missing_fields = [field for field in REQUIRED_FIELDS if not record.get(field)]
     notes = []
     if missing_fields:
         notes.append(f"Fill {', '.join(missing_fields)} if visible")
@@ -149,7 +309,41 @@ def _normalise(raw: Dict[str, Any]) -> Dict[str, Any]:
     return data
 
 
-def _run_with_timeout(func, timeout: int, *args, **kwargs):
+def _normalise_many(raws: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """:func:`_normalise` for a whole list through the bulk ``dump_records`` path."""
+
+    records = dump_records(raws)
+    for data in records:
+        if "price_est" in data and data["price_est"] == 0:
+            data.pop("price_est")
+    return records
+
+
+def _canonical_settings(config: Dict[str, Any]) -> Optional[Tuple[str, float, float, float]]:
+    """Vocabulary path and ``snap`` thresholds, or ``None`` when the pass is off."""
+
+    if not config.get("canonical_names"):
+        return None
+    return (
+        str(VOCAB_PATH),
+        float(config.get("canonical_min_score", DEFAULT_CONFIG["canonical_min_score"])),
+        float(config.get("canonical_margin", DEFAULT_CONFIG["canonical_margin"])),
+        float(config.get("canonical_penalty", DEFAULT_CONFIG["canonical_penalty"])),
+    )
+
+
+def _snap_names(record: Dict[str, Any], settings: Optional[Tuple[str, float, float, float]]) -> List[Dict[str, Any]]:
+    """Snap set, brand and parallel near-misses to the canonical vocabulary."""
+
+    if settings is None:
+        return []
+    vocabulary = load_vocabulary(Path(settings[0]))
+    if vocabulary is None:
+        return []
+    return vocabulary.snap(record, *settings[1:])
+
+
+def _run_with_timeout(func, timeout: int, *args, cancel: Optional[threading.Event] = None, **kwargs):
     executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
     future = executor.submit(func, *args, **kwargs)
     shutdown_early = False
@@ -157,6 +351,9 @@ def _run_with_timeout(func, timeout: int, *args, **kwargs):
         return future.result(timeout=timeout)
     except concurrent.futures.TimeoutError:
         future.cancel()
+        if cancel is not None:
+            # The worker checks this between attempts and during backoff.
+            cancel.set()
         executor.shutdown(wait=False, cancel_futures=True)
         shutdown_early = True
         raise
@@ -165,11 +362,12 @@ def _run_with_timeout(func, timeout: int, *args, **kwargs):
             executor.shutdown(wait=True, cancel_futures=True)
 
 
-def _write_outputs(out_root: Path, sku: str, record: Dict[str, Any], needs_review: bool) -> None:
+def _write_outputs(
+    out_root: Path, sku: str, record: Dict[str, Any], needs_review: bool, append_csv: bool = True
+) -> None:
     json_dir = out_root / "json"
     txt_dir = out_root / "txt"
-    csv_dir = out_root / "csv"
-    for directory in (json_dir, txt_dir, csv_dir):
+    for directory in (json_dir, txt_dir):
         directory.mkdir(parents=True, exist_ok=True)
 
     with (json_dir / f"{sku}.json").open("w", encoding="utf-8") as handle:
@@ -184,8 +382,13 @@ def _write_outputs(out_root: Path, sku: str, record: Dict[str, Any], needs_revie
     with (txt_dir / f"{sku}.txt").open("w", encoding="utf-8") as handle:
         handle.write("\n".join(lines))
 
-    csv_path = csv_dir / "batch.csv"
-    row = {
+    if append_csv:
+        _append_csv(out_root / "csv" / "batch.csv", [_csv_row(record, needs_review)])
+
+
+def _csv_row(record: Dict[str, Any], needs_review: bool) -> Dict[str, Any]:
+    identity = record.get("player") or record.get("character") or ""
+    return {
         "sku": record.get("sku"),
         "cat": record.get("cat"),
         "brand": record.get("brand"),
@@ -205,16 +408,306 @@ def _write_outputs(out_root: Path, sku: str, record: Dict[str, Any], needs_revie
         "conf": record.get("conf"),
         "needs_review": needs_review,
     }
+
+
+def _append_csv(csv_path: Path, rows: List[Dict[str, Any]]) -> None:
+    if not rows:
+        return
+    csv_path.parent.mkdir(parents=True, exist_ok=True)
     write_header = not csv_path.exists()
     with csv_path.open("a", newline="", encoding="utf-8") as handle:
-        writer = csv.DictWriter(handle, fieldnames=list(row.keys()))
+        writer = csv.DictWriter(handle, fieldnames=list(rows[0].keys()))
         if write_header:
             writer.writeheader()
-        writer.writerow(row)
+        writer.writerows(rows)
+
 
+def _with_deadline(payload: Dict[str, Any], deadline: float) -> Tuple[Dict[str, Any], threading.Event]:
+    """Copy of ``payload`` carrying a deadline and cancel event for the provider."""
 
-def _call_provider(front: Path, back: Path, payload: Dict[str, Any], timeout: int) -> Dict[str, Any]:
-    return _run_with_timeout(run_gpt5, timeout, str(front), str(back), payload)
+    cancel = threading.Event()
+    return dict(payload, deadline=deadline, cancel=cancel), cancel
+
+
+def _remaining(deadline: float) -> float:
+    """Seconds left until ``deadline``; raises once it has passed."""
+
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise concurrent.futures.TimeoutError("Deadline passed before the call")
+    return remaining
+
+
+def _call_provider(
+    front: Path,
+    back: Optional[Path],
+    payload: Dict[str, Any],
+    deadline: float,
+    hedger: Optional[Hedger] = None,
+) -> Dict[str, Any]:
+    """Single-card call that must finish by ``deadline`` (``time.monotonic()``)."""
+
+    timeout = _remaining(deadline)
+    front_arg, back_arg = str(front), str(back) if back else None
+    if hedger is not None:
+        return hedger.call(
+            lambda cancel, deadline: run_gpt5(front_arg, back_arg, dict(payload, deadline=deadline, cancel=cancel)),
+            timeout,
+        )
+    payload, cancel = _with_deadline(payload, deadline)
+    return _run_with_timeout(run_gpt5, timeout, front_arg, back_arg, payload, cancel=cancel)
+
+
+def _call_provider_fields(
+    image: Path,
+    payload: Dict[str, Any],
+    fields: List[str],
+    deadline: float,
+    hedger: Optional[Hedger] = None,
+) -> Dict[str, Any]:
+    timeout = _remaining(deadline)
+    if hedger is not None:
+        return hedger.call(
+            lambda cancel, deadline: run_gpt5_fields(str(image), dict(payload, deadline=deadline, cancel=cancel), fields),
+            timeout,
+        )
+    payload, cancel = _with_deadline(payload, deadline)
+    return _run_with_timeout(run_gpt5_fields, timeout, str(image), payload, fields, cancel=cancel)
+
+
+def _make_hedger(config: Dict[str, Any]) -> Optional[Hedger]:
+    """Hedger for single-card calls when ``hedge_percentile`` is set."""
+
+    percentile = config.get("hedge_percentile")
+    if not percentile:
+        return None
+    return Hedger(
+        float(percentile),
+        float(config.get("hedge_max_extra", DEFAULT_CONFIG["hedge_max_extra"])),
+        int(config.get("hedge_min_samples", DEFAULT_CONFIG["hedge_min_samples"])),
+    )
+
+
+def _image_source(
+    front_tiered: Optional[TieredImage],
+    back_tiered: Optional[TieredImage],
+    front: Path,
+    back: Path,
+    composite_pixels: Optional[int] = None,
+    work_dir: Optional[Path] = None,
+) -> Callable[[Optional[int]], Tuple[Path, Optional[Path]]]:
+    composites: Dict[Optional[int], Path] = {}
+
+    def paths_for(edge: Optional[int]) -> Tuple[Path, Optional[Path]]:
+        if edge is None or front_tiered is None or back_tiered is None:
+            pair = (front, back)
+        else:
+            pair = (front_tiered.path_for(edge), back_tiered.path_for(edge))
+        if not composite_pixels:
+            return pair
+        if edge not in composites:
+            out_dir = work_dir or pair[0].parent
+            composites[edge] = composite_pair(
+                pair[0], pair[1], out_dir / f"{pair[0].stem}_composite.webp", composite_pixels
+            )
+        return composites[edge], None
+
+    return paths_for
+
+
+def _cascade_models(config: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Ordered model tiers; a single tier for ``model_name`` when no cascade is set."""
+
+    cascade = config.get("cascade") or []
+    models = [dict(tier) for tier in cascade if isinstance(tier, dict) and tier.get("model_name")]
+    return models or [{"model_name": config.get("model_name")}]
+
+
+def _accepts(record: Dict[str, Any], model_tier: Dict[str, Any]) -> bool:
+    if _needs_retry(record):
+        return False
+    if record.get("conf", 0.0) < float(model_tier.get("min_conf", 0.0)):
+        return False
+    return all(record.get(field) for field in model_tier.get("require", []))
+
+
+def _escalation_steps(
+    models: List[Dict[str, Any]], edges: List[int]
+) -> List[Tuple[Dict[str, Any], Optional[int]]]:
+    """Resolution tiers run on the first model; later models get the top tier."""
+
+    tier_edges: List[Optional[int]] = list(edges) or [None]
+    steps: List[Tuple[Dict[str, Any], Optional[int]]] = []
+    for index, model_tier in enumerate(models):
+        for edge in tier_edges if index == 0 else tier_edges[-1:]:
+            steps.append((model_tier, edge))
+    return steps
+
+
+def _token_count(usage: Optional[Dict[str, int]], response: Dict[str, Any]) -> int:
+    if usage:
+        return sum(usage.values())
+    return max(1, len(json.dumps(response, ensure_ascii=False)) // 4)
+
+
+def _count_step(
+    stats: Dict[str, Dict[Any, Dict[str, Any]]],
+    model_tier: Dict[str, Any],
+    edge: Optional[int],
+    first_model: str,
+    new_card: bool,
+    accepted: bool,
+    elapsed: float,
+    tokens: int,
+) -> None:
+    """Add one ladder step's outcome for one card to ``stats``."""
+
+    model_name = model_tier["model_name"]
+    model_stats = stats["models"].setdefault(
+        model_name, {"cards": 0, "calls": 0, "accepted": 0, "latency_s": 0.0, "tokens": 0}
+    )
+    model_stats["cards"] += int(new_card)
+    model_stats["calls"] += 1
+    model_stats["latency_s"] += elapsed
+    model_stats["tokens"] += tokens
+    if edge is not None and model_name == first_model:
+        tier_stats = stats["tiers"].setdefault(edge, {"sent": 0, "resolved": 0})
+        tier_stats["sent"] += 1
+        tier_stats["resolved"] += int(accepted)
+
+
+def _call_escalating(
+    paths_for: Callable[[Optional[int]], Tuple[Path, Optional[Path]]],
+    steps: List[Tuple[Dict[str, Any], Optional[int]]],
+    payload: Dict[str, Any],
+    deadline: float,
+    stats: Dict[str, Dict[Any, Dict[str, Any]]],
+    hedger: Optional[Hedger] = None,
+    start: int = 0,
+) -> Tuple[Dict[str, Any], Path, Optional[Path]]:
+    """Walk the escalation ladder until a step's record is accepted.
+
+    Every step shares the card's ``deadline``; a later step that runs out of
+    time ends the ladder with the last answer. ``start`` skips steps the card
+    already went through (a packed request answers step 0).
+
+    Returns the last response together with the image paths it was produced
+    from; ``payload["model_name"]`` is left on the model that produced it so a
+    follow-up retry goes to the same tier.
+    """
+
+    result: Optional[Tuple[Dict[str, Any], Path, Optional[Path]]] = None
+    first_model = steps[0][0]["model_name"]
+    accepted_model = None
+    seen_models = {model_tier["model_name"] for model_tier, _ in steps[:start]}
+    for index, (model_tier, edge) in enumerate(steps[start:], start):
+        model_name = model_tier["model_name"]
+        front_path, back_path = paths_for(edge)
+        step_payload = dict(payload, model_name=model_name)
+        started = time.monotonic()
+        try:
+            response = _call_provider(front_path, back_path, step_payload, deadline, hedger)
+        except Exception as exc:
+            if index == start:
+                raise
+            log.event("post", payload.get("sku"), status="tier_error", model=model_name, tier=edge, message=str(exc))
+            break
+        elapsed = time.monotonic() - started
+        usage = response.pop(USAGE_KEY, None)
+        timing = response.pop(TIMING_KEY, None)
+        if timing:
+            stream_stats = stats.setdefault("stream", {})
+            for key, value in dict(timing, calls=1).items():
+                stream_stats[key] = stream_stats.get(key, 0) + value
+        try:
+            accepted = _accepts(_normalise(response), model_tier)
+        except ValidationError:
+            accepted = False
+        result = (response, front_path, back_path)
+        payload["model_name"] = model_name
+        new_card = model_name not in seen_models
+        seen_models.add(model_name)
+        _count_step(
+            stats, model_tier, edge, first_model, new_card, accepted, elapsed, _token_count(usage, response)
+        )
+        if accepted:
+            accepted_model = model_name
+            break
+    if accepted_model is not None:
+        stats["models"][accepted_model]["accepted"] += 1
+    assert result is not None
+    return result
+
+
+def _tier_summary(tier_stats: Dict[int, Dict[str, int]]) -> Dict[str, Dict[str, Any]]:
+    summary: Dict[str, Dict[str, Any]] = {}
+    for edge in sorted(tier_stats):
+        stats = tier_stats[edge]
+        rate = stats["resolved"] / stats["sent"] if stats["sent"] else 0.0
+        summary[str(edge)] = {**stats, "rate": round(rate, 3)}
+    return summary
+
+
+def _model_summary(model_stats: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    summary: Dict[str, Dict[str, Any]] = {}
+    for name, stats in model_stats.items():
+        calls = stats["calls"] or 1
+        summary[name] = {
+            "cards": stats["cards"],
+            "accepted": stats["accepted"],
+            "acceptance": round(stats["accepted"] / stats["cards"], 3) if stats["cards"] else 0.0,
+            "avg_latency_s": round(stats["latency_s"] / calls, 3),
+            "tokens": stats["tokens"],
+        }
+    return summary
+
+
+def _retry_record(
+    record: Dict[str, Any],
+    hint_payload: Dict[str, Any],
+    front: Path,
+    back: Optional[Path],
+    config: Dict[str, Any],
+    deadline: float,
+    hedger: Optional[Hedger] = None,
+) -> Tuple[Dict[str, Any], bool, Dict[str, Any]]:
+    """Second pass for a record that tripped :func:`_needs_retry`.
+
+    ``retry_mode`` "full" re-sends both images with a nudge; "targeted" asks
+    only for the weak fields from the back image (or the composite when no
+    separate back was sent) and merges the answer. The third value is the
+    raw retry answer as archived for :func:`replay_batch`.
+    """
+
+    nudge_payload = dict(hint_payload)
+    nudge_payload["nudge"] = _build_nudge(record, hint_payload.get("capsule", {}))
+    if config.get("retry_mode") == "targeted":
+        fields = _followup_fields(record)
+        nudge_payload["known"] = {
+            key: record[key]
+            for key in ("cat", "brand", "set", "year", "num", "player", "character")
+            if record.get(key) not in (None, "")
+        }
+        answer = _call_provider_fields(back or front, nudge_payload, fields, deadline, hedger)
+        retry = {"mode": "targeted", "fields": fields, "raw": answer}
+    else:
+        nudge_payload["exemplars"] = (hint_payload.get("exemplars") or [])[:1]
+        retry_raw = _call_provider(front, back, nudge_payload, deadline, hedger)
+        retry = {"mode": "full", "raw": retry_raw}
+    return (*_apply_retry(record, retry), retry)
+
+
+def _apply_retry(record: Dict[str, Any], retry: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+    """Keep the retry answer unless it is still weak and less confident."""
+
+    if retry["mode"] == "targeted":
+        retry_record = _merge_followup(record, retry["raw"], retry["fields"])
+    else:
+        retry_record = _normalise(retry["raw"])
+    retry_review = _needs_retry(retry_record)
+    if not retry_review or retry_record.get("conf", 0) >= record.get("conf", 0):
+        return retry_record, retry_review
+    return record, True
 
 
 def _summarise(record: Dict[str, Any], needs_review: bool, token_estimate: int) -> str:
@@ -229,136 +722,1139 @@ def _summarise(record: Dict[str, Any], needs_review: bool, token_estimate: int)
     )
 
 
-def process_batch(job_id: str, ready: str = "Scans_Ready", batches: str = "pipeline/output/batches", outroot: str = "pipeline/output") -> str:
-    project_root = Path.cwd()
-    _load_env(project_root)
-    config = _load_config()
+@dataclass
+class _JobRun:
+    """Job-wide settings and counters shared by every card in a batch."""
 
-    batch_file = Path(batches) / f"{job_id}.jsonl"
-    if not batch_file.exists():
-        raise FileNotFoundError(batch_file)
+    job_id: str
+    config: Dict[str, Any]
+    project_root: Path
+    ready: Path
+    error: Path
+    result_root: Path
+    timeout: int
+    max_failures: int
+    tiers: List[int]
+    steps: List[Tuple[Dict[str, Any], Optional[int]]]
+    ladder_stats: Dict[str, Dict[Any, Dict[str, Any]]] = field(
+        default_factory=lambda: {"tiers": {}, "models": {}}
+    )
+    pack_stats: Dict[str, int] = field(default_factory=lambda: {"requests": 0, "cards": 0, "fallbacks": 0})
+    catalog: Optional[PhashStore] = None
+    duplicates: int = 0
+    rejected: int = 0
+    templates: Optional[PhashStore] = None
+    template_stats: Dict[str, int] = field(default_factory=lambda: {"matched": 0, "learned": 0})
+    failures: int = 0
+    processed: int = 0
+    reviewed: int = 0
+    abort: bool = False
+    memory: Optional[MemoryBudget] = None
+    hedger: Optional[Hedger] = None
+    archive: Optional[ResponseArchive] = None
+    hashes: Optional[ContentManifest] = None
+    leases: Optional[LeaseStore] = None
+    canonical: Optional[Tuple[str, float, float, float]] = None
+    canonical_stats: Dict[str, int] = field(default_factory=lambda: {"snapped": 0, "ambiguous": 0})
+    reader: Optional[BatchReader] = None
+    progress: Optional[Progress] = None
+    lock: threading.RLock = field(default_factory=threading.RLock)
 
-    result_root = Path(outroot) / job_id / RESULT_SUBDIR
-    if result_root.exists():
-        shutil.rmtree(result_root)
+    @property
+    def uses_provider(self) -> bool:
+        return self.config.get("provider") == "GPT-5 Vision"
 
-    TMP_DIR.mkdir(parents=True, exist_ok=True)
 
-    with batch_file.open("r", encoding="utf-8") as handle:
-        lines = [json.loads(line) for line in handle if line.strip()]
+@dataclass
+class _CardWork:
+    """Prepared images and hints for one SKU while it is being processed."""
 
-    timeout = int(config.get("per_item_timeout", DEFAULT_CONFIG["per_item_timeout"]))
-    max_failures = int(config.get("max_failures", DEFAULT_CONFIG["max_failures"]))
-    failures = 0
+    sku: str
+    hints: Dict[str, Any]
+    front: Path
+    back: Optional[Path]
+    image_source: Callable[[Optional[int]], Tuple[Path, Optional[Path]]]
+    tiered: Tuple[Optional[TieredImage], Optional[TieredImage]] = (None, None)
+    signature: Optional[Tuple[int, Tuple[int, int, int]]] = None
+    duplicate_of: Optional[str] = None
+    full_back: Optional[Path] = None
+    back_signature: Optional[Tuple[int, Tuple[int, int, int]]] = None
+    back_aspect: float = 0.0
+    template_id: Optional[str] = None
+    deadline: Optional[float] = None
 
-    abort_remaining = False
+    def close(self) -> None:
+        for tiered in self.tiered:
+            if tiered is not None:
+                tiered.close()
+        prepared = self.hints.get("prepared")
+        if prepared is not None:
+            prepared.release()
 
-    for item in lines:
-        if abort_remaining:
-            break
-        sku = item["sku"]
-        folder = Path(ready) / sku
-        images = item.get("images", [])
-        front_path, back_path = _find_front_back(folder, images)
+
+def _prepared_pair(
+    front: Path, back: Path, max_edge: int, config: Dict[str, Any], hashes: Optional[ContentManifest] = None
+) -> Optional[Tuple[Path, Path]]:
+    """Pair-time derivatives for ``front``/``back`` when both are still valid."""
+
+    if not config.get("compress_images", True):
+        return None
+    front_ready = prepare.lookup(front, max_edge, config, hashes)
+    back_ready = prepare.lookup(back, max_edge, config, hashes)
+    if front_ready is None or back_ready is None:
+        return None
+    return front_ready, back_ready
+
+
+def _prepare_card(run: _JobRun, item: Dict[str, Any]) -> _CardWork:
+    config = run.config
+    sku = item["sku"]
+    folder = run.ready / sku
+    images = item.get("images", [])
+    front_path, back_path = _find_front_back(folder, images)
+    front_tiered = back_tiered = None
+    front_prepped: Path
+    back_prepped: Optional[Path]
+    crop_margin, deskew = _crop_settings(config)
+    max_edge = int(config.get("image_max_edge", 1024))
+    prepared = None if run.tiers else _prepared_pair(front_path, back_path, max_edge, config, run.hashes)
+    if run.tiers:
+        front_tiered = TieredImage(
+            front_path,
+            TMP_DIR / run.job_id / sku,
+            crop_margin,
+            deskew,
+            ready=lambda edge: prepare.lookup(front_path, edge, config, run.hashes),
+        )
+        back_tiered = TieredImage(
+            back_path,
+            TMP_DIR / run.job_id / sku,
+            crop_margin,
+            deskew,
+            ready=lambda edge: prepare.lookup(back_path, edge, config, run.hashes),
+        )
+        front_prepped = front_tiered.path_for(run.tiers[0])
+        back_prepped = back_tiered.path_for(run.tiers[0])
+    elif prepared is not None:
+        front_prepped, back_prepped = prepared
+    else:
         front_prepped, back_prepped = _prepare_images(
             front_path,
             back_path,
             sku,
-            job_id,
+            run.job_id,
             config.get("compress_images", True),
-            int(config.get("image_max_edge", 1024)),
+            max_edge,
+            crop_margin,
+            deskew,
         )
 
-        hint_payload = build_hint_payload(sku, project_root=project_root)
-        response_data: Dict[str, Any]
-
-        provider_failed = False
-        if config.get("provider") == "GPT-5 Vision":
-            hint_payload.update(
-                {
-                    "rules_path": str(RULES_PATH),
-                    "model_name": config.get("model_name"),
-                    "token_limit": config.get("max_tokens"),
-                }
-            )
-            try:
-                response_data = _call_provider(front_prepped, back_prepped, hint_payload, timeout)
-            except MissingAPIKey:
-                log.event(
-                    "post",
-                    sku,
-                    job_id=job_id,
-                    status="error",
-                    message="Missing AG5_API_KEY",
-                )
-                provider_failed = True
-                response_data = _fake_model_response(sku, hint_payload.get("capsule", {}))
-            except concurrent.futures.TimeoutError:
-                log.event(
-                    "post",
-                    sku,
-                    job_id=job_id,
-                    status="timeout",
-                    message=f"Provider timed out after {timeout}s",
-                )
-                provider_failed = True
-                response_data = _fake_model_response(sku, hint_payload.get("capsule", {}))
-            except Exception as exc:  # pragma: no cover - defensive
-                log.event("post", sku, job_id=job_id, status="error", message=str(exc))
-                provider_failed = True
-                response_data = _fake_model_response(sku, hint_payload.get("capsule", {}))
-        else:
-            response_data = _fake_model_response(sku, hint_payload.get("capsule", {}))
+    hint_payload = build_hint_payload(sku, project_root=run.project_root)
+    if run.uses_provider:
+        hint_payload.update(
+            {
+                "rules_path": str(RULES_PATH),
+                "model_name": config.get("model_name"),
+                "token_limit": config.get("max_tokens"),
+                "prepared": PreparedPayload(),
+                "stream": bool(config.get("stream_responses")),
+                "compact": bool(config.get("compact_output")),
+            }
+        )
+    composite_pixels = _composite_budget(config, hint_payload.get("capsule", {}))
+    if composite_pixels:
+        hint_payload["composite"] = True
+    image_source = _image_source(
+        front_tiered,
+        back_tiered,
+        front_prepped,
+        back_prepped,
+        composite_pixels,
+        TMP_DIR / run.job_id / sku,
+    )
+    card = _CardWork(
+        sku=sku,
+        hints=hint_payload,
+        front=front_prepped,
+        back=back_prepped,
+        image_source=image_source,
+        tiered=(front_tiered, back_tiered),
+        signature=image_signature(front_prepped) if run.catalog is not None else None,
+    )
+    if run.templates is not None and back_prepped is not None and not composite_pixels:
+        with run.lock:
+            _apply_back_template(run, card, back_prepped)
+    return card
+
+
+def _template_trusted(template: Dict[str, Any], min_support: int) -> bool:
+    return template.get("support", 0) >= min_support and not template.get("conflicts")
+
+
+def _apply_back_template(run: _JobRun, card: _CardWork, back: Path) -> None:
+    """Match the back against known set templates and slim the image payload.
+
+    On a trusted match the template's set/brand/year go into the capsule and
+    the back is replaced by a crop of the number region ("crop") or dropped
+    ("omit"). The full back is kept for review retries.
+    """
+
+    assert run.templates is not None
+    config = run.config
+    card.back_signature = image_signature(back)
+    card.back_aspect = aspect_ratio(back)
+    min_support = int(config.get("back_template_min_support", DEFAULT_CONFIG["back_template_min_support"]))
+
+    def same_layout(template: Dict[str, Any]) -> bool:
+        return abs(template.get("aspect", 0.0) - card.back_aspect) <= TEMPLATE_ASPECT_TOLERANCE
+
+    match = run.templates.nearest(
+        card.back_signature,
+        int(config.get("back_template_radius", DEFAULT_CONFIG["back_template_radius"])),
+        accept=same_layout,
+    )
+    if match is None:
+        return
+    template_id, template, _ = match
+    card.template_id = template_id
+    if not _template_trusted(template, min_support):
+        return
+    run.template_stats["matched"] += 1
+    card.hints.setdefault("capsule", {})["back_template"] = {
+        key: template[key] for key in TEMPLATE_FIELDS if template.get(key) not in (None, "")
+    }
+    mode = config.get("back_templates")
+    box = tuple(config.get("back_number_box") or DEFAULT_CONFIG["back_number_box"])
+    work_dir = TMP_DIR / run.job_id / card.sku
+    inner = card.image_source
+    crops: Dict[Optional[int], Path] = {}
+
+    def paths_for(edge: Optional[int]) -> Tuple[Path, Optional[Path]]:
+        front, full_back = inner(edge)
+        if mode == "omit" or full_back is None:
+            return front, None
+        if edge not in crops:
+            crops[edge] = crop_region(full_back, box, work_dir / f"{full_back.stem}_number.webp")
+        return front, crops[edge]
+
+    card.image_source = paths_for
+    card.full_back = back
+    if mode == "crop":
+        card.hints["back_label"] = "back_number_crop"
+
+
+def _learn_back_template(run: _JobRun, card: _CardWork, record: Dict[str, Any]) -> None:
+    """Fold an accepted record into the template its back matched, or start one."""
+
+    assert run.templates is not None and card.back_signature is not None
+    observed = {key: record.get(key) for key in TEMPLATE_FIELDS}
+    stored = run.templates.get(card.template_id) if card.template_id else None
+    if stored is None:
+        template = dict(observed, support=1, conflicts=0, aspect=card.back_aspect)
+        run.templates.add(card.sku, card.back_signature, template)
+        run.template_stats["learned"] += 1
+        return
+    signature, current = stored
+    updated = dict(current)
+    if all(current.get(key) == observed[key] for key in TEMPLATE_FIELDS):
+        updated["support"] = current.get("support", 0) + 1
+    else:
+        updated["conflicts"] = current.get("conflicts", 0) + 1
+    run.templates.add(card.template_id, signature, updated)
+
+
+def _quality_reason(run: _JobRun, card: _CardWork) -> Optional[str]:
+    if not run.config.get("quality_gate"):
+        return None
+    thresholds = run.config.get("quality_thresholds") or {}
+    return quality.check_pair(card.front, card.full_back or card.back, thresholds)
+
+
+def _move_to_error(ready: Path, error: Path, sku: str, message: str) -> None:
+    """Move a SKU's Ready folder to the error folder with a reason, like ``watcher.process``."""
+
+    src_dir = ready / sku
+    err_dir = error / sku.replace("/", "_")
+    fs.ensure_dir(str(err_dir))
+    if src_dir.exists():
+        for path in src_dir.iterdir():
+            if path.is_file():
+                fs.atomic_move(str(path), str(err_dir / path.name))
+                path.unlink()
+        shutil.rmtree(src_dir, ignore_errors=True)
+    with (err_dir / "error.txt").open("w", encoding="utf-8") as handle:
+        handle.write(message)
+
+
+def _reject_card(run: _JobRun, card: _CardWork, reason: str) -> None:
+    _move_to_error(run.ready, run.error, card.sku, f"Quality gate: {reason}")
+    if run.leases is not None:
+        run.leases.commit(card.sku, {"rejected": reason})
+    with run.lock:
+        run.rejected += 1
+    log.event("post", card.sku, job_id=run.job_id, status="rejected", message=reason)
+    print(f"[POST] {card.sku}: rejected ({reason})")
+
+
+def _lookup_duplicate(run: _JobRun, card: _CardWork) -> Optional[Dict[str, Any]]:
+    """Reuse a cataloged record when the front is a near-exact match.
+
+    Only the printed card's fields carry over; the ``COPY_FIELDS`` of the
+    other copy (serial, condition, grade, ...) are reset.
+    """
+
+    if run.catalog is None or card.signature is None:
+        return None
+    match = run.catalog.nearest(
+        card.signature,
+        int(run.config.get("dedupe_radius", DEFAULT_CONFIG["dedupe_radius"])),
+        int(run.config.get("dedupe_max_color_delta", DEFAULT_CONFIG["dedupe_max_color_delta"])),
+    )
+    if match is None:
+        return None
+    source_sku, record, distance = match
+    card.duplicate_of = source_sku
+    run.duplicates += 1
+    log.event("post", card.sku, job_id=run.job_id, status="duplicate", duplicate_of=source_sku, distance=distance)
+    return {**record, **COPY_FIELDS, "sku": card.sku}
+
 
+def _pack_groups(items: Iterable[Dict[str, Any]], pack_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Lazily group items by batch code into chunks of ``pack_size``.
+
+    A chunk is yielded as soon as it fills; part-filled chunks follow at the
+    end in first-seen code order. At most ``pack_size - 1`` items per code
+    are held back.
+    """
+
+    if pack_size <= 1:
+        for item in items:
+            yield [item]
+        return
+    by_code: Dict[str, List[Dict[str, Any]]] = {}
+    for item in items:
         try:
-            record = _normalise(response_data)
-        except ValidationError as exc:
-            log.event("post", sku, job_id=job_id, status="schema_error", message=str(exc))
-            record = _normalise(_fake_model_response(sku, hint_payload.get("capsule", {})))
-        needs_review = _needs_retry(record)
-
-        if provider_failed:
-            failures += 1
-            if failures >= max_failures:
-                abort_remaining = True
-
-        if needs_review and config.get("provider") == "GPT-5 Vision":
-            nudge_payload = dict(hint_payload)
-            nudge_payload["nudge"] = _build_nudge(record, hint_payload.get("capsule", {}))
-            nudge_payload["exemplars"] = (hint_payload.get("exemplars") or [])[:1]
-            try:
-                retry_raw = _call_provider(front_prepped, back_prepped, nudge_payload, timeout)
-                retry_record = _normalise(retry_raw)
-                retry_review = _needs_retry(retry_record)
-                if not retry_review or retry_record.get("conf", 0) >= record.get("conf", 0):
-                    record = retry_record
-                    needs_review = retry_review
-            except Exception as exc:  # pragma: no cover - defensive
-                log.event("post", sku, job_id=job_id, status="retry_error", message=str(exc))
+            code = naming.parse_sku(item["sku"])["batch_code"]
+        except ValueError:
+            code = ""
+        members = by_code.setdefault(code, [])
+        members.append(item)
+        if len(members) == pack_size:
+            yield list(members)
+            members.clear()
+    for members in by_code.values():
+        if members:
+            yield members
+
+
+def _call_packed(run: _JobRun, cards: List[_CardWork]) -> Dict[str, Tuple[Dict[str, Any], bool]]:
+    """One request for a group of cards, standing in for the ladder's first step.
+
+    Returns the valid records keyed by SKU, each with whether that step
+    accepted it; the caller carries the rest up the ladder. Cards missing
+    from the answer, or whose entry fails ``CardRecord`` validation, are left
+    out so the caller falls back to a single-card call.
+    """
+
+    model_tier, edge = run.steps[0]
+    model_name = model_tier["model_name"]
+    entries = []
+    paths: Dict[str, Tuple[Path, Optional[Path]]] = {}
+    for card in cards:
+        front, back = card.image_source(edge)
+        paths[card.sku] = (front, back)
+        entries.append(
+            {
+                "sku": card.sku,
+                "front_path": str(front),
+                "back_path": str(back) if back else None,
+                "composite": card.hints.get("composite", False),
+                "back_label": card.hints.get("back_label"),
+                "prepared": card.hints.get("prepared"),
+            }
+        )
+    payload = dict(cards[0].hints, model_name=model_name)
+    with run.lock:
+        run.pack_stats["requests"] += 1
+    started = time.monotonic()
+    try:
+        pack_timeout = run.timeout * len(cards)
+        payload, cancel = _with_deadline(payload, time.monotonic() + pack_timeout)
+        answer = _run_with_timeout(run_gpt5_packed, pack_timeout, entries, payload, cancel=cancel)
+    except Exception as exc:
+        log.event("post", None, job_id=run.job_id, status="pack_error", skus=[c.sku for c in cards], message=str(exc))
+        answer = []
+    elapsed = (time.monotonic() - started) / len(cards)
 
+    by_sku = {card.sku: card for card in cards}
+    records: Dict[str, Tuple[Dict[str, Any], bool]] = {}
+    stats: Dict[str, Dict[Any, Dict[str, Any]]] = {"tiers": {}, "models": {}}
+    for entry in answer:
+        if not isinstance(entry, dict):
+            continue
+        sku = str(entry.get("sku", "")).strip()
+        if sku not in by_sku or sku in records:
+            continue
         try:
-            token_estimate = max(
-                1,
-                len(json.dumps(response_data, ensure_ascii=False)) // 4,
-            )
-        except Exception:  # pragma: no cover - defensive
-            token_estimate = 1
+            accepted = _accepts(_normalise(entry), model_tier)
+        except ValidationError:
+            continue
+        records[sku] = (entry, accepted)
+        card = by_sku[sku]
+        card.front, card.back = paths[sku]
+        card.hints["model_name"] = model_name
+        _count_step(stats, model_tier, edge, model_name, True, accepted, elapsed, _token_count(None, entry))
+        if accepted:
+            stats["models"][model_name]["accepted"] += 1
+    with run.lock:
+        run.pack_stats["cards"] += len(records)
+        run.pack_stats["fallbacks"] += len(cards) - len(records)
+        _merge_stats(run.ladder_stats, stats)
+    return records
+
+
+def _continue_ladder(run: _JobRun, card: _CardWork, packed: Dict[str, Any]) -> Dict[str, Any]:
+    """Take a packed answer that step 0 did not accept up the rest of the ladder.
+
+    The packed answer stands when no step is left or the next one fails, as
+    a failed later step does inside :func:`_call_escalating`.
+    """
+
+    if len(run.steps) < 2:
+        return packed
+    stats: Dict[str, Dict[Any, Dict[str, Any]]] = {"tiers": {}, "models": {}}
+    try:
+        response_data, card.front, card.back = _call_escalating(
+            card.image_source,
+            run.steps,
+            card.hints,
+            _card_deadline(run, card),
+            stats,
+            run.hedger,
+            start=1,
+        )
+        return response_data
+    except Exception as exc:
+        model_tier, edge = run.steps[1]
+        log.event(
+            "post",
+            card.sku,
+            job_id=run.job_id,
+            status="tier_error",
+            model=model_tier["model_name"],
+            tier=edge,
+            message=str(exc),
+        )
+        return packed
+    finally:
+        with run.lock:
+            _merge_stats(run.ladder_stats, stats)
+
+
+def _merge_stats(total: Dict[Any, Any], part: Dict[Any, Any]) -> None:
+    """Add the nested counters of ``part`` into ``total``."""
+
+    for key, value in part.items():
+        if isinstance(value, dict):
+            _merge_stats(total.setdefault(key, {}), value)
+        else:
+            total[key] = total.get(key, 0) + value
+
+
+def _card_deadline(run: _JobRun, card: _CardWork) -> float:
+    """The card's one ``per_item_timeout`` deadline, started by its first call."""
 
-        _write_outputs(result_root, sku, record, needs_review)
-        summary = _summarise(record, needs_review, token_estimate)
+    if card.deadline is None:
+        card.deadline = time.monotonic() + run.timeout
+    return card.deadline
+
+
+def _first_pass(run: _JobRun, card: _CardWork) -> Tuple[Dict[str, Any], bool]:
+    """Initial provider call (or mock) for one card; returns ``(response, failed)``."""
+
+    sku = card.sku
+    capsule = card.hints.get("capsule", {})
+    if not run.uses_provider:
+        return _fake_model_response(sku, capsule), False
+    stats: Dict[str, Dict[Any, Dict[str, Any]]] = {"tiers": {}, "models": {}}
+    try:
+        response_data, card.front, card.back = _call_escalating(
+            card.image_source,
+            run.steps,
+            card.hints,
+            _card_deadline(run, card),
+            stats,
+            run.hedger,
+        )
+        return response_data, False
+    except MissingAPIKey:
         log.event(
             "post",
             sku,
-            job_id=job_id,
-            status="needs_review" if needs_review else "ok",
-            summary=summary,
-            tokens=token_estimate,
+            job_id=run.job_id,
+            status="error",
+            message="Missing AG5_API_KEY",
         )
-        print(f"[POST] {sku}: {summary}")
+    except (concurrent.futures.TimeoutError, TimeoutError):
+        # Distinct classes before Python 3.11; the provider's DeadlineExceeded is a TimeoutError.
+        log.event(
+            "post",
+            sku,
+            job_id=run.job_id,
+            status="timeout",
+            message=f"Provider timed out after {run.timeout}s",
+        )
+    except Exception as exc:  # pragma: no cover - defensive
+        log.event("post", sku, job_id=run.job_id, status="error", message=str(exc))
+    finally:
+        with run.lock:
+            _merge_stats(run.ladder_stats, stats)
+    return _fake_model_response(sku, capsule), True
+
+
+def _finish_card(run: _JobRun, card: _CardWork, response_data: Dict[str, Any], provider_failed: bool) -> None:
+    sku = card.sku
+    hint_payload = card.hints
+    likely_cat = hint_payload.get("capsule", {}).get("likely_cat")
+    entry: Dict[str, Any] = {"sku": sku, "response": response_data, "likely_cat": likely_cat}
+    try:
+        record = _normalise(response_data)
+    except ValidationError as exc:
+        log.event("post", sku, job_id=run.job_id, status="schema_error", message=str(exc))
+        record = _normalise(_fake_model_response(sku, {"likely_cat": likely_cat}))
+    _canonicalise(run, sku, record)
+    needs_review = _needs_retry(record)
+
+    if provider_failed:
+        with run.lock:
+            run.failures += 1
+            if run.failures >= run.max_failures:
+                run.abort = True
+
+    if needs_review and run.uses_provider:
+        try:
+            record, needs_review, entry["retry"] = _retry_record(
+                record,
+                hint_payload,
+                card.front,
+                card.full_back or card.back,
+                run.config,
+                _card_deadline(run, card),
+                run.hedger,
+            )
+            if _canonicalise(run, sku, record):
+                needs_review = _needs_retry(record)
+        except Exception as exc:  # pragma: no cover - defensive
+            log.event("post", sku, job_id=run.job_id, status="retry_error", message=str(exc))
+
+    try:
+        token_estimate = max(
+            1,
+            len(json.dumps(response_data, ensure_ascii=False)) // 4,
+        )
+    except Exception:  # pragma: no cover - defensive
+        token_estimate = 1
+
+    if run.leases is not None and not run.leases.commit(sku, {"record": record, "needs_review": needs_review}):
+        log.event("post", sku, job_id=run.job_id, status="duplicate", message="Already committed by another worker")
+        return
+    if run.archive is not None:
+        run.archive.add(entry)
+    with run.lock:
+        _record_card(run, card, record, needs_review, provider_failed, token_estimate)
+
+
+def _canonicalise(run: _JobRun, sku: str, record: Dict[str, Any]) -> bool:
+    changes = _snap_names(record, run.canonical)
+    if not changes:
+        return False
+    ambiguous = sum(change["ambiguous"] for change in changes)
+    with run.lock:
+        run.canonical_stats["snapped"] += len(changes) - ambiguous
+        run.canonical_stats["ambiguous"] += ambiguous
+    log.event("post", sku, job_id=run.job_id, status="canonical", changes=changes)
+    return True
+
+
+def _record_card(
+    run: _JobRun,
+    card: _CardWork,
+    record: Dict[str, Any],
+    needs_review: bool,
+    provider_failed: bool,
+    token_estimate: int,
+) -> None:
+    """Catalog, learn from and write out a finished card (caller holds ``run.lock``)."""
+
+    sku = card.sku
+    if (
+        run.catalog is not None
+        and card.signature is not None
+        and card.duplicate_of is None
+        and not needs_review
+        and not provider_failed
+        and not record.get("serial")
+        and not record.get("auto")
+    ):
+        # Numbered and signed cards are one of a kind, so they never stand in for another scan.
+        run.catalog.add(sku, card.signature, record)
+    if run.templates is not None and card.back_signature is not None and not needs_review and not provider_failed:
+        _learn_back_template(run, card, record)
+
+    _write_outputs(run.result_root, sku, record, needs_review, append_csv=run.leases is None)
+    summary = _summarise(record, needs_review, token_estimate)
+    log.event(
+        "post",
+        sku,
+        job_id=run.job_id,
+        status="needs_review" if needs_review else "ok",
+        summary=summary,
+        tokens=token_estimate,
+    )
+    print(f"[POST] {sku}: {summary}")
+    run.processed += 1
+    run.reviewed += int(needs_review)
+
+
+def _process_group(run: _JobRun, group: List[Dict[str, Any]]) -> None:
+    """Prepare, gate, dedupe, call and finish one pack group of cards."""
+
+    cards = []
+    try:
+        for item in group:
+            card = _prepare_card(run, item)
+            reason = _quality_reason(run, card)
+            if reason:
+                card.close()
+                _reject_card(run, card, reason)
+                continue
+            cards.append(card)
+        responses: Dict[str, Dict[str, Any]] = {}
+        for card in cards:
+            with run.lock:
+                duplicate = _lookup_duplicate(run, card)
+            if duplicate is not None:
+                responses[card.sku] = duplicate
+        fresh = [card for card in cards if card.sku not in responses]
+        packed = _call_packed(run, fresh) if len(fresh) > 1 else {}
+        for card in cards:
+            if run.abort:
+                break
+            if card.sku in responses:
+                response_data, provider_failed = responses[card.sku], False
+            elif card.sku in packed:
+                response_data, accepted = packed[card.sku]
+                if not accepted:
+                    response_data = _continue_ladder(run, card, response_data)
+                provider_failed = False
+            else:
+                response_data, provider_failed = _first_pass(run, card)
+            _finish_card(run, card, response_data, provider_failed)
+            card.close()
+    finally:
+        for card in cards:
+            card.close()
+
+
+def _group_cost(run: _JobRun, group: List[Dict[str, Any]]) -> int:
+    """Estimated peak bytes a group holds while in flight (see ``estimate_inflight_bytes``)."""
+
+    decode = bool(run.config.get("compress_images", True))
+    max_edge = int(run.config.get("image_max_edge", 1024))
+    total = 0
+    for item in group:
+        try:
+            front, back = _find_front_back(run.ready / item["sku"], item.get("images", []))
+            prepared = _prepared_pair(front, back, max_edge, run.config, run.hashes) if decode and not run.tiers else None
+            if prepared is not None:
+                total += sum(estimate_inflight_bytes(path, False) for path in prepared)
+            else:
+                sources = [front] if back == front else [front, back]
+                total += sum(estimate_inflight_bytes(path, decode) for path in sources)
+        except OSError:
+            continue
+    return total
+
+
+def _job_summary(run: _JobRun) -> Dict[str, Any]:
+    job_summary: Dict[str, Any] = {"processed": run.processed, "needs_review": run.reviewed}
+    if run.ladder_stats["tiers"]:
+        job_summary["tiers"] = _tier_summary(run.ladder_stats["tiers"])
+    if len(_cascade_models(run.config)) > 1:
+        job_summary["models"] = _model_summary(run.ladder_stats["models"])
+    if run.pack_stats["requests"]:
+        job_summary["packed"] = dict(run.pack_stats)
+    if run.config.get("quality_gate"):
+        job_summary["rejected"] = run.rejected
+    if run.catalog is not None:
+        job_summary["duplicates"] = run.duplicates
+    if run.templates is not None:
+        job_summary["back_templates"] = dict(run.template_stats)
+    if run.canonical is not None:
+        job_summary["canonical"] = dict(run.canonical_stats)
+    stream_stats = run.ladder_stats.get("stream")
+    if stream_stats:
+        calls = stream_stats["calls"]
+        job_summary["streaming"] = {
+            "calls": calls,
+            "aborted": stream_stats["aborted"],
+            "avg_ttft_s": round(stream_stats["ttft_s"] / calls, 3),
+            "avg_generation_s": round(stream_stats["generation_s"] / calls, 3),
+        }
+    if run.hedger is not None:
+        job_summary["hedging"] = run.hedger.summary()
+    if run.leases is not None:
+        job_summary["worker"] = {"id": run.leases.worker, "stolen": run.leases.stolen, "lost": run.leases.lost}
+    if run.memory is not None:
+        job_summary["memory"] = {
+            "budget_mb": round(run.memory.limit_bytes / 2**20, 2),
+            "peak_mb": round(run.memory.peak / 2**20, 2),
+            "waits": run.memory.waits,
+        }
+    return job_summary
+
+
+def _start_run(
+    job_id: str,
+    config: Dict[str, Any],
+    project_root: Path,
+    ready: str,
+    batches: str,
+    outroot: str,
+    error: str,
+    worker: Optional[str] = None,
+) -> Tuple[_JobRun, Iterator[List[Dict[str, Any]]]]:
+    """Set up one job's run state and its lazily read pack groups.
+
+    A plain run clears the job's previous results. A distributed ``worker``
+    keeps them, since other workers share the results folder, and claims
+    cards through the job's lease directory.
+    """
+
+    batch_file = Path(batches) / f"{job_id}.jsonl"
+    job_dir = Path(outroot) / job_id
+    result_root = job_dir / RESULT_SUBDIR
+    if worker is None:
+        for stale in (result_root, job_dir / LEASES_SUBDIR):
+            if stale.exists():
+                shutil.rmtree(stale)
+
+    tiers = _resolution_tiers(config)
+    run = _JobRun(
+        job_id=job_id,
+        config=config,
+        project_root=project_root,
+        ready=Path(ready),
+        error=Path(error),
+        result_root=result_root,
+        timeout=int(config.get("per_item_timeout", DEFAULT_CONFIG["per_item_timeout"])),
+        max_failures=int(config.get("max_failures", DEFAULT_CONFIG["max_failures"])),
+        tiers=tiers,
+        steps=_escalation_steps(_cascade_models(config), tiers),
+        canonical=_canonical_settings(config),
+        reader=BatchReader(batch_file),
+    )
+    run.progress = Progress(
+        run.reader.total, float(config.get("progress_interval_s", DEFAULT_CONFIG["progress_interval_s"]))
+    )
+    pack_size = int(config.get("pack_size") or 1) if run.uses_provider else 1
+    if run.uses_provider:
+        run.hedger = _make_hedger(config)
+    if config.get("dedupe") and run.uses_provider:
+        run.catalog = PhashStore(PHASH_DB, "fronts")
+    if config.get("back_templates") in TEMPLATE_MODES and run.uses_provider:
+        run.templates = PhashStore(PHASH_DB, "backs")
+    if worker is not None:
+        run.leases = LeaseStore(job_dir / LEASES_SUBDIR, worker, float(config.get("lease_s") or 60))
+    if config.get("archive_responses", True):
+        name = ARCHIVE_NAME if worker is None else part_name(worker)
+        run.archive = ResponseArchive(job_dir / name)
+    if prepare.derivative_edges(config):
+        run.hashes = ContentManifest()
+    return run, _pack_groups(run.reader, pack_size)
 
-    if abort_remaining:
-        message = f"Aborted remaining SKUs after {failures} provider failure(s)."
-        log.event("post", None, job_id=job_id, status="aborted", message=message)
+
+def _finish_run(run: _JobRun) -> str:
+    for store in (run.catalog, run.templates, run.archive, run.hashes):
+        if store is not None:
+            store.close()
+    if run.archive is not None and run.leases is None:
+        # The plain run's archive now covers the whole job; earlier worker parts are stale.
+        for part in archive_parts(run.archive.path.parent):
+            if part.name != ARCHIVE_NAME:
+                part.unlink()
+                index_path(part).unlink()
+
+    job_summary = _job_summary(run)
+    log.event("post", None, job_id=run.job_id, status="summary", **job_summary)
+    print(f"[POST] Summary: {json.dumps(job_summary, ensure_ascii=False)}")
+
+    if run.abort:
+        message = f"Aborted remaining SKUs after {run.failures} provider failure(s)."
+        log.event("post", None, job_id=run.job_id, status="aborted", message=message)
         print(f"[POST] {message}")
 
+    return str(run.result_root)
+
+
+def _make_scheduler(config: Dict[str, Any]) -> Optional[FairScheduler]:
+    if not (config.get("fair_schedule") or config.get("box_priorities")):
+        return None
+    return FairScheduler(
+        config.get("box_priorities") or {},
+        float(config.get("priority_aging_s") or DEFAULT_CONFIG["priority_aging_s"]),
+    )
+
+
+def pending_jobs(
+    batches: str = "pipeline/output/batches", outroot: str = "pipeline/output", unfinished: bool = False
+) -> List[str]:
+    """Queued job ids that have no results yet, oldest batch file first.
+
+    With ``unfinished``, jobs that distributed workers started but have not
+    finalised are included too.
+    """
+
+    pending = []
+    for path in sorted(Path(batches).glob("*.jsonl"), key=lambda path: (path.stat().st_mtime_ns, path.name)):
+        job_dir = Path(outroot) / path.stem
+        if not (job_dir / RESULT_SUBDIR).exists():
+            pending.append(path.stem)
+        elif unfinished and (job_dir / LEASES_SUBDIR).exists() and not (job_dir / LEASES_SUBDIR / FINAL_MARKER).exists():
+            pending.append(path.stem)
+    return pending
+
+
+def _finalize_shared(run: _JobRun, batch_file: Path, chunk: int = 500) -> bool:
+    """Write the job's CSV once every card is committed; only one worker does it.
+
+    The batch file is streamed twice (check, then write) and rows are
+    appended ``chunk`` at a time, so memory does not grow with the job.
+    A card whose worker died between committing and writing its JSON/TXT
+    gets them rebuilt from the committed record.
+    """
+
+    assert run.leases is not None
+
+    def skus() -> Iterator[str]:
+        return (item["sku"] for item in BatchReader(batch_file))
+
+    if not all(run.leases.is_committed(sku) for sku in skus()) or not run.leases.finalize():
+        return False
+    csv_path = run.result_root / "csv" / "batch.csv"
+    csv_path.unlink(missing_ok=True)
+    written = 0
+
+    def rows() -> Iterator[Dict[str, Any]]:
+        for sku in skus():
+            result = run.leases.committed(sku) or {}
+            if "record" not in result:
+                continue
+            record, needs_review = result["record"], bool(result.get("needs_review"))
+            if not all((run.result_root / kind / f"{sku}.{kind}").exists() for kind in ("json", "txt")):
+                _write_outputs(run.result_root, sku, record, needs_review, append_csv=False)
+                log.event("post", sku, job_id=run.job_id, status="restored", worker=result.get("worker"))
+            yield _csv_row(record, needs_review)
+
+    pending = rows()
+    while True:
+        block = list(itertools.islice(pending, chunk))
+        if not block:
+            break
+        _append_csv(csv_path, block)
+        written += len(block)
+    log.event("post", None, job_id=run.job_id, status="finalized", worker=run.leases.worker, cards=written)
+    return True
+
+
+def _report_progress(run: _JobRun) -> None:
+    """Log the job's position in its batch file, at most every ``progress_interval_s``."""
+
+    reader, progress = run.reader, run.progress
+    if reader is None or progress is None:
+        return
+    with run.lock:
+        cards = run.processed + run.rejected
+        if reader.exhausted and reader.items:
+            # Everything is read (or was read up front for the scheduler): count finished cards.
+            done = reader.total * min(1.0, cards / reader.items)
+        else:
+            done = reader.offset
+        report = progress.update(int(done))
+    if report is None:
+        return
+    report["cards"] = cards
+    log.event("post", None, job_id=run.job_id, status="progress", **report)
+    print(f"[POST] Progress {run.job_id}: {json.dumps(report, ensure_ascii=False)}")
+
+
+def process_batches(
+    job_ids: List[str],
+    ready: str = "Scans_Ready",
+    batches: str = "pipeline/output/batches",
+    outroot: str = "pipeline/output",
+    error: str = "Scans_Error",
+    worker: Optional[str] = None,
+) -> List[str]:
+    """Post-process several jobs with one pool of workers.
+
+    With ``fair_schedule`` or ``box_priorities`` set, every job's pack groups
+    go into one :class:`~pipeline.scheduler.FairScheduler` keyed by box, and
+    workers pull the next group from it, so a rush box is served as soon as a
+    worker is free. Otherwise jobs run one after another in file order.
+    Each job keeps its own results, archive, failure budget and summary.
+
+    With ``worker`` set, this process is one of several sharing the jobs
+    (possibly on other machines): each card is claimed through a lease
+    before it is processed, committed exactly once, and cards held by
+    other live workers are polled every ``lease_poll_s`` until they are
+    committed or their lease expires. The last worker writes the job CSV.
+
+    Batch files are read lazily as workers free up, so memory stays flat
+    however many SKUs a job holds (the scheduler is the exception: it needs
+    every group up front to rank boxes). A ``progress`` event with the byte
+    offset reached and an ETA is logged every ``progress_interval_s``.
+    """
+
+    for job_id in job_ids:
+        if not (Path(batches) / f"{job_id}.jsonl").exists():
+            raise FileNotFoundError(Path(batches) / f"{job_id}.jsonl")
+    project_root = Path.cwd()
+    _load_env(project_root)
+    config = _load_config()
+    if config.get("retry_mode") not in RETRY_MODES:
+        config["retry_mode"] = DEFAULT_CONFIG["retry_mode"]
+    TMP_DIR.mkdir(parents=True, exist_ok=True)
+
+    runs = [_start_run(job_id, config, project_root, ready, batches, outroot, error, worker) for job_id in job_ids]
+    scheduler = _make_scheduler(config)
+    queue: Deque[Tuple[_JobRun, List[Dict[str, Any]]]] = collections.deque()
+    deferred: List[Tuple[_JobRun, List[Dict[str, Any]]]] = []
+    poll_s = float(config.get("lease_poll_s") or DEFAULT_CONFIG["lease_poll_s"])
+
+    def submit(run: _JobRun, group: List[Dict[str, Any]]) -> None:
+        if scheduler is not None:
+            scheduler.submit(box_of(group[0]["sku"]), (run, group))
+        else:
+            queue.append((run, group))
+
+    def job_groups() -> Iterator[Tuple[_JobRun, List[Dict[str, Any]]]]:
+        for run, groups in runs:
+            for group in groups:
+                yield run, group
+
+    unread = job_groups()
+    if scheduler is not None:
+        for work in unread:
+            submit(*work)
+
+    def next_group() -> Optional[Tuple[_JobRun, List[Dict[str, Any]]]]:
+        while True:
+            if scheduler is not None:
+                work = scheduler.next()
+            else:
+                work = queue.popleft() if queue else next(unread, None)
+            if work is None:
+                if not deferred:
+                    return None
+                time.sleep(poll_s)
+                for waiting in deferred:
+                    submit(*waiting)
+                deferred.clear()
+                continue
+            run, group = work
+            if run.abort:
+                continue
+            if run.leases is None:
+                return work
+            claimed, waiting = [], []
+            for item in group:
+                if run.leases.claim(item["sku"]):
+                    claimed.append(item)
+                elif not run.leases.is_committed(item["sku"]):
+                    waiting.append(item)
+            if waiting:
+                deferred.append((run, waiting))
+            if claimed:
+                return run, claimed
+
+    def run_group(run: _JobRun, group: List[Dict[str, Any]]) -> None:
+        try:
+            _process_group(run, group)
+        finally:
+            if run.leases is not None:
+                for item in group:
+                    run.leases.release(item["sku"])
+            _report_progress(run)
+
+    stores = [run.leases for run, _ in runs if run.leases is not None]
+    lease_s = float(config.get("lease_s") or DEFAULT_CONFIG["lease_s"])
+    heartbeat = Heartbeat(stores, lease_s / 3) if stores else contextlib.nullcontext()
+    uses_provider = any(run.uses_provider for run, _ in runs)
+    concurrency = max(1, int(config.get("concurrency") or 1)) if uses_provider else 1
+    with heartbeat:
+        if concurrency == 1:
+            work = next_group()
+            while work is not None:
+                run_group(*work)
+                work = next_group()
+        else:
+            budget_mb = config.get("memory_budget_mb")
+            memory = MemoryBudget(int(float(budget_mb) * 1024 * 1024)) if budget_mb else None
+            for run, _ in runs:
+                run.memory = memory
+
+            def admitted(run: _JobRun, group: List[Dict[str, Any]], cost: int) -> None:
+                try:
+                    run_group(run, group)
+                finally:
+                    if memory is not None:
+                        memory.release(cost)
+
+            with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as pool:
+                # Only ``concurrency`` futures are ever held, so memory stays flat with job size.
+                in_flight: Set[concurrent.futures.Future] = set()
+                while True:
+                    if len(in_flight) >= concurrency:
+                        done, in_flight = concurrent.futures.wait(
+                            in_flight, return_when=concurrent.futures.FIRST_COMPLETED
+                        )
+                        for future in done:
+                            future.result()
+                    work = next_group()
+                    if work is None:
+                        break
+                    run, group = work
+                    cost = _group_cost(run, group) if memory is not None else 0
+                    if memory is not None:
+                        memory.acquire(cost)
+                    in_flight.add(pool.submit(admitted, run, group, cost))
+                for future in concurrent.futures.as_completed(in_flight):
+                    future.result()
+
+    if scheduler is not None:
+        boxes = scheduler.summary()
+        log.event("post", None, status="schedule", jobs=list(job_ids), boxes=boxes)
+        print(f"[POST] Schedule: {json.dumps(boxes, ensure_ascii=False)}")
+    for run, _ in runs:
+        if run.leases is not None:
+            _finalize_shared(run, Path(batches) / f"{run.job_id}.jsonl")
+    return [_finish_run(run) for run, _ in runs]
+
+
+def process_batch(
+    job_id: str,
+    ready: str = "Scans_Ready",
+    batches: str = "pipeline/output/batches",
+    outroot: str = "pipeline/output",
+    error: str = "Scans_Error",
+) -> str:
+    return process_batches([job_id], ready=ready, batches=batches, outroot=outroot, error=error)[0]
+
+
+def _replay_entry(
+    entry: Dict[str, Any],
+    record: Optional[Dict[str, Any]],
+    canonical: Optional[Tuple[str, float, float, float]] = None,
+) -> Tuple[Dict[str, Any], bool, Optional[str]]:
+    """Rebuild one archived card the way :func:`_finish_card` built it."""
+
+    error = None
+    if record is None:
+        try:
+            record = _normalise(entry["response"])
+        except ValidationError as exc:
+            error = str(exc)
+            record = _normalise(_fake_model_response(entry["sku"], {"likely_cat": entry.get("likely_cat")}))
+    _snap_names(record, canonical)
+    needs_review = _needs_retry(record)
+    if needs_review and entry.get("retry"):
+        try:
+            record, needs_review = _apply_retry(record, entry["retry"])
+            if _snap_names(record, canonical):
+                needs_review = _needs_retry(record)
+        except ValidationError:
+            pass
+    return record, needs_review, error
+
+
+def _replay_block(
+    path: str,
+    block: Tuple[int, int],
+    canonical: Optional[Tuple[str, float, float, float]] = None,
+) -> List[Tuple[Dict[str, Any], Dict[str, Any], bool, Optional[str]]]:
+    """Re-normalise one archive block; the unit of work for the replay pool."""
+
+    entries = read_block(Path(path), block)
+    try:
+        records: List[Optional[Dict[str, Any]]] = list(_normalise_many([entry["response"] for entry in entries]))
+    except ValidationError:
+        records = [None] * len(entries)
+    return [(entry, *_replay_entry(entry, record, canonical)) for entry, record in zip(entries, records)]
+
+
+def replay_batch(job_id: str, outroot: str = "pipeline/output", workers: Optional[int] = None) -> str:
+    """Rebuild a job's records and outputs from its response archive.
+
+    No provider is called: archived first-pass and retry answers are
+    re-normalised with the current schema and vocabulary, blocks (of the
+    archive and any distributed workers' parts) are spread over a process
+    pool of ``workers`` (default: all cores) and the outputs are rewritten
+    in archive order.
+    """
+
+    parts = archive_parts(Path(outroot) / job_id)
+    if not parts:
+        raise FileNotFoundError(Path(outroot) / job_id / ARCHIVE_NAME)
+    blocks = [(str(part), block) for part in parts for block in read_index(part)["blocks"]]
+    canonical = _canonical_settings(_load_config())
+    result_root = Path(outroot) / job_id / RESULT_SUBDIR
+    if result_root.exists():
+        shutil.rmtree(result_root)
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(blocks) or 1))
+    started = time.monotonic()
+    if workers == 1:
+        results = (_replay_block(part, block, canonical) for part, block in blocks)
+        pool = None
+    else:
+        pool = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+        results = pool.map(
+            _replay_block, [part for part, _ in blocks], [block for _, block in blocks], [canonical] * len(blocks)
+        )
+
+    processed = reviewed = schema_errors = 0
+    try:
+        for rebuilt in results:
+            for entry, record, needs_review, error in rebuilt:
+                sku = entry["sku"]
+                if error is not None:
+                    log.event("post", sku, job_id=job_id, status="schema_error", message=error, replay=True)
+                    schema_errors += 1
+                token_estimate = max(1, len(json.dumps(entry["response"], ensure_ascii=False)) // 4)
+                _write_outputs(result_root, sku, record, needs_review)
+                log.event(
+                    "post",
+                    sku,
+                    job_id=job_id,
+                    status="needs_review" if needs_review else "ok",
+                    summary=_summarise(record, needs_review, token_estimate),
+                    tokens=token_estimate,
+                    replay=True,
+                )
+                processed += 1
+                reviewed += int(needs_review)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    job_summary = {
+        "processed": processed,
+        "needs_review": reviewed,
+        "schema_errors": schema_errors,
+        "workers": workers,
+        "elapsed_s": round(time.monotonic() - started, 2),
+    }
+    log.event("post", None, job_id=job_id, status="summary", replay=True, **job_summary)
+    print(f"[POST] Replay summary: {json.dumps(job_summary, ensure_ascii=False)}")
     return str(result_root)
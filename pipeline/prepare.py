@@ -0,0 +1,182 @@
+"""Ingest-time preparation of provider-ready image derivatives.
+
+``pipeline.run pair --prepare`` writes WebP derivatives for every edge size
+``post`` will ask for into ``Scans_Ready/<SKU>/prepared/`` together with a
+``prepared.json`` manifest. Entries are keyed by source file name and
+validated against the source size and mtime and the crop settings, so
+``post`` only reuses derivatives that still match the scan and config.
+When only the mtime moved (a scan copied or touched again), the content
+hash kept by :mod:`pipeline.utils.manifest` decides instead, so identical
+bytes keep their derivatives.
+"""
+from __future__ import annotations
+
+import concurrent.futures
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from pipeline.utils import log
+from pipeline.utils.images import TieredImage
+from pipeline.utils.manifest import ContentManifest, content_hash
+
+PREPARED_SUBDIR = "prepared"
+MANIFEST_NAME = "prepared.json"
+SCAN_SUFFIXES = {".jpg", ".jpeg", ".png", ".tif", ".tiff"}
+
+
+def derivative_edges(config: Dict[str, Any]) -> List[int]:
+    if not config.get("compress_images", True):
+        return []
+    edges = {int(config.get("image_max_edge", 1024))}
+    edges.update(int(edge) for edge in config.get("image_tiers") or [])
+    return sorted(edges)
+
+
+def _settings(config: Dict[str, Any]) -> Dict[str, Any]:
+    crop = bool(config.get("crop_borders"))
+    return {
+        "crop_margin": float(config.get("crop_margin", 0.02)) if crop else None,
+        "deskew": bool(config.get("deskew")) if crop else False,
+    }
+
+
+def _source_stat(path: Path) -> Dict[str, int]:
+    stat = path.stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _unchanged(entry: Dict[str, Any], stat: Dict[str, int], digest: Optional[str]) -> bool:
+    """Whether ``entry`` still describes a source with ``stat`` and content ``digest``."""
+
+    if entry.get("size") == stat["size"] and entry.get("mtime_ns") == stat["mtime_ns"]:
+        return True
+    return digest is not None and digest == entry.get("hash")
+
+
+def _manifest_path(folder: Path) -> Path:
+    return folder / PREPARED_SUBDIR / MANIFEST_NAME
+
+
+def read_manifest(folder: Path) -> Dict[str, Any]:
+    path = _manifest_path(folder)
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def _write_manifest(folder: Path, manifest: Dict[str, Any]) -> None:
+    path = _manifest_path(folder)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def scan_files(folder: Path) -> List[Path]:
+    return sorted(
+        path for path in folder.iterdir() if path.is_file() and path.suffix.lower() in SCAN_SUFFIXES
+    )
+
+
+def prepare_sku(folder: Path, config: Dict[str, Any], hashes: Optional[Dict[str, str]] = None) -> int:
+    """Bring the derivatives for one SKU folder up to date; returns files written.
+
+    ``hashes`` maps resolved source paths to manifest digests; sources not in
+    it are hashed here.
+    """
+
+    edges = derivative_edges(config)
+    if not edges:
+        return 0
+    settings = _settings(config)
+    manifest = read_manifest(folder)
+    if manifest.get("settings") != settings:
+        manifest = {"settings": settings, "sources": {}}
+    sources: Dict[str, Any] = manifest.setdefault("sources", {})
+    out_dir = folder / PREPARED_SUBDIR
+    written = 0
+    for src in scan_files(folder):
+        stat = _source_stat(src)
+        entry = sources.get(src.name) or {}
+        derivatives = entry.get("derivatives") or {}
+        digest = (hashes or {}).get(str(src.resolve()))
+        current = _unchanged(entry, stat, digest) and all(
+            (out_dir / derivatives.get(str(edge), "")).is_file() for edge in edges
+        )
+        if current:
+            if entry.get("size") != stat["size"] or entry.get("mtime_ns") != stat["mtime_ns"]:
+                # Same bytes under a new mtime: keep the derivatives, refresh the stat.
+                entry.update(stat)
+            continue
+        tiered = TieredImage(src, out_dir, settings["crop_margin"], settings["deskew"])
+        try:
+            derivatives = {str(edge): tiered.path_for(edge).name for edge in edges}
+        finally:
+            tiered.close()
+        sources[src.name] = {**stat, "hash": digest or content_hash(src), "derivatives": derivatives}
+        written += len(derivatives)
+    _write_manifest(folder, manifest)
+    return written
+
+
+def prepare_many(
+    folders: Iterable[Path],
+    config: Dict[str, Any],
+    workers: int = 2,
+    hashes: Optional[Dict[str, str]] = None,
+) -> int:
+    """Prepare several SKU folders on a small thread pool; returns files written."""
+
+    folders = list(folders)
+    if not folders or not derivative_edges(config):
+        return 0
+    total = 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(prepare_sku, folder, config, hashes): folder for folder in folders}
+        for future in concurrent.futures.as_completed(futures):
+            folder = futures[future]
+            try:
+                written = future.result()
+            except Exception as exc:
+                log.event("prepare", folder.name, status="error", message=str(exc))
+                continue
+            total += written
+            log.event("prepare", folder.name, written=written)
+    return total
+
+
+def lookup(
+    src: Path, edge: int, config: Dict[str, Any], hashes: Optional[ContentManifest] = None
+) -> Optional[Path]:
+    """Prepared derivative of ``src`` at ``edge`` if it is still valid, else ``None``.
+
+    With ``hashes``, a source whose size or mtime moved is hashed again
+    (once; the manifest records the new stat) and still accepted when its
+    content matches the one the derivative was made from. Reading the scan
+    is far cheaper than decoding and re-encoding it.
+    """
+
+    folder = src.parent
+    manifest = read_manifest(folder)
+    if not manifest or manifest.get("settings") != _settings(config):
+        return None
+    entry = (manifest.get("sources") or {}).get(src.name)
+    if not entry:
+        return None
+    try:
+        stat = _source_stat(src)
+    except OSError:
+        return None
+    stale = entry.get("size") != stat["size"] or entry.get("mtime_ns") != stat["mtime_ns"]
+    if stale and not _unchanged(entry, stat, hashes.hash_of(src) if hashes is not None else None):
+        return None
+    name = (entry.get("derivatives") or {}).get(str(edge))
+    if not name:
+        return None
+    path = folder / PREPARED_SUBDIR / name
+    return path if path.is_file() else None
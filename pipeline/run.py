@@ -1,30 +1,64 @@
 import argparse
-from pipeline import watcher, batch_queue, postprocess
+from pipeline import watcher, batch_queue, postprocess, stream
+from pipeline.utils import leases
 
 def main():
     ap = argparse.ArgumentParser(description='Ageless Pipeline CLI')
     sub = ap.add_subparsers(dest='cmd', required=True)
 
-    sub.add_parser('pair', help='Pair front/back from Scans_Inbox to Scans_Ready')
+    pr = sub.add_parser('pair', help='Pair front/back from Scans_Inbox to Scans_Ready')
+    pr.add_argument('--prepare', action='store_true', help='Also write provider-ready image derivatives')
+    pr.add_argument('--workers', type=int, default=2, help='Threads used for hashing and --prepare')
 
     q = sub.add_parser('queue', help='Create batch job(s) from Scans_Ready')
-    q.add_argument('--batch-size', type=int, default=20)
+    q.add_argument('--batch-size', type=int, default=None, help='Cards per batch (default 20; a cap when budgeting)')
+    q.add_argument('--max-mb', type=float, default=None, help='Pack batches to this many MB of images to read')
+    q.add_argument('--max-tokens', type=int, default=None, help='Pack batches to this many estimated request tokens')
 
     p = sub.add_parser('post', help='Post-process a batch id')
-    p.add_argument('--job-id', required=True)
+    p.add_argument('--job-id', action='append', default=[], help='Job to process (repeat for several)')
+    p.add_argument('--pending', action='store_true', help='Process every queued job that has no results yet')
+    p.add_argument('--worker', action='store_true', help='Share the jobs with other workers through lease files')
+    p.add_argument('--worker-id', default=None, help='Name for this worker (default: host-pid-random)')
+    p.add_argument('--replay', action='store_true', help='Rebuild outputs from the archived raw responses, no provider calls')
+    p.add_argument('--workers', type=int, default=None, help='Processes used by --replay (default: all cores)')
+
+    st = sub.add_parser('stream', help='Pair, queue and post cards as they arrive in Scans_Inbox')
+    st.add_argument('--prepare', action='store_true', help='Also write provider-ready image derivatives')
+    st.add_argument('--idle-exit', type=float, default=None, help='Stop after this many seconds without new scans')
+    st.add_argument('--max-cards', type=int, default=None, help='Stop after pairing this many cards')
 
     args = ap.parse_args()
 
     if args.cmd == 'pair':
-        moved = watcher.process()
+        config = postprocess._load_config() if args.prepare else None
+        moved = watcher.process(prepare_config=config, workers=args.workers)
         print(f'Paired {moved} card(s).')
     elif args.cmd == 'queue':
-        jobs = batch_queue.build_batches(batch_size=args.batch_size)
+        budgeted = args.max_mb or args.max_tokens
+        jobs = batch_queue.build_batches(
+            batch_size=args.batch_size,
+            max_bytes=int(args.max_mb * 1024 * 1024) if args.max_mb else None,
+            max_tokens=args.max_tokens,
+            config=postprocess._load_config() if budgeted else None,
+        )
         for j in jobs:
             print(j)
     elif args.cmd == 'post':
-        out = postprocess.process_batch(args.job_id)
-        print(out)
+        job_ids = list(args.job_id)
+        if args.pending:
+            job_ids += [j for j in postprocess.pending_jobs(unfinished=args.worker) if j not in job_ids]
+        if not job_ids:
+            ap.error('post needs --job-id or --pending')
+        if args.replay:
+            outs = [postprocess.replay_batch(j, workers=args.workers) for j in job_ids]
+        else:
+            worker = (args.worker_id or leases.worker_name()) if args.worker else None
+            outs = postprocess.process_batches(job_ids, worker=worker)
+        for out in outs:
+            print(out)
+    elif args.cmd == 'stream':
+        print(stream.run_stream(prepare_derivatives=args.prepare, idle_exit=args.idle_exit, max_cards=args.max_cards))
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,96 @@
+"""Priority and fair-share scheduling of queued work across boxes.
+
+Work is submitted under a key (the SKU's box). :meth:`FairScheduler.next`
+hands out the next item from the box with the highest effective level:
+its configured priority plus one level for every ``aging_s`` seconds it
+has waited since it was last served, so low-priority boxes are never
+starved. Boxes on the same level share workers fairly: the one served
+least so far goes first. Items within a box keep submission order.
+"""
+from __future__ import annotations
+
+import collections
+import threading
+import time
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from pipeline.utils import naming
+
+
+def box_of(sku: str) -> str:
+    try:
+        return naming.parse_sku(sku)["box"]
+    except ValueError:
+        return ""
+
+
+class FairScheduler:
+    """Thread-safe work-conserving queue; ``next`` never waits while work is queued."""
+
+    def __init__(
+        self,
+        priorities: Optional[Dict[str, int]] = None,
+        aging_s: float = 120.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.priorities = {str(key): int(level) for key, level in (priorities or {}).items()}
+        self.aging_s = float(aging_s)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._queues: Dict[str, Deque[Tuple[float, Any]]] = collections.OrderedDict()
+        self._served: Dict[str, int] = {}
+        self._last_served: Dict[str, float] = {}
+        self._started = clock()
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(queue) for queue in self._queues.values())
+
+    def submit(self, key: str, item: Any) -> None:
+        now = self._clock()
+        with self._lock:
+            self._queues.setdefault(key, collections.deque()).append((now, item))
+            stats = self._stats.setdefault(
+                key, {"priority": self.priorities.get(key, 0), "items": 0, "first_s": None, "last_s": None}
+            )
+            stats["items"] += 1
+
+    def level(self, key: str, now: Optional[float] = None) -> int:
+        """Priority of ``key`` plus its aging bonus at ``now``."""
+
+        now = self._clock() if now is None else now
+        queue = self._queues.get(key)
+        if not queue:
+            return self.priorities.get(key, 0)
+        waiting_since = max(queue[0][0], self._last_served.get(key, queue[0][0]))
+        bonus = int((now - waiting_since) / self.aging_s) if self.aging_s > 0 else 0
+        return self.priorities.get(key, 0) + bonus
+
+    def next(self) -> Optional[Any]:
+        """Pop the next item, or ``None`` when nothing is queued."""
+
+        with self._lock:
+            now = self._clock()
+            candidates = [key for key, queue in self._queues.items() if queue]
+            if not candidates:
+                return None
+            key = min(
+                candidates,
+                key=lambda key: (-self.level(key, now), self._served.get(key, 0), self._queues[key][0][0]),
+            )
+            _, item = self._queues[key].popleft()
+            self._served[key] = self._served.get(key, 0) + 1
+            self._last_served[key] = now
+            stats = self._stats[key]
+            offset = round(now - self._started, 3)
+            if stats["first_s"] is None:
+                stats["first_s"] = offset
+            stats["last_s"] = offset
+            return item
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Per box: priority, items, and when its first and last item were handed out."""
+
+        with self._lock:
+            return {key: dict(stats) for key, stats in self._stats.items()}
@@ -2,9 +2,9 @@
 from __future__ import annotations
 
 from enum import Enum
-from typing import Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional
 
-from pydantic import BaseModel, Field, ConfigDict, field_validator, model_validator
+from pydantic import BaseModel, Field, ConfigDict, ValidationError, field_validator, model_validator
 from pydantic_core import PydanticUndefined
 
 
@@ -49,6 +49,14 @@ CONDITION_ALIASES = {
     "raw-estimate": Condition.RAW,
 }
 
+# Flat lookups keyed by the stripped, lower-cased input; each also covers the
+# enum values themselves so one dict hit replaces alias-then-enum dispatch.
+_CATEGORY_LOOKUP = {**{member.value: member for member in Category}, **CATEGORY_ALIASES}
+_CONDITION_LOOKUP = {
+    **{member.value.lower(): member for member in Condition if member.value == member.value.upper()},
+    **CONDITION_ALIASES,
+}
+
 OPTIONAL_STR_FIELDS = (
     "brand",
     "set",
@@ -61,6 +69,90 @@ OPTIONAL_STR_FIELDS = (
 )
 
 
+REQUIRED_FIELDS = ("sku", "cat", "conf")
+
+
+# Field normalisers shared by the ``CardRecord`` validators and the bulk
+# ``dump_records`` path, so both accept exactly the same inputs.
+def _is_unset(value: Any) -> bool:
+    return value is None or value is PydanticUndefined
+
+
+def _norm_sku(value: Any) -> str:
+    return value.strip() if isinstance(value, str) else str(value)
+
+
+def _norm_category(value: Any) -> Category:
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return Category.OTHER
+    return _CATEGORY_LOOKUP.get(str(value).strip().lower(), Category.OTHER)
+
+
+def _norm_condition(value: Any) -> Optional[Condition]:
+    if _is_unset(value) or (isinstance(value, str) and not value.strip()):
+        return None
+    return _CONDITION_LOOKUP.get(str(value).strip().lower())
+
+
+def _norm_year(value: Any) -> Optional[int]:
+    if value in (None, ""):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _norm_grade(value: Any) -> str:
+    if value in (None, "") or value is PydanticUndefined:
+        return "raw"
+    return str(value).strip() or "raw"
+
+
+def _norm_text(value: Any) -> Optional[str]:
+    if _is_unset(value):
+        return None
+    if isinstance(value, str):
+        return value.strip() or None
+    return str(value)
+
+
+def _norm_number(value: Any) -> Optional[str]:
+    if _is_unset(value):
+        return None
+    return str(value).strip() or None
+
+
+def _norm_price(value: Any) -> Optional[float]:
+    if value in (None, "") or value is PydanticUndefined:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _norm_flag(value: Any) -> bool:
+    if value in (None, "") or value is PydanticUndefined:
+        return False
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in {"1", "true", "yes", "y"}
+
+
+def _norm_conf(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _dropped_identity(cat: Any) -> str:
+    """Which of ``player``/``character`` to clear when a record has both."""
+
+    return "character" if cat == Category.SPORTS else "player"
+
+
 class CardRecord(BaseModel):
     sku: str
     cat: Category = Field(..., description="Category enum: sports, marvel, pokemon, other")
@@ -86,119 +178,129 @@ class CardRecord(BaseModel):
     @field_validator("sku", mode="before")
     @classmethod
     def trim_sku(cls, value: object) -> str:
-        if isinstance(value, str):
-            return value.strip()
-        return str(value)
+        return _norm_sku(value)
 
     @field_validator("cat", mode="before")
     @classmethod
     def validate_cat(cls, value: object) -> Category:
-        if value is None or (isinstance(value, str) and not value.strip()):
-            return Category.OTHER
-        key = str(value).strip().lower()
-        mapped = CATEGORY_ALIASES.get(key)
-        if mapped:
-            return mapped
-        try:
-            return Category(key)
-        except ValueError:
-            return Category.OTHER
+        return _norm_category(value)
 
     @field_validator("cond", mode="before")
     @classmethod
     def validate_cond(cls, value: object) -> Optional[Condition]:
-        if value is None or value is PydanticUndefined:
-            return None
-        if isinstance(value, str) and not value.strip():
-            return None
-        key = str(value).strip()
-        alias = CONDITION_ALIASES.get(key.lower())
-        if alias:
-            return alias
-        try:
-            normalised = key.upper()
-            return Condition(normalised)
-        except ValueError:
-            return None
+        return _norm_condition(value)
 
     @field_validator("year", mode="before")
     @classmethod
     def coerce_year(cls, value: object) -> Optional[int]:
-        if value in (None, ""):
-            return None
-        try:
-            return int(value)
-        except (TypeError, ValueError):
-            return None
+        return _norm_year(value)
 
     @field_validator("grade", mode="before")
     @classmethod
     def default_grade(cls, value: object) -> str:
-        if value in (None, "") or value is PydanticUndefined:
-            return "raw"
-        return str(value).strip() or "raw"
+        return _norm_grade(value)
 
-    @field_validator("player", "character", mode="before")
+    @field_validator(*OPTIONAL_STR_FIELDS, mode="before")
     @classmethod
     def strip_text(cls, value: object) -> Optional[str]:
-        if value is None or value is PydanticUndefined:
-            return None
-        if isinstance(value, str):
-            text = value.strip()
-            return text or None
-        return str(value)
+        return _norm_text(value)
 
     @field_validator("num", mode="before")
     @classmethod
     def str_number(cls, value: object) -> Optional[str]:
-        if value is None or value is PydanticUndefined:
-            return None
-        text = str(value).strip()
-        return text or None
+        return _norm_number(value)
 
     @field_validator("price_est", mode="before")
     @classmethod
     def to_float(cls, value: object) -> Optional[float]:
-        if value in (None, "") or value is PydanticUndefined:
-            return None
-        try:
-            return float(value)
-        except (TypeError, ValueError):
-            return None
+        return _norm_price(value)
 
     @field_validator("auto", "mem", mode="before")
     @classmethod
     def to_bool(cls, value: object) -> Optional[bool]:
-        if value in (None, "") or value is PydanticUndefined:
-            return False
-        if isinstance(value, bool):
-            return value
-        text = str(value).strip().lower()
-        return text in {"1", "true", "yes", "y"}
+        return _norm_flag(value)
 
     @field_validator("conf", mode="before")
     @classmethod
     def to_conf(cls, value: object) -> float:
-        try:
-            return float(value)
-        except (TypeError, ValueError):
-            return 0.0
-
-    @field_validator(*OPTIONAL_STR_FIELDS, mode="before")
-    @classmethod
-    def empty_to_none(cls, value: object) -> Optional[str]:
-        if value is None or value is PydanticUndefined:
-            return None
-        if isinstance(value, str):
-            stripped = value.strip()
-            return stripped or None
-        return str(value)
+        return _norm_conf(value)
 
     @model_validator(mode="after")
     def enforce_identity(self) -> "CardRecord":
         if self.player and self.character:
-            if self.cat == Category.SPORTS:
-                self.character = None
-            else:
-                self.player = None
+            setattr(self, _dropped_identity(self.cat), None)
         return self
+
+
+def _dumped(normalise: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    """``normalise`` emitting enum values, as ``model_dump(mode="json")`` does."""
+
+    def run(value: Any) -> Any:
+        result = normalise(value)
+        return result.value if isinstance(result, Enum) else result
+
+    return run
+
+
+_NORMALISERS: Dict[str, Callable[[Any], Any]] = {
+    "sku": _norm_sku,
+    "cat": _dumped(_norm_category),
+    "year": _norm_year,
+    "num": _norm_number,
+    "auto": _norm_flag,
+    "mem": _norm_flag,
+    "grade": _norm_grade,
+    "cond": _dumped(_norm_condition),
+    "price_est": _norm_price,
+    "conf": _norm_conf,
+    **{name: _norm_text for name in OPTIONAL_STR_FIELDS},
+}
+_MISSING = object()
+# Per field: its normaliser and what a missing or null value becomes. Optional
+# fields get ``CardRecord``'s defaults up front (normalising None gives the
+# same value), so the common missing/null case costs no call; required fields
+# stay missing so the caller can report them.
+_PLAN = tuple(
+    (name, _NORMALISERS[name], _MISSING if name in REQUIRED_FIELDS else _NORMALISERS[name](None))
+    for name in CardRecord.model_fields
+)
+
+
+def _coerce(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Apply every ``CardRecord`` validator to one raw dict in a single pass."""
+
+    out: Dict[str, Any] = {}
+    get = raw.get
+    for name, normalise, unset in _PLAN:
+        value = get(name, _MISSING)
+        if value is _MISSING or (value is None and unset is not _MISSING):
+            value = unset
+        else:
+            value = normalise(value)
+        if value is not None and value is not _MISSING:
+            out[name] = value
+    if out.get("player") and out.get("character"):
+        out.pop(_dropped_identity(out.get("cat")))
+    return out
+
+
+def dump_records(raws: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Bulk equivalent of ``CardRecord(**raw).model_dump(mode="json", exclude_none=True)``.
+
+    Each record is coerced once by the shared field normalisers, which
+    already produce the dumped types, so nothing is validated a second time.
+    Records missing ``sku``, ``cat`` or ``conf`` raise one ``ValidationError``
+    listing them by item index.
+    """
+
+    records = []
+    errors = []
+    for index, raw in enumerate(raws):
+        record = _coerce(raw)
+        for name in REQUIRED_FIELDS:
+            if name not in record:
+                errors.append({"type": "missing", "loc": (index, name), "input": raw})
+        records.append(record)
+    if errors:
+        raise ValidationError.from_exception_data("dump_records", errors)
+    return records
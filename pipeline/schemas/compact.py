@@ -0,0 +1,102 @@
+"""Compact wire format for card responses.
+
+The model answers with short keys and one-letter enum codes under a strict
+JSON schema; :func:`expand` turns that back into the ``CardRecord`` shape
+before normalisation. Strict structured output requires every property to
+be present, so unset fields come back as ``null`` and are dropped here.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+
+from .card_record import Category, Condition
+
+KEYS = {
+    "c": "cat",
+    "b": "brand",
+    "s": "set",
+    "y": "year",
+    "p": "player",
+    "ch": "character",
+    "n": "num",
+    "ss": "subset",
+    "v": "variant",
+    "sn": "serial",
+    "a": "auto",
+    "m": "mem",
+    "g": "grade",
+    "cd": "cond",
+    "nt": "notes",
+    "pe": "price_est",
+    "cf": "conf",
+}
+CATEGORY_CODES = {
+    "S": Category.SPORTS.value,
+    "M": Category.MARVEL.value,
+    "P": Category.POKEMON.value,
+    "O": Category.OTHER.value,
+}
+CONDITION_CODES = {
+    "N": Condition.NM.value,
+    "E": Condition.EX.value,
+    "V": Condition.VG.value,
+    "R": Condition.RAW.value,
+}
+
+_TYPES = {
+    "y": "integer",
+    "a": "boolean",
+    "m": "boolean",
+    "pe": "number",
+}
+
+
+def _property(key: str) -> Dict[str, Any]:
+    if key == "c":
+        return {"type": "string", "enum": list(CATEGORY_CODES)}
+    if key == "cd":
+        return {"type": ["string", "null"], "enum": list(CONDITION_CODES) + [None]}
+    if key == "cf":
+        return {"type": "number"}
+    return {"type": [_TYPES.get(key, "string"), "null"]}
+
+
+SCHEMA = {
+    "type": "object",
+    "properties": {key: _property(key) for key in KEYS},
+    "required": list(KEYS),
+    "additionalProperties": False,
+}
+
+RESPONSE_FORMAT = {"type": "json_schema", "name": "card", "schema": SCHEMA, "strict": True}
+
+RULES = (
+    "Answer in the compact format: "
+    + ", ".join(f"{short}={full}" for short, full in KEYS.items())
+    + ". c is one of "
+    + ", ".join(f"{code}={name}" for code, name in CATEGORY_CODES.items())
+    + "; cd is one of "
+    + ", ".join(f"{code}={name}" for code, name in CONDITION_CODES.items())
+    + ". Use null for anything unknown or default (a/m false, g raw)."
+)
+
+
+def expand(compact: Dict[str, Any], sku: Optional[str] = None) -> Dict[str, Any]:
+    """Full-key record for ``compact``; private ``_`` keys pass through."""
+
+    record: Dict[str, Any] = {}
+    for key, value in compact.items():
+        if key.startswith("_"):
+            record[key] = value
+            continue
+        full = KEYS.get(key)
+        if full is None or value is None:
+            continue
+        if key == "c":
+            value = CATEGORY_CODES.get(value, value)
+        elif key == "cd":
+            value = CONDITION_CODES.get(value, value)
+        record[full] = value
+    if sku and "sku" not in record:
+        record["sku"] = sku
+    return record
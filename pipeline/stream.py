@@ -0,0 +1,354 @@
+"""Fused pair -> queue -> post run for cards as they arrive in the inbox.
+
+``pipeline.run stream`` watches ``Scans_Inbox`` and moves every card through
+three stages joined by bounded queues:
+
+* ingest pairs a front/back once both files have stopped growing, records
+  their hashes (and, with ``--prepare``, writes derivatives) and hands the
+  SKU on;
+* batch forms pack groups of ``pack_size`` per batch code, waiting at most
+  ``stream_linger_s`` for a group to fill, and appends them to the run's
+  job file;
+* post workers (``concurrency`` of them) run each group through the usual
+  card pipeline.
+
+When the provider falls behind, the queues fill up and ingest stops
+pairing, so new scans simply wait in the inbox. All cards of one run
+belong to one job, ``stream_<timestamp>_<id>``, which can be replayed like
+any other.
+"""
+from __future__ import annotations
+
+import json
+import os
+import queue
+import statistics
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from pipeline import postprocess, prepare, watcher
+from pipeline.utils import log, naming
+from pipeline.utils.manifest import ContentManifest
+
+_STOP = object()
+
+Fingerprint = Tuple[Tuple[int, int], ...]
+
+
+class _Stats:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.seen_at: Dict[str, float] = {}
+        self.latencies: List[float] = []
+        self.paired = 0
+        self.failed = 0
+        self.ingest_waits = 0
+
+    def seen(self, sku: str) -> None:
+        with self.lock:
+            self.seen_at.setdefault(sku, time.monotonic())
+
+    def forget(self, sku: str) -> None:
+        with self.lock:
+            self.seen_at.pop(sku, None)
+
+    def finished(self, group: List[Dict[str, Any]]) -> None:
+        now = time.monotonic()
+        with self.lock:
+            for item in group:
+                started = self.seen_at.pop(item["sku"], None)
+                if started is not None:
+                    self.latencies.append(now - started)
+
+    def summary(self) -> Dict[str, Any]:
+        latencies = self.latencies
+        return {
+            "paired": self.paired,
+            "processed": len(latencies),
+            "failed": self.failed,
+            "p50_latency_s": round(statistics.median(latencies), 2) if latencies else None,
+            "max_latency_s": round(max(latencies), 2) if latencies else None,
+            "ingest_waits": self.ingest_waits,
+        }
+
+
+def _put(target: "queue.Queue[Any]", item: Any, stop: threading.Event, stats: Optional[_Stats] = None) -> bool:
+    """Blocking put that notes backpressure and gives up once ``stop`` is set."""
+
+    try:
+        target.put_nowait(item)
+        return True
+    except queue.Full:
+        if stats is not None:
+            with stats.lock:
+                stats.ingest_waits += 1
+    while not stop.is_set():
+        try:
+            target.put(item, timeout=0.2)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _fingerprint(folder: str, names: Tuple[str, str]) -> Optional[Fingerprint]:
+    try:
+        return tuple((stat.st_size, stat.st_mtime_ns) for stat in (os.stat(os.path.join(folder, n)) for n in names))
+    except OSError:
+        return None
+
+
+def _ingest(
+    inbox: str,
+    ready: str,
+    error: str,
+    out: "queue.Queue[Any]",
+    stop: threading.Event,
+    stats: _Stats,
+    poll_s: float,
+    prepare_config: Optional[Dict[str, Any]],
+    idle_exit: Optional[float],
+    max_cards: Optional[int],
+) -> None:
+    """Pair stable scans from ``inbox`` and feed them to ``out`` until told to stop."""
+
+    manifest = ContentManifest()
+    growing: Dict[str, Fingerprint] = {}
+    handled: Dict[str, Fingerprint] = {}
+    last_activity = time.monotonic()
+    try:
+        while not stop.is_set():
+            pairs = sorted(watcher.find_pairs(inbox))
+            present = {base for base, _, _ in pairs}
+            # Forget SKUs that have left the inbox, so a long watch stays bounded.
+            for known in (growing, handled):
+                for base in [base for base in known if base not in present]:
+                    del known[base]
+            for base, front, back in pairs:
+                names = (front, back)
+                current = _fingerprint(inbox, names)
+                if current is None or handled.get(base) == current:
+                    continue
+                stats.seen(base)
+                last_activity = time.monotonic()
+                if growing.get(base) != current:
+                    # First sight or still being written: look again next poll.
+                    growing[base] = current
+                    continue
+                del growing[base]
+                handled[base] = current
+                # The inbox keeps its originals: skip pairs already paired or failed.
+                if any(_fingerprint(os.path.join(folder, base), names) == current for folder in (ready, error)):
+                    stats.forget(base)
+                    continue
+                folder = watcher.pair_one(inbox, ready, error, base, front, back)
+                if folder is None:
+                    stats.forget(base)
+                    continue
+                try:
+                    hashes = manifest.hash_files(prepare.scan_files(Path(folder)))
+                    if prepare_config is not None:
+                        prepare.prepare_sku(Path(folder), prepare_config, hashes)
+                except Exception as exc:
+                    stats.forget(base)
+                    postprocess._move_to_error(Path(ready), Path(error), base, f"Prepare failed: {exc}")
+                    log.event("pair", base, status="error", msg=str(exc))
+                    print(f"[STREAM] {base}: prepare failed ({exc})")
+                    continue
+                with stats.lock:
+                    stats.paired += 1
+                if not _put(out, {"sku": base, "images": sorted(names)}, stop, stats):
+                    return
+                if max_cards and stats.paired >= max_cards:
+                    return
+            if idle_exit is not None and time.monotonic() - last_activity >= idle_exit:
+                return
+            stop.wait(poll_s)
+    finally:
+        manifest.close()
+
+
+def _batch_code(sku: str) -> str:
+    try:
+        return naming.parse_sku(sku)["batch_code"]
+    except ValueError:
+        return ""
+
+
+def _batcher(
+    source: "queue.Queue[Any]",
+    out: "queue.Queue[Any]",
+    stop: threading.Event,
+    batch_file: Path,
+    pack_size: int,
+    linger_s: float,
+    workers: int,
+) -> None:
+    """Group SKUs per batch code into pack groups, flushing after ``linger_s``."""
+
+    open_groups: Dict[str, Tuple[float, List[Dict[str, Any]]]] = {}
+
+    def emit(code: str) -> None:
+        _, items = open_groups.pop(code)
+        with batch_file.open("a", encoding="utf-8") as handle:
+            for item in items:
+                handle.write(json.dumps(item) + "\n")
+        _put(out, items, stop)
+
+    while True:
+        now = time.monotonic()
+        deadlines = [started + linger_s for started, _ in open_groups.values()]
+        timeout = max(0.0, min(deadlines) - now) if deadlines else 0.5
+        try:
+            item = source.get(timeout=timeout)
+        except queue.Empty:
+            if stop.is_set():
+                break
+            item = None
+        if item is _STOP:
+            break
+        if item is not None:
+            code = _batch_code(item["sku"])
+            open_groups.setdefault(code, (time.monotonic(), []))[1].append(item)
+            if len(open_groups[code][1]) >= pack_size:
+                emit(code)
+        now = time.monotonic()
+        for code in [code for code, (started, _) in open_groups.items() if now - started >= linger_s]:
+            emit(code)
+    for code in list(open_groups):
+        emit(code)
+    for _ in range(workers):
+        _put(out, _STOP, stop)
+
+
+def _settled(run: Any, sku: str) -> bool:
+    """Whether ``sku`` has a record or has already left Scans_Ready (rejected)."""
+
+    return (run.result_root / "json" / f"{sku}.json").exists() or not (run.ready / sku).exists()
+
+
+def _fail_sku(run: Any, sku: str, exc: Exception, stats: _Stats) -> None:
+    stats.forget(sku)
+    with stats.lock:
+        stats.failed += 1
+    postprocess._move_to_error(run.ready, run.error, sku, f"Post failed: {exc}")
+    log.event("post", sku, job_id=run.job_id, status="error", message=str(exc))
+    print(f"[STREAM] {sku}: failed ({exc})")
+
+
+def _run_group(run: Any, group: List[Dict[str, Any]], stats: _Stats) -> None:
+    """Process a pack group; cards left over by an error are retried alone, then failed."""
+
+    try:
+        postprocess._process_group(run, group)
+    except Exception as exc:
+        pending = [item for item in group if not _settled(run, item["sku"])]
+        if len(group) > 1:
+            for item in pending:
+                _run_group(run, [item], stats)
+        else:
+            for item in pending:
+                _fail_sku(run, item["sku"], exc, stats)
+    stats.finished(group)
+
+
+def _post_worker(run: Any, source: "queue.Queue[Any]", stop: threading.Event, stats: _Stats) -> None:
+    try:
+        while True:
+            try:
+                group = source.get(timeout=0.2)
+            except queue.Empty:
+                if stop.is_set():
+                    return
+                continue
+            if group is _STOP:
+                return
+            if run.abort or stop.is_set():
+                # Keep draining so upstream stages never block on a dead consumer.
+                stop.set()
+                continue
+            _run_group(run, group, stats)
+    except BaseException:
+        stop.set()
+        raise
+
+
+def run_stream(
+    inbox: str = "Scans_Inbox",
+    ready: str = "Scans_Ready",
+    error: str = "Scans_Error",
+    batches: str = "pipeline/output/batches",
+    outroot: str = "pipeline/output",
+    prepare_derivatives: bool = False,
+    idle_exit: Optional[float] = None,
+    max_cards: Optional[int] = None,
+) -> str:
+    """Run the fused pipeline until ``idle_exit`` seconds pass without new
+    scans, ``max_cards`` cards were paired, or Ctrl+C; returns the results folder."""
+
+    for folder in (inbox, ready, error, batches):
+        os.makedirs(folder, exist_ok=True)
+    project_root = Path.cwd()
+    postprocess._load_env(project_root)
+    config = postprocess._load_config()
+    if config.get("retry_mode") not in postprocess.RETRY_MODES:
+        config["retry_mode"] = postprocess.DEFAULT_CONFIG["retry_mode"]
+    postprocess.TMP_DIR.mkdir(parents=True, exist_ok=True)
+
+    job_id = f"stream_{int(time.time())}_{uuid.uuid4().hex[:8]}"
+    batch_file = Path(batches) / f"{job_id}.jsonl"
+    batch_file.touch()
+    run, _ = postprocess._start_run(job_id, config, project_root, ready, batches, outroot, error)
+    run.progress = None  # the job file grows as cards arrive; latency is reported instead
+    workers = max(1, int(config.get("concurrency") or 1)) if run.uses_provider else 1
+    pack_size = int(config.get("pack_size") or 1) if run.uses_provider else 1
+    depth = max(1, int(config.get("stream_queue") or postprocess.DEFAULT_CONFIG["stream_queue"]))
+    linger_s = float(config.get("stream_linger_s") or 0.0) if pack_size > 1 else 0.0
+    poll_s = float(config.get("stream_poll_s") or postprocess.DEFAULT_CONFIG["stream_poll_s"])
+    log.event("stream", None, job_id=job_id, status="start", workers=workers, queue=depth)
+    print(f"[STREAM] {job_id}: watching {inbox} with {workers} worker(s)")
+
+    stop = threading.Event()
+    stats = _Stats()
+    paired: "queue.Queue[Any]" = queue.Queue(maxsize=depth)
+    groups: "queue.Queue[Any]" = queue.Queue(maxsize=depth)
+    threads = [
+        threading.Thread(
+            target=_batcher,
+            args=(paired, groups, stop, batch_file, pack_size, linger_s, workers),
+            name="stream-batch",
+        )
+    ]
+    threads += [
+        threading.Thread(target=_post_worker, args=(run, groups, stop, stats), name=f"stream-post-{index}")
+        for index in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+    try:
+        _ingest(
+            inbox,
+            ready,
+            error,
+            paired,
+            stop,
+            stats,
+            poll_s,
+            config if prepare_derivatives else None,
+            idle_exit,
+            max_cards,
+        )
+    except KeyboardInterrupt:
+        print("[STREAM] Stopping after the cards already paired...")
+    finally:
+        _put(paired, _STOP, stop)
+        for thread in threads:
+            thread.join()
+
+    summary = stats.summary()
+    log.event("stream", None, job_id=job_id, status="summary", **summary)
+    print(f"[STREAM] Summary: {json.dumps(summary, ensure_ascii=False)}")
+    return postprocess._finish_run(run)
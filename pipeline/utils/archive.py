@@ -0,0 +1,134 @@
+"""Compressed per-job archive of raw provider responses.
+
+Entries are JSON lines written in gzip members of up to ``block_size``
+entries. The file as a whole is an ordinary ``.jsonl.gz`` (concatenated
+members decompress as one stream), and a sidecar index maps every SKU to
+the member holding it, so one response or one block can be read back
+without inflating the rest of the job.
+
+A run writes to ``<name>.partial`` and only replaces the archive and its
+index in :meth:`ResponseArchive.close`, so a re-run that crashes leaves the
+previous archive readable.
+"""
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+ARCHIVE_NAME = "responses.jsonl.gz"
+INDEX_NAME = "responses.idx.json"
+BLOCK_SIZE = 64
+
+Block = Tuple[int, int]
+
+
+def part_name(worker: str) -> str:
+    """Archive file name for one distributed worker's share of a job."""
+
+    return f"responses.{worker}.jsonl.gz"
+
+
+def index_path(path: Path) -> Path:
+    return path.with_name(path.name[: -len(".jsonl.gz")] + ".idx.json")
+
+
+def partial_path(path: Path) -> Path:
+    return path.with_name(path.name + ".partial")
+
+
+def archive_parts(job_dir: Path) -> List[Path]:
+    """The job's archive followed by any worker parts, each with an index."""
+
+    parts = sorted(job_dir.glob("responses.*.jsonl.gz"))
+    main = job_dir / ARCHIVE_NAME
+    if main.exists():
+        parts.insert(0, main)
+    return [path for path in parts if index_path(path).exists()]
+
+
+class ResponseArchive:
+    """Thread-safe writer; :meth:`close` flushes the last block and swaps the
+    new archive and index in place of any previous ones."""
+
+    def __init__(self, path: Path, block_size: int = BLOCK_SIZE) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.block_size = max(1, int(block_size))
+        self._handle = partial_path(path).open("wb")
+        self._lock = threading.Lock()
+        self._pending: List[Dict[str, Any]] = []
+        self._blocks: List[Block] = []
+        self._skus: Dict[str, int] = {}
+        self.entries = 0
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._pending.append(entry)
+            self.entries += 1
+            if len(self._pending) >= self.block_size:
+                self._flush()
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        text = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in self._pending)
+        member = gzip.compress(text.encode("utf-8"), mtime=0)
+        offset = self._handle.tell()
+        self._handle.write(member)
+        for entry in self._pending:
+            self._skus[entry["sku"]] = len(self._blocks)
+        self._blocks.append((offset, len(member)))
+        self._pending = []
+
+    def close(self) -> None:
+        with self._lock:
+            if self._handle.closed:
+                return
+            self._flush()
+            self._handle.close()
+            index = {"blocks": self._blocks, "skus": self._skus}
+            target = index_path(self.path)
+            tmp = target.with_suffix(".tmp")
+            tmp.write_text(json.dumps(index), encoding="utf-8")
+            os.replace(partial_path(self.path), self.path)
+            os.replace(tmp, target)
+
+
+def read_index(path: Path) -> Dict[str, Any]:
+    data = json.loads(index_path(path).read_text(encoding="utf-8"))
+    data["blocks"] = [tuple(block) for block in data["blocks"]]
+    return data
+
+
+def read_block(path: Path, block: Block) -> List[Dict[str, Any]]:
+    offset, length = block
+    with path.open("rb") as handle:
+        handle.seek(offset)
+        text = gzip.decompress(handle.read(length)).decode("utf-8")
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def load(path: Path, sku: str) -> Optional[Dict[str, Any]]:
+    """Archived entry for ``sku``; only its own block is decompressed."""
+
+    index = read_index(path)
+    position = index["skus"].get(sku)
+    if position is None:
+        return None
+    for entry in reversed(read_block(path, index["blocks"][position])):
+        if entry.get("sku") == sku:
+            return entry
+    return None
+
+
+def iter_entries(path: Path) -> Iterator[Dict[str, Any]]:
+    """Every entry in write order, read as one gzip stream."""
+
+    with gzip.open(path, "rt", encoding="utf-8") as handle:
+        for line in handle:
+            if line.strip():
+                yield json.loads(line)
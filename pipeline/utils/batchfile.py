@@ -0,0 +1,70 @@
+"""Streaming reader for job batch files with byte-offset progress.
+
+Batch files are JSON lines, one SKU per line. :class:`BatchReader` yields
+them one at a time and keeps the byte offset of everything consumed so
+far, so a job of any size is read in constant memory and its position in
+the file gives an accurate progress fraction. :class:`Progress` turns that
+fraction into throttled reports with an ETA.
+"""
+from __future__ import annotations
+
+import json
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional
+
+
+class BatchReader:
+    """Iterate a batch file's items lazily; ``offset`` is the bytes consumed."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.total = self.path.stat().st_size
+        self.offset = 0
+        self.items = 0
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        with self.path.open("rb") as handle:
+            for line in handle:
+                self.offset += len(line)
+                if not line.strip():
+                    continue
+                self.items += 1
+                yield json.loads(line)
+
+    @property
+    def exhausted(self) -> bool:
+        return self.offset >= self.total
+
+
+class Progress:
+    """Rate-limited progress reports for ``total`` units (bytes) of work."""
+
+    def __init__(self, total: int, interval_s: float = 30.0, clock: Callable[[], float] = time.monotonic) -> None:
+        self.total = max(0, int(total))
+        self.interval_s = float(interval_s)
+        self._clock = clock
+        self._started = clock()
+        self._reported = self._started
+
+    def report(self, done: int) -> Dict[str, Any]:
+        done = min(max(0, int(done)), self.total)
+        elapsed = self._clock() - self._started
+        fraction = done / self.total if self.total else 1.0
+        eta = elapsed * (1 - fraction) / fraction if fraction else None
+        return {
+            "bytes_done": done,
+            "bytes_total": self.total,
+            "pct": round(100 * fraction, 1),
+            "elapsed_s": round(elapsed, 1),
+            "eta_s": round(eta, 1) if eta is not None else None,
+        }
+
+    def update(self, done: int) -> Optional[Dict[str, Any]]:
+        """A report if ``interval_s`` passed since the last one, else ``None``."""
+
+        now = self._clock()
+        if now - self._reported < self.interval_s:
+            return None
+        self._reported = now
+        return self.report(done)
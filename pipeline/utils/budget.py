@@ -0,0 +1,36 @@
+"""Admission control on the estimated memory held by in-flight work."""
+from __future__ import annotations
+
+import threading
+
+
+class MemoryBudget:
+    """Counting gate over estimated bytes.
+
+    :meth:`acquire` blocks until the new amount fits under ``limit_bytes``.
+    A single item larger than the whole budget is still admitted once
+    nothing else is in flight, so an oversized scan cannot stall a job.
+    """
+
+    def __init__(self, limit_bytes: int) -> None:
+        self.limit_bytes = max(1, int(limit_bytes))
+        self.in_use = 0
+        self.peak = 0
+        self.waits = 0
+        self._cond = threading.Condition()
+
+    def _fits(self, amount: int) -> bool:
+        return self.in_use == 0 or self.in_use + amount <= self.limit_bytes
+
+    def acquire(self, amount: int) -> None:
+        with self._cond:
+            if not self._fits(amount):
+                self.waits += 1
+                self._cond.wait_for(lambda: self._fits(amount))
+            self.in_use += amount
+            self.peak = max(self.peak, self.in_use)
+
+    def release(self, amount: int) -> None:
+        with self._cond:
+            self.in_use = max(0, self.in_use - amount)
+            self._cond.notify_all()
@@ -0,0 +1,152 @@
+"""Hedged provider requests driven by an online latency percentile."""
+from __future__ import annotations
+
+import collections
+import concurrent.futures
+import threading
+import time
+from typing import Any, Callable, Deque, Dict, Optional
+
+Attempt = Callable[[threading.Event, float], Any]
+
+
+class LatencyTracker:
+    """Percentiles over a sliding window of recent call latencies."""
+
+    def __init__(self, window: int = 200) -> None:
+        self._samples: Deque[float] = collections.deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        rank = min(len(samples) - 1, max(0, int(round(pct / 100.0 * (len(samples) - 1)))))
+        return samples[rank]
+
+
+class Hedger:
+    """Run an attempt and, if it outlives the recent ``percentile``, a backup.
+
+    The first attempt to succeed wins; the other gets its cancel event set.
+    Backups are limited to ``max_extra`` of all calls, and no hedging
+    happens until ``min_samples`` latencies have been observed. Every
+    successful attempt feeds the tracker, including losers that finish
+    later, which also measures how much time a winning backup saved.
+    """
+
+    def __init__(self, percentile: float = 95.0, max_extra: float = 0.05, min_samples: int = 20) -> None:
+        self.percentile = float(percentile)
+        self.max_extra = float(max_extra)
+        self.min_samples = int(min_samples)
+        self.tracker = LatencyTracker()
+        self.calls = 0
+        self.hedged = 0
+        self.wins = 0
+        self.saved_s = 0.0
+        self._lock = threading.Lock()
+
+    def threshold(self) -> Optional[float]:
+        if len(self.tracker) < self.min_samples:
+            return None
+        return self.tracker.percentile(self.percentile)
+
+    def _take_hedge(self) -> bool:
+        with self._lock:
+            if self.hedged + 1 > self.max_extra * self.calls:
+                return False
+            self.hedged += 1
+            return True
+
+    def call(self, attempt: Attempt, timeout: float) -> Any:
+        """Return the first successful ``attempt(cancel, deadline)`` result.
+
+        Raises :class:`concurrent.futures.TimeoutError` when nothing succeeds within ``timeout``
+        and re-raises the last error when every attempt failed.
+        """
+
+        with self._lock:
+            self.calls += 1
+        started = time.monotonic()
+        deadline = started + timeout
+        delay = self.threshold()
+        pool = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+        cancels = []
+        futures: Dict[concurrent.futures.Future, int] = {}
+        won_at: Dict[str, float] = {}
+
+        def launch(index: int) -> concurrent.futures.Future:
+            cancel = threading.Event()
+            cancels.append(cancel)
+            launched = time.monotonic()
+            future = pool.submit(attempt, cancel, deadline)
+            futures[future] = index
+
+            def finished(done: concurrent.futures.Future) -> None:
+                if done.cancelled() or done.exception() is not None:
+                    return
+                now = time.monotonic()
+                self.tracker.observe(now - launched)
+                if index == 0 and "backup" in won_at:
+                    with self._lock:
+                        self.saved_s += max(0.0, now - won_at["backup"])
+
+            future.add_done_callback(finished)
+            return future
+
+        pending = {launch(0)}
+        last_exc: Optional[BaseException] = None
+        try:
+            while pending:
+                now = time.monotonic()
+                if now >= deadline:
+                    raise concurrent.futures.TimeoutError(f"No response within {timeout}s")
+                wait_for = deadline - now
+                if delay is not None and len(futures) == 1:
+                    wait_for = min(wait_for, max(0.0, started + delay - now))
+                done, pending = concurrent.futures.wait(
+                    pending, timeout=wait_for, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    if future.exception() is None:
+                        if futures[future] == 1:
+                            won_at["backup"] = time.monotonic()
+                            with self._lock:
+                                self.wins += 1
+                        return future.result()
+                    last_exc = future.exception()
+                if (
+                    pending
+                    and delay is not None
+                    and len(futures) == 1
+                    and time.monotonic() - started >= delay
+                ):
+                    if self._take_hedge():
+                        pending.add(launch(1))
+                    else:
+                        delay = None
+            assert last_exc is not None
+            raise last_exc
+        finally:
+            for cancel in cancels:
+                cancel.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def summary(self) -> Dict[str, Any]:
+        threshold = self.threshold()
+        return {
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_rate": round(self.hedged / self.calls, 3) if self.calls else 0.0,
+            "backup_wins": self.wins,
+            "saved_s": round(self.saved_s, 2),
+            "threshold_s": round(threshold, 2) if threshold is not None else None,
+        }
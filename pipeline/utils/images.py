@@ -0,0 +1,212 @@
+"""Image preparation helpers shared by the post-processing stages."""
+from __future__ import annotations
+
+import math
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+from PIL import Image
+
+from . import quality
+
+WEBP_QUALITY = 85
+IMAGE_TILE = 512
+IMAGE_BASE_TOKENS = 85
+IMAGE_TILE_TOKENS = 170
+
+
+def open_rgb(src: Path) -> Image.Image:
+    with Image.open(src) as img:
+        img.load()
+        return img.convert("RGB") if img.mode in {"P", "RGBA"} else img.copy()
+
+
+def resize_to_edge(img: Image.Image, max_edge: int) -> Image.Image:
+    width, height = img.size
+    scale = max(width, height)
+    if scale <= max_edge:
+        return img
+    ratio = max_edge / float(scale)
+    new_size = (max(1, int(width * ratio)), max(1, int(height * ratio)))
+    return img.resize(new_size, Image.LANCZOS)
+
+
+def crop_to_card(img: Image.Image, margin: float = 0.02, deskew: bool = False) -> Image.Image:
+    """Trim the scanner bed around the card, keeping ``margin`` of the card size.
+
+    Detection runs on a small grayscale copy (see :func:`quality.card_bbox`)
+    and the box is scaled back to full resolution. With ``deskew`` the frame
+    is first rotated so the card edges line up with the image axes. Frames
+    where no card stands out are returned unchanged.
+    """
+
+    gray = quality.gray_array(img)
+    scale = img.size[0] / float(gray.shape[1])
+    if deskew:
+        angle = quality.skew_angle(gray)
+        if abs(angle) >= 0.3:
+            img = img.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=img.getpixel((0, 0)))
+            gray = quality.gray_array(img)
+            scale = img.size[0] / float(gray.shape[1])
+    box = quality.card_bbox(gray)
+    if box is None:
+        return img
+    left, top, right, bottom = (value * scale for value in box)
+    pad_x = (right - left) * margin
+    pad_y = (bottom - top) * margin
+    width, height = img.size
+    return img.crop(
+        (
+            max(0, int(left - pad_x)),
+            max(0, int(top - pad_y)),
+            min(width, int(right + pad_x + 0.5)),
+            min(height, int(bottom + pad_y + 0.5)),
+        )
+    )
+
+
+def estimate_image_tokens(width: int, height: int) -> int:
+    """Approximate vision input tokens for one image part (512px tiles)."""
+
+    if width <= 0 or height <= 0:
+        return 0
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+    tiles = math.ceil(width / IMAGE_TILE) * math.ceil(height / IMAGE_TILE)
+    return IMAGE_BASE_TOKENS + IMAGE_TILE_TOKENS * tiles
+
+
+def estimate_request_tokens(src: Path, max_edge: Optional[int]) -> int:
+    """Vision tokens for ``src`` once resized to ``max_edge``; only the header is read."""
+
+    with Image.open(src) as img:
+        width, height = img.size
+    if max_edge:
+        scale = min(1.0, max_edge / float(max(width, height)))
+        width, height = max(1, int(width * scale)), max(1, int(height * scale))
+    return estimate_image_tokens(width, height)
+
+
+def composite_size(front: Tuple[int, int], back: Tuple[int, int], max_pixels: int) -> Tuple[int, int, int]:
+    """Return ``(height, front_width, back_width)`` for a side-by-side tile.
+
+    Both sides are scaled to a common height, then the whole strip is shrunk
+    until it fits in ``max_pixels``.
+    """
+
+    height = min(front[1], back[1])
+    front_width = max(1, round(front[0] * height / front[1]))
+    back_width = max(1, round(back[0] * height / back[1]))
+    total = (front_width + back_width) * height
+    if total > max_pixels:
+        ratio = math.sqrt(max_pixels / float(total))
+        height = max(1, int(height * ratio))
+        front_width = max(1, int(front_width * ratio))
+        back_width = max(1, int(back_width * ratio))
+    return height, front_width, back_width
+
+
+def composite_pair(front: Path, back: Path, dest: Path, max_pixels: int) -> Path:
+    """Tile the prepared front (left) and back (right) into one WebP."""
+
+    with open_rgb(front) as front_img, open_rgb(back) as back_img:
+        height, front_width, back_width = composite_size(front_img.size, back_img.size, max_pixels)
+        canvas = Image.new("RGB", (front_width + back_width, height), "white")
+        canvas.paste(front_img.resize((front_width, height), Image.LANCZOS), (0, 0))
+        canvas.paste(back_img.resize((back_width, height), Image.LANCZOS), (front_width, 0))
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    canvas.save(dest, format="WEBP", quality=WEBP_QUALITY)
+    return dest
+
+
+def crop_region(src: Path, box: Tuple[float, float, float, float], dest: Path) -> Path:
+    """Crop ``box`` (fractions of width/height: left, top, right, bottom) to WebP."""
+
+    with open_rgb(src) as img:
+        width, height = img.size
+        left, top, right, bottom = box
+        pixels = (
+            int(left * width),
+            int(top * height),
+            max(int(left * width) + 1, int(right * width)),
+            max(int(top * height) + 1, int(bottom * height)),
+        )
+        region = img.crop(pixels)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    region.save(dest, format="WEBP", quality=WEBP_QUALITY)
+    return dest
+
+
+def estimate_inflight_bytes(src: Path, decode: bool) -> int:
+    """Rough peak bytes one image holds while its SKU is in flight.
+
+    Sending the file as-is keeps the raw bytes, their base64 copy and the
+    serialised request body (about ``size * 11 / 3``). Re-encoding it also
+    holds the decoded RGB frame, which dominates for large scans. Only the
+    header is read.
+    """
+
+    size = src.stat().st_size
+    if not decode:
+        return size * 11 // 3
+    with Image.open(src) as img:
+        width, height = img.size
+    return width * height * 3 + size
+
+
+def aspect_ratio(src: Path) -> float:
+    with Image.open(src) as img:
+        width, height = img.size
+    return width / float(height or 1)
+
+
+class TieredImage:
+    """Serve WebP derivatives of one scan at several edge sizes.
+
+    The source is decoded (and, with ``crop_margin``, cropped to the card) at
+    most once; each tier is resized from that frame and written to
+    ``out_dir`` the first time it is requested, so escalating to a larger
+    tier never re-reads the scan. ``ready`` may return an already prepared
+    derivative for an edge size, in which case the scan is not touched.
+    """
+
+    def __init__(
+        self,
+        src: Path,
+        out_dir: Path,
+        crop_margin: Optional[float] = None,
+        deskew: bool = False,
+        ready: Optional[Callable[[int], Optional[Path]]] = None,
+    ) -> None:
+        self.src = src
+        self.out_dir = out_dir
+        self.crop_margin = crop_margin
+        self.deskew = deskew
+        self.ready = ready
+        self._decoded: Optional[Image.Image] = None
+        self._tiers: Dict[int, Path] = {}
+
+    def path_for(self, max_edge: int) -> Path:
+        cached = self._tiers.get(max_edge)
+        if cached is not None:
+            return cached
+        prepared = self.ready(max_edge) if self.ready is not None else None
+        if prepared is not None:
+            self._tiers[max_edge] = prepared
+            return prepared
+        if self._decoded is None:
+            self._decoded = open_rgb(self.src)
+            if self.crop_margin is not None:
+                self._decoded = crop_to_card(self._decoded, self.crop_margin, self.deskew)
+        dest = self.out_dir / f"{self.src.stem}_{max_edge}.webp"
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        resize_to_edge(self._decoded, max_edge).save(dest, format="WEBP", quality=WEBP_QUALITY)
+        self._tiers[max_edge] = dest
+        return dest
+
+    def close(self) -> None:
+        if self._decoded is not None:
+            self._decoded.close()
+            self._decoded = None
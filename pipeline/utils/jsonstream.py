@@ -0,0 +1,147 @@
+"""Incremental validation of a JSON object that arrives in chunks."""
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+_NUMBER = re.compile(r"-?(0|[1-9]\d*)(\.\d+)?([eE][+-]?\d+)?")
+_NUMBER_CHARS = set("0123456789+-.eE")
+_LITERALS = ("true", "false", "null")
+_WHITESPACE = " \t\r\n"
+
+
+class InvalidStreamOutput(ValueError):
+    """Raised as soon as streamed text cannot become the expected JSON object."""
+
+
+class StreamingJSONChecker:
+    """Push-down checker fed with text deltas.
+
+    :meth:`feed` raises :class:`InvalidStreamOutput` on the first character
+    that rules out a single JSON object, on a top-level key outside
+    ``allowed_keys`` and on non-whitespace after the object closes, so a
+    bad generation can be abandoned mid-stream. :meth:`result` parses the
+    complete text.
+    """
+
+    def __init__(self, allowed_keys: Optional[Iterable[str]] = None) -> None:
+        self.allowed_keys = set(allowed_keys) if allowed_keys is not None else None
+        self.done = False
+        self._parts: List[str] = []
+        self._stack: List[str] = []
+        self._expect = "root"
+        self._in_string = False
+        self._escape = False
+        self._is_key = False
+        self._key: List[str] = []
+        self._token = ""
+
+    def _fail(self, message: str) -> None:
+        raise InvalidStreamOutput(f"{message} after {sum(map(len, self._parts))} chars")
+
+    def feed(self, chunk: str) -> None:
+        self._parts.append(chunk)
+        for char in chunk:
+            self._char(char)
+
+    def _char(self, char: str) -> None:
+        if self._in_string:
+            self._string_char(char)
+            return
+        if self._token:
+            if self._token[0] in "tfn":
+                self._literal_char(char)
+                return
+            if char in _NUMBER_CHARS:
+                self._token += char
+                return
+            if not _NUMBER.fullmatch(self._token):
+                self._fail(f"bad number {self._token!r}")
+            self._token = ""
+            self._after_value()
+        if char in _WHITESPACE:
+            return
+        if self.done:
+            self._fail("trailing text after the object")
+        expect = self._expect
+        if expect in ("root", "value", "value_or_end"):
+            if expect == "value_or_end" and char == "]":
+                self._close()
+            elif expect == "root" and char != "{":
+                self._fail("output does not start with a JSON object")
+            elif char in "{[":
+                self._stack.append(char)
+                self._expect = "key_or_end" if char == "{" else "value_or_end"
+            elif char == '"':
+                self._in_string, self._is_key = True, False
+            elif char in "-0123456789" or char in "tfn":
+                self._token = char
+            else:
+                self._fail(f"unexpected {char!r}")
+        elif expect in ("key", "key_or_end"):
+            if expect == "key_or_end" and char == "}":
+                self._close()
+            elif char == '"':
+                self._in_string, self._is_key, self._key = True, True, []
+            else:
+                self._fail(f"expected a key, got {char!r}")
+        elif expect == "colon":
+            if char != ":":
+                self._fail(f"expected ':', got {char!r}")
+            self._expect = "value"
+        elif expect == "comma_or_end":
+            container = self._stack[-1]
+            if char == ",":
+                self._expect = "key" if container == "{" else "value"
+            elif char == ("}" if container == "{" else "]"):
+                self._close()
+            else:
+                self._fail(f"expected ',' or close, got {char!r}")
+
+    def _string_char(self, char: str) -> None:
+        if self._escape:
+            self._escape = False
+        elif char == "\\":
+            self._escape = True
+        elif char == '"':
+            self._in_string = False
+            if self._is_key:
+                self._check_key("".join(self._key))
+                self._expect = "colon"
+            else:
+                self._after_value()
+            return
+        elif char < " ":
+            self._fail("control character inside a string")
+        if self._is_key:
+            self._key.append(char)
+
+    def _literal_char(self, char: str) -> None:
+        candidate = self._token + char
+        if any(literal.startswith(candidate) for literal in _LITERALS):
+            self._token = candidate
+            if candidate in _LITERALS:
+                self._token = ""
+                self._after_value()
+            return
+        self._fail(f"bad literal {candidate!r}")
+
+    def _check_key(self, key: str) -> None:
+        if self.allowed_keys is not None and len(self._stack) == 1 and key not in self.allowed_keys:
+            self._fail(f"unexpected key {key!r}")
+
+    def _close(self) -> None:
+        self._stack.pop()
+        self._after_value()
+
+    def _after_value(self) -> None:
+        if self._stack:
+            self._expect = "comma_or_end"
+        else:
+            self.done = True
+
+    def result(self) -> Dict[str, Any]:
+        if not self.done:
+            self._fail("stream ended before the object closed")
+        return json.loads("".join(self._parts))
@@ -0,0 +1,205 @@
+"""Lease files for sharing one job between workers on shared storage.
+
+Everything lives under one directory per job, so any filesystem that
+supports ``O_EXCL`` creates, atomic renames and hard links (local disks,
+NFS, SMB shares) can coordinate workers on several machines:
+
+* ``claims/<SKU>.lease`` is created exclusively by the worker that claims
+  the SKU. Its mtime is the heartbeat: :meth:`LeaseStore.renew` touches it,
+  and a lease untouched for ``lease_s`` seconds (measured on the storage
+  server's clock) may be taken over by renaming it away, which only one
+  contender can do.
+* ``done/<SKU>.json`` holds the committed result. It is published with a
+  hard link, so it appears complete and at most once. A slow worker whose
+  lease was taken over loses the commit instead of writing twice.
+"""
+from __future__ import annotations
+
+import json
+import os
+import socket
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Optional, Set
+
+CLAIMS_DIR = "claims"
+DONE_DIR = "done"
+FINAL_MARKER = "FINAL"
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+def _safe(sku: str) -> str:
+    return sku.replace("/", "_")
+
+
+class LeaseStore:
+    """Claims, heartbeats and exactly-once commits for one job directory."""
+
+    def __init__(self, root: Path, worker: str, lease_s: float = 60.0) -> None:
+        self.root = root
+        self.worker = worker
+        self.lease_s = float(lease_s)
+        self.claims = root / CLAIMS_DIR
+        self.done = root / DONE_DIR
+        self.claims.mkdir(parents=True, exist_ok=True)
+        self.done.mkdir(parents=True, exist_ok=True)
+        self._held: Set[str] = set()
+        self._lock = threading.Lock()
+        self.stolen = 0
+        self.lost = 0
+
+    def _lease(self, sku: str) -> Path:
+        return self.claims / f"{_safe(sku)}.lease"
+
+    def _marker(self, sku: str) -> Path:
+        return self.done / f"{_safe(sku)}.json"
+
+    def server_now(self) -> float:
+        """Current time on the storage server, read back from a touched file."""
+
+        probe = self.root / f".clock-{self.worker}"
+        probe.touch()
+        return probe.stat().st_mtime
+
+    def _create(self, path: Path) -> bool:
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            handle.write(self.worker)
+        return True
+
+    def _owner(self, path: Path) -> Optional[str]:
+        try:
+            return path.read_text(encoding="utf-8")
+        except OSError:
+            return None
+
+    def is_committed(self, sku: str) -> bool:
+        return self._marker(sku).exists()
+
+    def expired(self, sku: str, now: Optional[float] = None) -> bool:
+        try:
+            mtime = self._lease(sku).stat().st_mtime
+        except FileNotFoundError:
+            return True
+        now = self.server_now() if now is None else now
+        return now - mtime > self.lease_s
+
+    def claim(self, sku: str, now: Optional[float] = None) -> bool:
+        """Take the lease for ``sku`` unless it is committed or held by a live worker."""
+
+        if self.is_committed(sku):
+            return False
+        path = self._lease(sku)
+        if not self._create(path):
+            if not self.expired(sku, now):
+                return False
+            stale = path.with_name(f"{path.name}.stale-{self.worker}")
+            try:
+                os.rename(path, stale)
+            except FileNotFoundError:
+                return False
+            now = self.server_now() if now is None else now
+            if now - stale.stat().st_mtime <= self.lease_s:
+                # Another worker re-created the lease between our check and the rename.
+                try:
+                    os.link(stale, path)
+                except FileExistsError:
+                    pass
+                stale.unlink(missing_ok=True)
+                return False
+            stale.unlink(missing_ok=True)
+            if not self._create(path):
+                return False
+            self.stolen += 1
+        if self.is_committed(sku):
+            path.unlink(missing_ok=True)
+            return False
+        with self._lock:
+            self._held.add(sku)
+        return True
+
+    def renew(self) -> None:
+        """Heartbeat every held lease; leases taken over by others are dropped."""
+
+        with self._lock:
+            held = list(self._held)
+        for sku in held:
+            path = self._lease(sku)
+            if self._owner(path) == self.worker:
+                try:
+                    os.utime(path)
+                    continue
+                except FileNotFoundError:
+                    pass
+            with self._lock:
+                self._held.discard(sku)
+            self.lost += 1
+
+    def release(self, sku: str) -> None:
+        with self._lock:
+            held = sku in self._held
+            self._held.discard(sku)
+        path = self._lease(sku)
+        if held and self._owner(path) == self.worker:
+            path.unlink(missing_ok=True)
+
+    def commit(self, sku: str, payload: Dict[str, Any]) -> bool:
+        """Publish ``payload`` as the result for ``sku``; ``False`` if one exists."""
+
+        marker = self._marker(sku)
+        tmp = marker.with_name(f".{marker.name}.{self.worker}.tmp")
+        tmp.write_text(json.dumps(dict(payload, worker=self.worker), ensure_ascii=False), encoding="utf-8")
+        try:
+            os.link(tmp, marker)
+            return True
+        except FileExistsError:
+            return False
+        finally:
+            tmp.unlink(missing_ok=True)
+
+    def committed(self, sku: str) -> Optional[Dict[str, Any]]:
+        try:
+            return json.loads(self._marker(sku).read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def finalize(self) -> bool:
+        """Claim the one-time job finalisation; ``True`` for exactly one worker."""
+
+        return self._create(self.root / FINAL_MARKER)
+
+    def finalized(self) -> bool:
+        return (self.root / FINAL_MARKER).exists()
+
+
+class Heartbeat:
+    """Background thread renewing a set of lease stores every ``interval`` seconds."""
+
+    def __init__(self, stores, interval: float) -> None:
+        self.stores = list(stores)
+        self.interval = max(0.05, float(interval))
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="lease-heartbeat", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            for store in self.stores:
+                try:
+                    store.renew()
+                except OSError:
+                    continue
+
+    def __enter__(self) -> "Heartbeat":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._stop.set()
+        self._thread.join()
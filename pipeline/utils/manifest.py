@@ -0,0 +1,108 @@
+"""Persistent content-hash manifest for scan files.
+
+Each file is hashed once with blake2b and stored with its size and mtime;
+later lookups only ``stat`` the file and reuse the stored digest while both
+still match. Hashing runs on a thread pool (``hashlib`` releases the GIL on
+large buffers) and reads through ``mmap`` so multi-megabyte scans are not
+copied through small Python chunks.
+"""
+from __future__ import annotations
+
+import concurrent.futures
+import hashlib
+import mmap
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+MANIFEST_DB = Path("pipeline/cache/manifest.sqlite")
+DIGEST_SIZE = 32
+
+
+def content_hash(path: Path) -> str:
+    """blake2b digest of the file contents."""
+
+    digest = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    with open(path, "rb") as handle:
+        if os.fstat(handle.fileno()).st_size:
+            with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                digest.update(mapped)
+    return digest.hexdigest()
+
+
+def _key(path: Path) -> str:
+    return str(Path(path).resolve())
+
+
+def _stat(path: Path) -> Tuple[int, int]:
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+class ContentManifest:
+    """SQLite table of ``path -> (size, mtime_ns, hash)`` shared by all stages."""
+
+    def __init__(self, db_path: Path = MANIFEST_DB) -> None:
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, hash TEXT NOT NULL, ts REAL)"
+        )
+        self._conn.commit()
+
+    def lookup(self, path: Path) -> Optional[str]:
+        """Stored hash of ``path`` if the file is unchanged since it was hashed."""
+
+        try:
+            size, mtime_ns = _stat(path)
+        except OSError:
+            return None
+        with self._lock:
+            row = self._conn.execute("SELECT size, mtime_ns, hash FROM files WHERE path = ?", (_key(path),)).fetchone()
+        if row is None or row[0] != size or row[1] != mtime_ns:
+            return None
+        return row[2]
+
+    def hash_of(self, path: Path) -> str:
+        """Hash of ``path``, computing and recording it only when stale."""
+
+        return self.hash_files([path], workers=1)[_key(path)]
+
+    def hash_files(self, paths: Iterable[Path], workers: int = 4) -> Dict[str, str]:
+        """Hashes keyed by resolved path; only new or changed files are read."""
+
+        result: Dict[str, str] = {}
+        stale = []
+        for path in paths:
+            known = self.lookup(path)
+            if known is None:
+                stale.append(Path(path))
+            else:
+                result[_key(path)] = known
+        if not stale:
+            return result
+
+        def _hash(path: Path) -> Tuple[Path, Tuple[int, int], str]:
+            stat = _stat(path)
+            return path, stat, content_hash(path)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(workers, len(stale)))) as pool:
+            hashed = list(pool.map(_hash, stale))
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO files (path, size, mtime_ns, hash, ts) VALUES (?, ?, ?, ?, ?)",
+                [(_key(path), size, mtime_ns, digest, now) for path, (size, mtime_ns), digest in hashed],
+            )
+            self._conn.commit()
+        for path, _, digest in hashed:
+            result[_key(path)] = digest
+        return result
+
+    def close(self) -> None:
+        self._conn.close()
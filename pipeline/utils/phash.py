@@ -0,0 +1,228 @@
+"""Perceptual hashes and a persistent Hamming-radius index for card images."""
+from __future__ import annotations
+
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+HASH_SIZE = 8
+BANDS = 4
+BAND_BITS = 64 // BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+
+if hasattr(np, "bitwise_count"):
+    def _popcount(values: np.ndarray) -> np.ndarray:
+        return np.bitwise_count(values)
+else:  # pragma: no cover - numpy < 2.0
+    _BYTE_BITS = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def _popcount(values: np.ndarray) -> np.ndarray:
+        as_bytes = values.view(np.uint8).reshape(-1, 8)
+        return _BYTE_BITS[as_bytes].sum(axis=1)
+
+
+def _block_mean(pixels: np.ndarray, rows: int, cols: int) -> np.ndarray:
+    """Area-average ``pixels`` down to ``rows`` x ``cols``."""
+
+    height, width = pixels.shape
+    row_edges = np.linspace(0, height, rows + 1).astype(int)
+    col_edges = np.linspace(0, width, cols + 1).astype(int)
+    # Summed-area table gives every block sum in one vectorised lookup.
+    table = np.zeros((height + 1, width + 1), dtype=np.float64)
+    table[1:, 1:] = pixels.cumsum(axis=0).cumsum(axis=1)
+    r0, r1 = row_edges[:-1, None], row_edges[1:, None]
+    c0, c1 = col_edges[None, :-1], col_edges[None, 1:]
+    sums = table[r1, c1] - table[r0, c1] - table[r1, c0] + table[r0, c0]
+    area = (r1 - r0) * (c1 - c0)
+    return sums / np.maximum(area, 1)
+
+
+def _load(image: Path | Image.Image) -> Image.Image:
+    if isinstance(image, Image.Image):
+        return image.copy()
+    with Image.open(image) as img:
+        img.draft("RGB", (256, 256))
+        img.load()
+        return img.copy()
+
+
+def image_signature(image: Path | Image.Image) -> Tuple[int, Tuple[int, int, int]]:
+    """Return ``(dhash, mean_rgb)`` for an image.
+
+    The 64-bit difference hash compares neighbouring cells of a 9x8
+    grayscale grid; the mean colour separates parallels that share artwork
+    but not ink (e.g. base vs. a coloured refractor).
+    """
+
+    img = _load(image)
+    img.thumbnail((256, 256))
+    rgb = np.asarray(img.convert("RGB"), dtype=np.float64)
+    mean_rgb = tuple(int(round(v)) for v in rgb.reshape(-1, 3).mean(axis=0))
+    gray = rgb @ np.array([0.299, 0.587, 0.114])
+    grid = _block_mean(gray, HASH_SIZE, HASH_SIZE + 1)
+    bits = (grid[:, 1:] > grid[:, :-1]).flatten()
+    value = int.from_bytes(np.packbits(bits).tobytes(), "big")
+    return value, mean_rgb  # type: ignore[return-value]
+
+
+def dhash(image: Path | Image.Image) -> int:
+    return image_signature(image)[0]
+
+
+def hamming(left: int, right: int) -> int:
+    return bin((left ^ right) & 0xFFFFFFFFFFFFFFFF).count("1")
+
+
+class HashIndex:
+    """In-memory multi-index hash over packed ``uint64`` hashes.
+
+    Each hash is split into four 16-bit bands. Any hash within a Hamming
+    radius below four shares at least one band exactly with the query, so
+    candidates come from four dict lookups and are verified with a
+    vectorised popcount. Larger radii fall back to a full vectorised scan.
+    """
+
+    def __init__(self) -> None:
+        self._hashes = np.zeros(0, dtype=np.uint64)
+        self._pending: List[int] = []
+        self._bands: List[Dict[int, List[int]]] = [dict() for _ in range(BANDS)]
+
+    def __len__(self) -> int:
+        return len(self._hashes) + len(self._pending)
+
+    def add(self, value: int) -> int:
+        position = len(self)
+        self._pending.append(value)
+        for band in range(BANDS):
+            key = (value >> (band * BAND_BITS)) & BAND_MASK
+            self._bands[band].setdefault(key, []).append(position)
+        return position
+
+    def extend(self, values: Sequence[int]) -> None:
+        for value in values:
+            self.add(value)
+
+    def _packed(self) -> np.ndarray:
+        if self._pending:
+            extra = np.array(self._pending, dtype=np.uint64)
+            self._hashes = np.concatenate([self._hashes, extra])
+            self._pending = []
+        return self._hashes
+
+    def value_at(self, position: int) -> int:
+        return int(self._packed()[position])
+
+    def query(self, value: int, radius: int) -> List[Tuple[int, int]]:
+        """Return ``(position, distance)`` pairs within ``radius``, nearest first."""
+
+        hashes = self._packed()
+        if not len(hashes):
+            return []
+        if radius < BANDS:
+            candidates = set()
+            for band in range(BANDS):
+                key = (value >> (band * BAND_BITS)) & BAND_MASK
+                candidates.update(self._bands[band].get(key, ()))
+            if not candidates:
+                return []
+            positions = np.fromiter(candidates, dtype=np.int64)
+        else:
+            positions = np.arange(len(hashes))
+        distances = _popcount(hashes[positions] ^ np.uint64(value))
+        keep = distances <= radius
+        matches = sorted(zip(distances[keep].tolist(), positions[keep].tolist()))
+        return [(position, distance) for distance, position in matches]
+
+
+def _to_signed(value: int) -> int:
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _to_unsigned(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+class PhashStore:
+    """SQLite-backed table of image hashes with a JSON payload per entry.
+
+    Entries are keyed by SKU. The whole table is loaded into a
+    :class:`HashIndex` on open; new entries are written through immediately
+    so a crash never loses what was already cataloged.
+    """
+
+    def __init__(self, db_path: Path, table: str) -> None:
+        if not table.isidentifier():
+            raise ValueError(f"Invalid table name: {table}")
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._table = table
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "sku TEXT PRIMARY KEY, hash INTEGER NOT NULL, color TEXT, payload TEXT NOT NULL, ts REAL)"
+        )
+        self._conn.commit()
+        self._index = HashIndex()
+        self._rows: List[Tuple[str, Tuple[int, int, int], Dict[str, Any]]] = []
+        self._latest: Dict[str, int] = {}
+        for sku, value, color, payload in self._conn.execute(
+            f"SELECT sku, hash, color, payload FROM {table} ORDER BY ts"
+        ):
+            self._append(sku, _to_unsigned(value), tuple(json.loads(color or "[0,0,0]")), json.loads(payload))
+
+    def __len__(self) -> int:
+        return len(self._latest)
+
+    def _append(self, sku: str, value: int, color: Tuple[int, ...], payload: Dict[str, Any]) -> None:
+        # Replaced entries stay in the index but are skipped via ``_latest``.
+        self._latest[sku] = self._index.add(value)
+        self._rows.append((sku, color, payload))  # type: ignore[arg-type]
+
+    def add(self, sku: str, signature: Tuple[int, Tuple[int, int, int]], payload: Dict[str, Any]) -> None:
+        value, color = signature
+        self._conn.execute(
+            f"INSERT OR REPLACE INTO {self._table} (sku, hash, color, payload, ts) VALUES (?, ?, ?, ?, ?)",
+            (sku, _to_signed(value), json.dumps(list(color)), json.dumps(payload, ensure_ascii=False), time.time()),
+        )
+        self._conn.commit()
+        self._append(sku, value, color, payload)
+
+    def get(self, sku: str) -> Optional[Tuple[Tuple[int, Tuple[int, int, int]], Dict[str, Any]]]:
+        """Current ``(signature, payload)`` stored for ``sku``."""
+
+        position = self._latest.get(sku)
+        if position is None:
+            return None
+        _, color, payload = self._rows[position]
+        return (self._index.value_at(position), color), payload
+
+    def nearest(
+        self,
+        signature: Tuple[int, Tuple[int, int, int]],
+        radius: int,
+        max_color_delta: Optional[int] = None,
+        accept: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    ) -> Optional[Tuple[str, Dict[str, Any], int]]:
+        """Closest entry within ``radius`` (and colour tolerance), if any.
+
+        ``accept`` can reject candidates on their payload, e.g. layout checks.
+        """
+
+        value, color = signature
+        for position, distance in self._index.query(value, radius):
+            sku, row_color, payload = self._rows[position]
+            if self._latest.get(sku) != position:
+                continue
+            if max_color_delta is not None and max(abs(a - b) for a, b in zip(color, row_color)) > max_color_delta:
+                continue
+            if accept is not None and not accept(payload):
+                continue
+            return sku, payload, distance
+        return None
+
+    def close(self) -> None:
+        self._conn.close()
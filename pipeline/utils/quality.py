@@ -0,0 +1,171 @@
+"""Fast NumPy image-quality metrics used to reject bad scans before a provider call."""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+ANALYSIS_EDGE = 512
+BORDER_FRACTION = 0.03
+BUSY_BORDER_STD = 25.0
+FOREGROUND_DELTA = 30.0
+PROJECTION_FRACTION = 0.05
+
+DEFAULT_THRESHOLDS = {
+    "min_sharpness": 15.0,
+    "max_clipped": 0.25,
+    "min_coverage": 0.35,
+}
+
+
+def gray_array(src: Path | Image.Image, max_edge: int = ANALYSIS_EDGE) -> np.ndarray:
+    """Load ``src`` as a float32 grayscale array no larger than ``max_edge``."""
+
+    if isinstance(src, Image.Image):
+        img = src.copy()
+    else:
+        with Image.open(src) as opened:
+            opened.draft("L", (max_edge, max_edge))
+            img = opened.copy()
+    img = img.convert("L")
+    img.thumbnail((max_edge, max_edge))
+    return np.asarray(img, dtype=np.float32)
+
+
+def sharpness(gray: np.ndarray) -> float:
+    """Variance of the 4-neighbour Laplacian; low values mean blur."""
+
+    if gray.shape[0] < 3 or gray.shape[1] < 3:
+        return 0.0
+    centre = gray[1:-1, 1:-1]
+    laplacian = gray[:-2, 1:-1] + gray[2:, 1:-1] + gray[1:-1, :-2] + gray[1:-1, 2:] - 4.0 * centre
+    return float(laplacian.var())
+
+
+def clipped_fraction(gray: np.ndarray) -> Tuple[float, float]:
+    """Fractions of pixels crushed to black and blown to white."""
+
+    histogram = np.bincount(gray.astype(np.uint8).ravel(), minlength=256)
+    total = float(histogram.sum() or 1)
+    return float(histogram[:3].sum() / total), float(histogram[253:].sum() / total)
+
+
+def _border_pixels(gray: np.ndarray) -> np.ndarray:
+    height, width = gray.shape
+    band_h = max(1, int(height * BORDER_FRACTION))
+    band_w = max(1, int(width * BORDER_FRACTION))
+    return np.concatenate(
+        [
+            gray[:band_h].ravel(),
+            gray[-band_h:].ravel(),
+            gray[:, :band_w].ravel(),
+            gray[:, -band_w:].ravel(),
+        ]
+    )
+
+
+def card_bbox(gray: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
+    """Bounding box ``(left, top, right, bottom)`` of the card on the scanner bed.
+
+    The bed colour is taken from the frame border; rows and columns whose
+    share of non-bed pixels exceeds a small threshold bound the card. Returns
+    ``None`` when the border is busy (the card already fills the frame) or
+    nothing stands out from the bed.
+    """
+
+    border = _border_pixels(gray)
+    if border.std() > BUSY_BORDER_STD:
+        return None
+    background = float(np.median(border))
+    mask = np.abs(gray - background) > FOREGROUND_DELTA
+    rows = np.flatnonzero(mask.mean(axis=1) > PROJECTION_FRACTION)
+    cols = np.flatnonzero(mask.mean(axis=0) > PROJECTION_FRACTION)
+    if not len(rows) or not len(cols):
+        return None
+    return int(cols[0]), int(rows[0]), int(cols[-1]) + 1, int(rows[-1]) + 1
+
+
+def skew_angle(gray: np.ndarray, max_angle: float = 10.0) -> float:
+    """Counter-clockwise rotation (degrees) that squares the card to the frame.
+
+    The card silhouette is the bed-contrasting mask filled row by row; the
+    orientation of its second moments gives the tilt of its long axis.
+    Returns 0.0 when no card stands out or the tilt exceeds ``max_angle``.
+    """
+
+    border = _border_pixels(gray)
+    if border.std() > BUSY_BORDER_STD:
+        return 0.0
+    mask = np.abs(gray - float(np.median(border))) > FOREGROUND_DELTA
+    filled = np.logical_and.reduce(
+        [
+            np.maximum.accumulate(mask, axis=1),
+            np.maximum.accumulate(mask[:, ::-1], axis=1)[:, ::-1],
+        ]
+    )
+    ys, xs = np.nonzero(filled)
+    if len(xs) < 100:
+        return 0.0
+    x = xs - xs.mean()
+    y = ys - ys.mean()
+    mu20, mu02, mu11 = float((x * x).mean()), float((y * y).mean()), float((x * y).mean())
+    theta = 0.5 * np.degrees(np.arctan2(2.0 * mu11, mu20 - mu02))
+    deviation = theta - 90.0 * round(theta / 90.0)
+    if abs(deviation) > max_angle:
+        return 0.0
+    return float(deviation)
+
+
+def coverage(gray: np.ndarray) -> float:
+    """Share of the frame covered by the detected card (1.0 when it fills it)."""
+
+    height, width = gray.shape
+    border = _border_pixels(gray)
+    if border.std() > BUSY_BORDER_STD:
+        return 1.0
+    box = card_bbox(gray)
+    if box is None:
+        return 0.0
+    left, top, right, bottom = box
+    return (right - left) * (bottom - top) / float(width * height)
+
+
+def score_image(src: Path | Image.Image) -> Dict[str, float]:
+    gray = gray_array(src)
+    dark, bright = clipped_fraction(gray)
+    return {
+        "sharpness": round(sharpness(gray), 2),
+        "clipped_dark": round(dark, 4),
+        "clipped_bright": round(bright, 4),
+        "coverage": round(coverage(gray), 4),
+    }
+
+
+def rejection_reason(scores: Dict[str, float], thresholds: Dict[str, Any]) -> Optional[str]:
+    """Human-readable reason the scores fail ``thresholds``, or ``None``."""
+
+    limits = dict(DEFAULT_THRESHOLDS)
+    limits.update({key: value for key, value in thresholds.items() if value is not None})
+    if scores["sharpness"] < float(limits["min_sharpness"]):
+        return f"blurry (sharpness {scores['sharpness']:.1f} < {float(limits['min_sharpness']):.1f})"
+    clipped = max(scores["clipped_dark"], scores["clipped_bright"])
+    if clipped > float(limits["max_clipped"]):
+        side = "under" if scores["clipped_dark"] >= scores["clipped_bright"] else "over"
+        return f"{side}exposed ({clipped:.0%} of pixels clipped)"
+    if scores["coverage"] < float(limits["min_coverage"]):
+        return f"mis-cropped (card covers {scores['coverage']:.0%} of frame)"
+    return None
+
+
+def check_pair(front: Path, back: Optional[Path], thresholds: Dict[str, Any]) -> Optional[str]:
+    """First failing side of a pair as ``"front: <reason>"``, or ``None``."""
+
+    for side, path in (("front", front), ("back", back)):
+        if path is None:
+            continue
+        reason = rejection_reason(score_image(path), thresholds)
+        if reason:
+            return f"{side}: {reason}"
+    return None
@@ -0,0 +1,180 @@
+"""Canonical set, brand and parallel names with trigram fuzzy lookup.
+
+The vocabulary file maps each record field to ``{canonical: [aliases]}``
+plus an optional ``abbreviations`` table applied word by word (``UD`` ->
+``upper deck``) and an optional ``categories`` table listing the canonical
+names that belong to one card category only. Lookups normalise case and
+punctuation, try an exact alias hit, then score candidates sharing a
+trigram by Dice similarity. A fuzzy candidate much longer than the input
+("Silver" against "Silver Prizm") is not a near miss and never matches.
+"""
+from __future__ import annotations
+
+import collections
+import json
+import re
+import unicodedata
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+
+VOCAB_PATH = Path("pipeline/config/vocab.json")
+MAX_EXTRA = 0.34
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+
+
+class Match(NamedTuple):
+    name: str
+    score: float
+    ambiguous: bool
+
+
+def _trigrams(key: str) -> Set[str]:
+    padded = f"  {key} "
+    return {padded[index : index + 3] for index in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """Inverted trigram index over the canonical names and aliases of one field."""
+
+    def __init__(
+        self,
+        names: Dict[str, List[str]],
+        abbreviations: Optional[Dict[str, str]] = None,
+        scopes: Optional[Dict[str, Set[str]]] = None,
+    ) -> None:
+        self.abbreviations = {self._clean(short): self._clean(full) for short, full in (abbreviations or {}).items()}
+        self.scopes = scopes or {}
+        self._exact: Dict[str, str] = {}
+        self._entries: List[Tuple[str, int, int]] = []
+        self._postings: Dict[str, List[int]] = collections.defaultdict(list)
+        for canonical, aliases in names.items():
+            for spelling in [canonical, *aliases]:
+                key = self.key(spelling)
+                if not key or key in self._exact:
+                    continue
+                self._exact[key] = canonical
+                grams = _trigrams(key)
+                entry_id = len(self._entries)
+                self._entries.append((canonical, len(grams), len(key)))
+                for gram in grams:
+                    self._postings[gram].append(entry_id)
+
+    @staticmethod
+    def _clean(text: str) -> str:
+        folded = unicodedata.normalize("NFKD", text.casefold()).encode("ascii", "ignore").decode("ascii")
+        return " ".join(_NON_WORD.sub(" ", folded).split())
+
+    def key(self, text: str) -> str:
+        words = self._clean(text).split()
+        return " ".join(self.abbreviations.get(word, word) for word in words)
+
+    def _in_scope(self, canonical: str, category: Optional[str]) -> bool:
+        scope = self.scopes.get(canonical)
+        return scope is None or category is None or category in scope
+
+    def lookup(
+        self,
+        text: str,
+        min_score: float = 0.7,
+        margin: float = 0.05,
+        category: Optional[str] = None,
+        max_extra: float = MAX_EXTRA,
+    ) -> Optional[Match]:
+        """Best canonical name for ``text`` or ``None`` below ``min_score``.
+
+        Names scoped to another ``category`` are skipped, and so are fuzzy
+        candidates whose key is more than ``max_extra`` (a share of its own
+        length) longer than the input's. The match is ambiguous when a
+        different canonical name scores at least ``min_score`` and within
+        ``margin`` of the best one.
+        """
+
+        key = self.key(text)
+        if not key:
+            return None
+        exact = self._exact.get(key)
+        if exact is not None and self._in_scope(exact, category):
+            return Match(exact, 1.0, False)
+        grams = _trigrams(key)
+        shared: Dict[int, int] = collections.Counter()
+        for gram in grams:
+            for entry_id in self._postings.get(gram, ()):
+                shared[entry_id] += 1
+        scores: Dict[str, float] = {}
+        for entry_id, overlap in shared.items():
+            canonical, size, length = self._entries[entry_id]
+            if length - len(key) > max_extra * length or not self._in_scope(canonical, category):
+                continue
+            score = 2.0 * overlap / (size + len(grams))
+            if score > scores.get(canonical, 0.0):
+                scores[canonical] = score
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        if not ranked or ranked[0][1] < min_score:
+            return None
+        best, score = ranked[0]
+        ambiguous = len(ranked) > 1 and ranked[1][1] >= min_score and score - ranked[1][1] < margin
+        return Match(best, round(score, 3), ambiguous)
+
+
+class Vocabulary:
+    """One :class:`TrigramIndex` per record field listed in the vocabulary file."""
+
+    def __init__(self, data: Dict[str, Any]) -> None:
+        abbreviations = data.get("abbreviations") or {}
+        scopes: Dict[str, Set[str]] = {}
+        for category, canonicals in (data.get("categories") or {}).items():
+            for canonical in canonicals:
+                scopes.setdefault(canonical, set()).add(category)
+        self.fields = {
+            name: TrigramIndex(names, abbreviations, scopes)
+            for name, names in data.items()
+            if name not in ("abbreviations", "categories") and isinstance(names, dict)
+        }
+
+    def snap(
+        self,
+        record: Dict[str, Any],
+        min_score: float = 0.7,
+        margin: float = 0.05,
+        penalty: float = 0.1,
+    ) -> List[Dict[str, Any]]:
+        """Rewrite near-miss values in ``record`` in place; returns the changes.
+
+        Only names shared by every category or scoped to the record's
+        ``cat`` are candidates. Clear matches are snapped silently. Ambiguous
+        matches are snapped to the best candidate and ``conf`` is lowered by
+        ``penalty``, once per record.
+        """
+
+        category = record.get("cat") if isinstance(record.get("cat"), str) else None
+        changes = []
+        for name, index in self.fields.items():
+            value = record.get(name)
+            if not isinstance(value, str) or not value:
+                continue
+            match = index.lookup(value, min_score, margin, category)
+            if match is None or match.name == value:
+                continue
+            record[name] = match.name
+            changes.append(
+                {"field": name, "from": value, "to": match.name, "score": match.score, "ambiguous": match.ambiguous}
+            )
+        if any(change["ambiguous"] for change in changes) and "conf" in record:
+            record["conf"] = round(max(0.0, float(record["conf"]) - penalty), 4)
+        return changes
+
+
+@lru_cache(maxsize=4)
+def _load(path: str, mtime_ns: int) -> Vocabulary:
+    return Vocabulary(json.loads(Path(path).read_text(encoding="utf-8")))
+
+
+def load_vocabulary(path: Path = VOCAB_PATH) -> Optional[Vocabulary]:
+    """Cached :class:`Vocabulary` for ``path``; reloaded when the file changes."""
+
+    try:
+        mtime_ns = Path(path).stat().st_mtime_ns
+    except OSError:
+        return None
+    return _load(str(path), mtime_ns)
@@ -1,5 +1,8 @@
 import os, re, time, shutil
+from pathlib import Path
+from pipeline import prepare
 from pipeline.utils import fs, naming, log
+from pipeline.utils.manifest import ContentManifest
 
 def find_pairs(inbox):
     files = [f for f in os.listdir(inbox) if os.path.isfile(os.path.join(inbox,f))]
@@ -13,33 +16,52 @@ def find_pairs(inbox):
         d.setdefault(base, {})[side.upper()] = f
     return [(base, sides['F'], sides['B']) for base, sides in d.items() if 'F' in sides and 'B' in sides]
 
-def process(inbox='Scans_Inbox', ready='Scans_Ready', error='Scans_Error'):
+def pair_one(inbox, ready, error, base, fF, fB):
+    """Move one front/back pair into ``ready``; returns its folder, or None on error."""
+    try:
+        sku = base
+        naming.parse_sku(base)  # validate
+        dst_dir = os.path.join(ready, sku)
+        fs.ensure_dir(dst_dir)
+        fs.atomic_move(os.path.join(inbox,fF), os.path.join(dst_dir, fF))
+        fs.atomic_move(os.path.join(inbox,fB), os.path.join(dst_dir, fB))
+        with open(os.path.join(dst_dir,'pair.json'),'w') as fp:
+            fp.write('{"status":"paired"}')
+        log.event('pair', sku, moved=2)
+        return dst_dir
+    except Exception as e:
+        # move to error
+        err_dir = os.path.join(error, base.replace('/','_'))
+        fs.ensure_dir(err_dir)
+        for fn in [fF,fB]:
+            src = os.path.join(inbox,fn)
+            if os.path.exists(src):
+                fs.atomic_move(src, os.path.join(err_dir, fn))
+        with open(os.path.join(err_dir,'error.txt'),'w') as fp:
+            fp.write(str(e))
+        log.event('pair', base, status='error', msg=str(e))
+        return None
+
+def process(inbox='Scans_Inbox', ready='Scans_Ready', error='Scans_Error', prepare_config=None, workers=2):
     os.makedirs(inbox, exist_ok=True)
     os.makedirs(ready, exist_ok=True)
     os.makedirs(error, exist_ok=True)
     pairs = find_pairs(inbox)
     moved = 0
+    paired = []
     for base, fF, fB in pairs:
-        try:
-            sku = base
-            naming.parse_sku(base)  # validate
-            dst_dir = os.path.join(ready, sku)
-            fs.ensure_dir(dst_dir)
-            fs.atomic_move(os.path.join(inbox,fF), os.path.join(dst_dir, fF))
-            fs.atomic_move(os.path.join(inbox,fB), os.path.join(dst_dir, fB))
-            with open(os.path.join(dst_dir,'pair.json'),'w') as fp:
-                fp.write('{"status":"paired"}')
-            log.event('pair', sku, moved=2)
+        dst_dir = pair_one(inbox, ready, error, base, fF, fB)
+        if dst_dir is not None:
+            paired.append(dst_dir)
             moved += 1
-        except Exception as e:
-            # move to error
-            err_dir = os.path.join(error, base.replace('/','_'))
-            fs.ensure_dir(err_dir)
-            for fn in [fF,fB]:
-                src = os.path.join(inbox,fn)
-                if os.path.exists(src):
-                    fs.atomic_move(src, os.path.join(err_dir, fn))
-            with open(os.path.join(err_dir,'error.txt'),'w') as fp:
-                fp.write(str(e))
-            log.event('pair', base, status='error', msg=str(e))
+    if paired:
+        folders = [Path(d) for d in paired]
+        manifest = ContentManifest()
+        try:
+            hashes = manifest.hash_files([f for d in folders for f in prepare.scan_files(d)], workers=workers)
+        finally:
+            manifest.close()
+        if prepare_config is not None:
+            # Spend the CPU on derivatives now so `post` only loads ready bytes.
+            prepare.prepare_many(folders, prepare_config, workers=workers, hashes=hashes)
     return moved
@@ -0,0 +1,171 @@
+"""Compare separate front/back images with the composite mode on the mock provider.
+
+Usage:
+    python scripts/bench_composite.py                 # synthetic cards per category
+    python scripts/bench_composite.py --ready Scans_Ready --limit 50
+
+For every category the script prepares each card both ways, measures
+preparation throughput, request image bytes (base64), image part count and
+estimated vision tokens, then runs the mock stand-in on both payloads and
+reports how often the two records agree. The mock ignores pixels, so the
+agreement column checks the plumbing, not model accuracy; re-run against the
+real provider before switching a category over.
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import json
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from PIL import Image, ImageDraw  # noqa: E402
+
+from pipeline import postprocess  # noqa: E402
+from pipeline.utils import naming  # noqa: E402
+from pipeline.utils.hints import determine_capsule  # noqa: E402
+from pipeline.utils.images import estimate_image_tokens  # noqa: E402
+
+SYNTHETIC_CODES = {"MM": "marvel", "SP": "sports", "PK": "pokemon", "ZZ": "other"}
+
+
+def _synthetic_card(path: Path, seed: int, size: Tuple[int, int] = (1500, 2100)) -> None:
+    rng = random.Random(seed)
+    img = Image.new("RGB", size, tuple(rng.randint(120, 255) for _ in range(3)))
+    draw = ImageDraw.Draw(img)
+    for _ in range(40):
+        x0, y0 = rng.randint(0, size[0]), rng.randint(0, size[1])
+        colour = tuple(rng.randint(0, 255) for _ in range(3))
+        draw.rectangle([x0, y0, x0 + rng.randint(20, 400), y0 + rng.randint(10, 300)], fill=colour)
+    for line in range(30):
+        draw.text((60, 80 + line * 60), f"#{seed:04d} STATS {rng.random():.5f}", fill=(0, 0, 0))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    img.save(path, quality=92)
+
+
+def _synthetic_cards(root: Path, per_category: int) -> List[Tuple[str, Path, Path]]:
+    cards = []
+    for code in SYNTHETIC_CODES:
+        for seq in range(1, per_category + 1):
+            sku = f"Box1-{code}_{seq:04d}"
+            front = root / sku / f"{sku}_F.jpg"
+            back = root / sku / f"{sku}_B.jpg"
+            _synthetic_card(front, seq * 2)
+            _synthetic_card(back, seq * 2 + 1)
+            cards.append((sku, front, back))
+    return cards
+
+
+def _ready_cards(ready: Path, limit: int) -> List[Tuple[str, Path, Path]]:
+    cards = []
+    for folder in sorted(p for p in ready.iterdir() if p.is_dir()):
+        try:
+            naming.parse_sku(folder.name)
+        except ValueError:
+            continue
+        images = sorted(p.name for p in folder.iterdir() if p.suffix.lower() in {".jpg", ".jpeg", ".png", ".tif", ".tiff"})
+        if not images:
+            continue
+        front, back = postprocess._find_front_back(folder, images)
+        cards.append((folder.name, front, back))
+        if len(cards) >= limit:
+            break
+    return cards
+
+
+def _payload_stats(paths: List[Path]) -> Tuple[int, int]:
+    encoded = 0
+    tokens = 0
+    for path in paths:
+        encoded += len(base64.b64encode(path.read_bytes()))
+        with Image.open(path) as img:
+            tokens += estimate_image_tokens(*img.size)
+    return encoded, tokens
+
+
+def _run_mode(
+    sku: str, front: Path, back: Path, work: Path, max_edge: int, composite_pixels: Optional[int]
+) -> Dict[str, object]:
+    started = time.perf_counter()
+    front_prepped, back_prepped = postprocess._prepare_images(front, back, sku, work.name, True, max_edge)
+    source = postprocess._image_source(None, None, front_prepped, back_prepped, composite_pixels, work / sku)
+    image, second = source(None)
+    prep_s = time.perf_counter() - started
+    parts = [image] + ([second] if second else [])
+    encoded, tokens = _payload_stats(parts)
+    capsule = determine_capsule(sku)
+    record = postprocess._normalise(postprocess._fake_model_response(sku, capsule))
+    return {"prep_s": prep_s, "bytes": encoded, "tokens": tokens, "parts": len(parts), "record": record}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ready", type=Path, help="Use real scans from this Scans_Ready folder.")
+    parser.add_argument("--limit", type=int, default=40)
+    parser.add_argument("--per-category", type=int, default=5)
+    parser.add_argument("--max-edge", type=int, default=postprocess.DEFAULT_CONFIG["image_max_edge"])
+    parser.add_argument("--max-pixels", type=int, default=postprocess.DEFAULT_CONFIG["composite_max_pixels"])
+    parser.add_argument("--json", action="store_true", help="Print the table as JSON.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_root = Path(tmp)
+        if args.ready:
+            cards = _ready_cards(args.ready, args.limit)
+        else:
+            cards = _synthetic_cards(tmp_root / "scans", args.per_category)
+        postprocess.TMP_DIR = tmp_root / "prepared"
+
+        totals: Dict[str, Dict[str, Dict[str, float]]] = defaultdict(lambda: defaultdict(lambda: defaultdict(float)))
+        for sku, front, back in cards:
+            category = determine_capsule(sku).get("likely_cat", "other")
+            results = {}
+            for mode, pixels in (("separate", None), ("composite", args.max_pixels)):
+                work = tmp_root / mode
+                results[mode] = _run_mode(sku, front, back, work, args.max_edge, pixels)
+                bucket = totals[category][mode]
+                bucket["cards"] += 1
+                for key in ("prep_s", "bytes", "tokens", "parts"):
+                    bucket[key] += results[mode][key]  # type: ignore[operator]
+            agree = results["separate"]["record"] == results["composite"]["record"]
+            totals[category]["composite"]["agree"] += int(agree)
+
+    table = []
+    for category in sorted(totals):
+        separate, composite = totals[category]["separate"], totals[category]["composite"]
+        cards_n = separate["cards"] or 1
+        table.append(
+            {
+                "category": category,
+                "cards": int(separate["cards"]),
+                "separate_cards_per_s": round(cards_n / (separate["prep_s"] or 1e-9), 1),
+                "composite_cards_per_s": round(cards_n / (composite["prep_s"] or 1e-9), 1),
+                "separate_kb": round(separate["bytes"] / cards_n / 1024, 1),
+                "composite_kb": round(composite["bytes"] / cards_n / 1024, 1),
+                "separate_tokens": round(separate["tokens"] / cards_n),
+                "composite_tokens": round(composite["tokens"] / cards_n),
+                "image_parts": f"{separate['parts'] / cards_n:.0f} -> {composite['parts'] / cards_n:.0f}",
+                "mock_agreement": round(composite["agree"] / cards_n, 3),
+            }
+        )
+
+    if args.json:
+        print(json.dumps(table, indent=2))
+        return
+    headers = list(table[0].keys()) if table else []
+    print(" | ".join(headers))
+    for row in table:
+        print(" | ".join(str(row[key]) for key in headers))
+
+
+if __name__ == "__main__":
+    main()
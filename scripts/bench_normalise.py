@@ -0,0 +1,98 @@
+"""Compare per-record ``_normalise`` with the bulk ``_normalise_many`` path.
+
+Usage:
+    python scripts/bench_normalise.py                   # 200k synthetic records
+    python scripts/bench_normalise.py --count 1000000
+    python scripts/bench_normalise.py --json-dir pipeline/output/batch_x/results/json
+
+Records are either synthetic (a spread of aliases, blanks and odd types as
+models return them) or loaded from a folder of stored ``<SKU>.json``
+records. Both paths run over the same list; the script checks that their
+outputs are identical and reports records per second for each.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from pipeline import postprocess  # noqa: E402
+
+POOLS: Dict[str, List[Any]] = {
+    "cat": ["Sports Cards", "sport", "TCG", "marvel", "Pokémon", "", None, "baseball"],
+    "brand": [" Topps ", "Panini", "", None],
+    "set": ["Chrome", "Prizm", " Legends ", None],
+    "year": ["1999", 2021, "", None, "20x1"],
+    "player": ["  Ken Griffey Jr. ", "Mike Trout", None],
+    "character": ["Storm", "Pikachu", None],
+    "num": [15, " 7a ", "", None],
+    "variant": ["Refractor", "", None],
+    "auto": ["yes", "no", True, None],
+    "mem": [False, "true", None],
+    "grade": ["", None, "PSA 9"],
+    "cond": ["Near Mint", "ex", "vg", "raw", None, "poor"],
+    "notes": ["  corner wear ", "", None],
+    "price_est": ["12.5", 0, "", None, 4],
+    "conf": ["0.82", 0.5, 0.93, None],
+}
+
+
+def _synthetic(count: int, seed: int = 1) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    records = []
+    for index in range(count):
+        raw = {key: rng.choice(values) for key, values in POOLS.items() if rng.random() < 0.85}
+        raw["sku"] = f"Box1-SP_{index:07d}"
+        raw.setdefault("cat", "sports")
+        raw.setdefault("conf", 0.5)
+        records.append(raw)
+    return records
+
+
+def _stored(folder: Path) -> List[Dict[str, Any]]:
+    return [json.loads(path.read_text(encoding="utf-8")) for path in sorted(folder.glob("*.json"))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=200_000)
+    parser.add_argument("--json-dir", type=Path, help="Benchmark stored records from this folder instead.")
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON.")
+    args = parser.parse_args()
+
+    raws = _stored(args.json_dir) if args.json_dir else _synthetic(args.count)
+
+    started = time.perf_counter()
+    single = [postprocess._normalise(dict(raw)) for raw in raws]
+    single_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    bulk = postprocess._normalise_many(raws)
+    bulk_s = time.perf_counter() - started
+
+    result = {
+        "records": len(raws),
+        "per_record_s": round(single_s, 3),
+        "bulk_s": round(bulk_s, 3),
+        "per_record_rps": round(len(raws) / (single_s or 1e-9)),
+        "bulk_rps": round(len(raws) / (bulk_s or 1e-9)),
+        "speedup": round(single_s / (bulk_s or 1e-9), 2),
+        "identical": single == bulk,
+    }
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    for key, value in result.items():
+        print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,7 @@ import logging
 import re
 from dataclasses import asdict
 from pathlib import Path
-from typing import Dict, Iterable, List, Sequence
+from typing import Dict, Iterable, Iterator, List, Sequence, TextIO
 
 from .classifier import RuleBasedClassifier
 from .clients import Gpt5VisionClient, load_rules
@@ -78,40 +78,67 @@ class CardProcessingPipeline:
         return pairs
 
     def process_pairs(self, pairs: Iterable[CardScanPair]) -> List[CardExtractionResult]:
-        results: List[CardExtractionResult] = []
+        """Process every pair and return all results (see :meth:`iter_pairs` to stream)."""
+
+        return list(self.iter_pairs(pairs))
+
+    def iter_pairs(self, pairs: Iterable[CardScanPair]) -> Iterator[CardExtractionResult]:
+        """Lazily process ``pairs``, yielding each result once it is written.
+
+        Results are appended to the summary file as they are produced rather
+        than collected, so memory stays flat however many pairs there are.
+        The summary is written to a ``.partial`` file and moved into place
+        when the generator finishes, is closed early or stops on an error,
+        so it always lists the cards finished so far.
+        """
+
         processed_dir = self.config.processed_output
         processed_dir.mkdir(parents=True, exist_ok=True)
-        for pair in pairs:
-            LOGGER.info("Processing card scans: %s", pair.front_image.name)
-            result = self._client.analyze_pair(pair)
-            classification = self._classify(result)
-            if classification:
-                result.classification = classification.label
-                result.classification_details = classification
-                details = asdict(classification)
-            else:
-                details = None
-            payload = {
-                "scan_pair": pair.as_payload(),
-                "extraction": result.dict(),
-                "classification_details": details,
-            }
-            results.append(result)
-            self._write_card_payload(processed_dir, pair.front_image.stem, payload)
-        self._write_results_summary(results)
-        return results
+        summary_path = self.config.results_output
+        summary_path.parent.mkdir(parents=True, exist_ok=True)
+        partial = summary_path.with_name(f"{summary_path.name}.partial")
+        summary = partial.open("w", encoding="utf-8")
+        count = 0
+        try:
+            summary.write("[")
+            for pair in pairs:
+                result = self._process_pair(processed_dir, pair)
+                self._append_summary(summary, result, first=count == 0)
+                count += 1
+                yield result
+        finally:
+            summary.write("\n]" if count else "]")
+            summary.close()
+            partial.replace(summary_path)
+            LOGGER.info("Wrote summary for %d cards to %s", count, summary_path)
+
+    def _process_pair(self, processed_dir: Path, pair: CardScanPair) -> CardExtractionResult:
+        LOGGER.info("Processing card scans: %s", pair.front_image.name)
+        result = self._client.analyze_pair(pair)
+        classification = self._classify(result)
+        if classification:
+            result.classification = classification.label
+            result.classification_details = classification
+            details = asdict(classification)
+        else:
+            details = None
+        payload = {
+            "scan_pair": pair.as_payload(),
+            "extraction": result.dict(),
+            "classification_details": details,
+        }
+        self._write_card_payload(processed_dir, pair.front_image.stem, payload)
+        return result
 
     def _write_card_payload(self, directory: Path, stem: str, payload: Dict[str, object]) -> None:
         safe_stem = re.sub(r"[^a-zA-Z0-9_-]+", "_", stem)
         target = directory / f"{safe_stem}.json"
         target.write_text(json.dumps(payload, indent=2, default=str))
 
-    def _write_results_summary(self, results: Sequence[CardExtractionResult]) -> None:
-        summary_path = self.config.results_output
-        summary_path.parent.mkdir(parents=True, exist_ok=True)
-        summary = [result.dict() for result in results]
-        summary_path.write_text(json.dumps(summary, indent=2, default=str))
-        LOGGER.info("Wrote summary for %d cards to %s", len(results), summary_path)
+    def _append_summary(self, handle: TextIO, result: CardExtractionResult, first: bool) -> None:
+        entry = json.dumps(result.dict(), indent=2, default=str).replace("\n", "\n  ")
+        handle.write(("\n  " if first else ",\n  ") + entry)
+        handle.flush()
 
     def _classify(self, result: CardExtractionResult) -> CardClassification | None:
         try:
@@ -62,8 +62,14 @@ def run_pipeline(
     pipeline = CardProcessingPipeline(config)
     files = pipeline.discover_scan_files()
     pairs = pipeline.pair_scans(files)
-    results = pipeline.process_pairs(pairs)
-    typer.echo(json.dumps([result.dict() for result in results], indent=2, default=str))
+    # Echo results as they stream in instead of holding the whole list.
+    typer.echo("[", nl=False)
+    count = 0
+    for result in pipeline.iter_pairs(pairs):
+        entry = json.dumps(result.dict(), indent=2, default=str).replace("\n", "\n  ")
+        typer.echo(("\n  " if count == 0 else ",\n  ") + entry, nl=False)
+        count += 1
+    typer.echo("\n]" if count else "]")
 
 
 @app.command("pair")
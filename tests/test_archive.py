@@ -0,0 +1,39 @@
+import gzip
+import json
+
+from pipeline.utils.archive import ResponseArchive, archive_parts, iter_entries, load, read_index
+
+
+def test_archive_is_plain_gzip_jsonl_with_sku_index(tmp_path):
+    path = tmp_path / 'job' / 'responses.jsonl.gz'
+    archive = ResponseArchive(path, block_size=4)
+    entries = [{'sku': f'Box1-SP_{index:04d}', 'response': {'conf': index / 10}} for index in range(10)]
+    for entry in entries:
+        archive.add(entry)
+    archive.close()
+
+    with gzip.open(path, 'rt', encoding='utf-8') as handle:
+        assert [json.loads(line) for line in handle] == entries
+    assert list(iter_entries(path)) == entries
+    assert len(read_index(path)['blocks']) == 3
+    assert load(path, 'Box1-SP_0009') == entries[9]
+    assert load(path, 'Box1-SP_0005') == entries[5]
+    assert load(path, 'Box1-SP_9999') is None
+
+
+def test_rewrite_keeps_previous_archive_until_close(tmp_path):
+    path = tmp_path / 'job' / 'responses.jsonl.gz'
+    old = ResponseArchive(path, block_size=2)
+    old.add({'sku': 'Box1-SP_0001', 'response': {'conf': 0.5}})
+    old.close()
+
+    new = ResponseArchive(path, block_size=2)
+    for index in range(3):
+        new.add({'sku': f'Box1-SP_{index:04d}', 'response': {'conf': 0.9}})
+    # An unclosed rewrite (a crashed run) leaves the old archive and index intact.
+    assert load(path, 'Box1-SP_0001') == {'sku': 'Box1-SP_0001', 'response': {'conf': 0.5}}
+    assert archive_parts(path.parent) == [path]
+
+    new.close()
+    assert load(path, 'Box1-SP_0001') == {'sku': 'Box1-SP_0001', 'response': {'conf': 0.9}}
+    assert [entry['sku'] for entry in iter_entries(path)] == ['Box1-SP_0000', 'Box1-SP_0001', 'Box1-SP_0002']
@@ -0,0 +1,71 @@
+import json
+
+from PIL import Image
+
+from pipeline import batch_queue
+
+
+def _item(sku, nbytes, tokens):
+    return {'sku': sku, 'images': [], 'est': {'bytes': nbytes, 'tokens': tokens}}
+
+
+def test_pack_budgeted_respects_budgets_and_keeps_codes_together():
+    items = [_item(f'Box1-SP_{index:04d}', 10, 100) for index in range(1, 8)]
+    items += [_item(f'Box1-MM_{index:04d}', 10, 100) for index in range(1, 3)]
+    items += [_item('Box1-PK_0001', 10, 100), _item('Box1-PK_0002', 500, 100)]
+
+    batches = batch_queue.pack_budgeted(items, max_bytes=100, max_tokens=300)
+
+    for batch in batches:
+        if len(batch) > 1:
+            assert sum(item['est']['bytes'] for item in batch) <= 100
+            assert sum(item['est']['tokens'] for item in batch) <= 300
+    skus = [[item['sku'] for item in batch] for batch in batches]
+    assert ['Box1-SP_0001', 'Box1-SP_0002', 'Box1-SP_0003'] in skus
+    assert ['Box1-SP_0004', 'Box1-SP_0005', 'Box1-SP_0006'] in skus
+    assert ['Box1-PK_0002'] in skus
+    assert ['Box1-MM_0001', 'Box1-MM_0002', 'Box1-PK_0001'] in skus
+    # Part-filled tails of different codes share a batch when they fit.
+    assert sorted(sum(skus, [])) == sorted(item['sku'] for item in items)
+    assert len(batches) == 5
+
+
+def test_build_batches_splits_on_image_bytes(tmp_path):
+    ready = tmp_path / 'Scans_Ready'
+    for index, edge in enumerate([48, 48, 48, 400, 400], start=1):
+        sku = f'Box1-SP_{index:04d}'
+        for side in 'FB':
+            path = ready / sku / f'{sku}_{side}.png'
+            path.parent.mkdir(parents=True, exist_ok=True)
+            Image.effect_noise((edge, edge), 80).convert('RGB').save(path)
+    out = tmp_path / 'batches'
+
+    big = sum(path.stat().st_size for path in (ready / 'Box1-SP_0004').iterdir())
+    jobs = batch_queue.build_batches(ready=str(ready), out=str(out), batch_size=None, max_bytes=big + 1)
+
+    batches = [
+        [json.loads(line) for line in (out / f'{job}.jsonl').read_text(encoding='utf-8').splitlines()]
+        for job in jobs
+    ]
+    sizes = sorted(len(batch) for batch in batches)
+    assert sizes == [1, 1, 3]
+    for batch in batches:
+        assert all(item['est']['tokens'] > 0 for item in batch)
+        assert all(len(item['images']) == 2 for item in batch)
+
+
+def test_build_batches_with_budget_keeps_non_sku_folders(tmp_path):
+    ready = tmp_path / 'Scans_Ready'
+    for name in ('Box1-SP_0001', 'misc'):
+        (ready / name).mkdir(parents=True)
+        Image.new('RGB', (32, 32)).save(ready / name / f'{name}_F.png')
+    out = tmp_path / 'batches'
+
+    jobs = batch_queue.build_batches(ready=str(ready), out=str(out), batch_size=None, max_tokens=10_000)
+
+    queued = [
+        json.loads(line)['sku']
+        for job in jobs
+        for line in (out / f'{job}.jsonl').read_text(encoding='utf-8').splitlines()
+    ]
+    assert sorted(queued) == ['Box1-SP_0001', 'misc']
@@ -0,0 +1,49 @@
+import json
+
+from pipeline.postprocess import _pack_groups
+from pipeline.utils.batchfile import BatchReader, Progress
+
+
+def test_reader_yields_items_lazily_with_byte_offsets(tmp_path):
+    path = tmp_path / 'batch.jsonl'
+    lines = [json.dumps({'sku': f'Box1-SP_{index:04d}', 'images': []}) + '\n' for index in range(3)]
+    path.write_text(lines[0] + '\n' + lines[1] + lines[2], encoding='utf-8')
+
+    reader = BatchReader(path)
+    items = iter(reader)
+    assert next(items)['sku'] == 'Box1-SP_0000'
+    assert reader.offset == len(lines[0])
+    assert not reader.exhausted
+    assert [item['sku'] for item in items] == ['Box1-SP_0001', 'Box1-SP_0002']
+    assert reader.offset == reader.total == path.stat().st_size
+    assert reader.exhausted and reader.items == 3
+
+
+def test_progress_reports_eta_at_interval():
+    now = [0.0]
+    progress = Progress(1000, interval_s=10, clock=lambda: now[0])
+    now[0] = 5.0
+    assert progress.update(100) is None
+    now[0] = 20.0
+    report = progress.update(250)
+    assert report == {'bytes_done': 250, 'bytes_total': 1000, 'pct': 25.0, 'elapsed_s': 20.0, 'eta_s': 60.0}
+    now[0] = 25.0
+    assert progress.update(300) is None
+    assert progress.report(1000)['eta_s'] == 0.0
+
+
+def test_pack_groups_yield_full_groups_before_reading_on():
+    consumed = []
+
+    def items():
+        for sku in ['Box1-SP_0001', 'Box1-BD_0001', 'Box1-SP_0002', 'Box1-SP_0003', 'Box1-BD_0002']:
+            consumed.append(sku)
+            yield {'sku': sku}
+
+    groups = _pack_groups(items(), 2)
+    assert [item['sku'] for item in next(groups)] == ['Box1-SP_0001', 'Box1-SP_0002']
+    assert consumed[-1] == 'Box1-SP_0002'
+    assert [[item['sku'] for item in group] for group in groups] == [
+        ['Box1-BD_0001', 'Box1-BD_0002'],
+        ['Box1-SP_0003'],
+    ]
@@ -0,0 +1,32 @@
+import threading
+import time
+
+from pipeline.utils.budget import MemoryBudget
+
+
+def test_budget_blocks_until_released_and_tracks_peak():
+    budget = MemoryBudget(100)
+    budget.acquire(60)
+    admitted = threading.Event()
+
+    def second():
+        budget.acquire(60)
+        admitted.set()
+
+    worker = threading.Thread(target=second)
+    worker.start()
+    time.sleep(0.05)
+    assert not admitted.is_set()
+    budget.release(60)
+    worker.join(timeout=1)
+    assert admitted.is_set()
+    assert budget.peak == 60
+    assert budget.waits == 1
+
+
+def test_oversized_item_runs_alone():
+    budget = MemoryBudget(10)
+    budget.acquire(50)
+    assert budget.in_use == 50
+    budget.release(50)
+    assert budget.in_use == 0
@@ -0,0 +1,71 @@
+import json
+
+from PIL import Image
+
+from mypipeline.card_pipeline import CardProcessingPipeline
+from mypipeline.config import PipelineConfig
+
+
+def _pipeline(tmp_path, names):
+    inbox = tmp_path / 'inbox'
+    inbox.mkdir()
+    for name in names:
+        Image.new('RGB', (8, 8)).save(inbox / name)
+    config = PipelineConfig(
+        scans_inbox=inbox,
+        processed_output=tmp_path / 'processed',
+        results_output=tmp_path / 'results.json',
+        dry_run=True,
+    )
+    return CardProcessingPipeline(config), config
+
+
+def _list_summary(results):
+    # What process_pairs wrote before it streamed: one json.dumps of the whole list.
+    return json.dumps([result.dict() for result in results], indent=2, default=str)
+
+
+def test_process_pairs_keeps_order_and_list_summary_with_odd_files(tmp_path):
+    names = [
+        'card2_front.png', 'card2_back.png', 'card1_front.jpg', 'card1_back.jpg',
+        'card3_back.jpg', 'loose.jpg',
+    ]
+    pipeline, config = _pipeline(tmp_path, names)
+    pairs = pipeline.pair_scans(pipeline.discover_scan_files())
+
+    results = pipeline.process_pairs(pairs)
+
+    assert isinstance(results, list)
+    # card3 has only a back and is skipped; loose.jpg has no side and counts as a front.
+    assert [pair.front_image.name for pair in pairs] == ['card1_front.jpg', 'card2_front.png', 'loose.jpg']
+    assert [result.attributes['front_image'] for result in results] == [pair.front_image.name for pair in pairs]
+    assert [result.attributes['back_image'] for result in results] == ['card1_back.jpg', 'card2_back.png', None]
+    assert config.results_output.read_text(encoding='utf-8') == _list_summary(results)
+    assert not config.results_output.with_name('results.json.partial').exists()
+    assert sorted(path.name for path in config.processed_output.iterdir()) == [
+        'card1_front.json', 'card2_front.json', 'loose.json',
+    ]
+
+    streamed = list(pipeline.iter_pairs(pairs))
+    assert [result.dict() for result in streamed] == [result.dict() for result in results]
+    assert config.results_output.read_text(encoding='utf-8') == _list_summary(results)
+
+
+def test_process_pairs_on_empty_inbox_writes_empty_summary(tmp_path):
+    pipeline, config = _pipeline(tmp_path, [])
+
+    results = pipeline.process_pairs(pipeline.pair_scans(pipeline.discover_scan_files()))
+
+    assert results == []
+    assert config.results_output.read_text(encoding='utf-8') == _list_summary([]) == '[]'
+
+
+def test_closing_iter_pairs_early_leaves_a_valid_summary(tmp_path):
+    pipeline, config = _pipeline(tmp_path, ['a_front.jpg', 'b_front.jpg', 'c_front.jpg'])
+    pairs = pipeline.pair_scans(pipeline.discover_scan_files())
+
+    stream = pipeline.iter_pairs(pairs)
+    first = next(stream)
+    stream.close()
+
+    assert config.results_output.read_text(encoding='utf-8') == _list_summary([first])
@@ -1,6 +1,10 @@
 import math
+import random
 
-from pipeline.schemas.card_record import CardRecord, Category, Condition
+import pytest
+from pydantic import ValidationError
+
+from pipeline.schemas.card_record import CardRecord, Category, Condition, dump_records
 
 
 def test_alias_and_normalisation():
@@ -57,3 +61,58 @@ def test_character_retained_for_non_sports():
     assert record.character == "Pikachu"
     assert record.player is None
     assert record.cond is Condition.RAW
+
+
+def _random_raw(rng):
+    pools = {
+        "sku": [" SKU-1 ", "Box1-SP_0001", 42, None],
+        "cat": ["Sports Cards", "TCG", " marvel ", "POKEMON", "", None, "baseball", 3],
+        "brand": [" Topps ", "", None, 1999, "  "],
+        "set": ["Legends", " ", None],
+        "year": ["1999", 2001, "", None, "19x9", 2020.7, True],
+        "player": ["  Ken  ", "", None, 7],
+        "character": ["Storm", " ", None],
+        "num": [15, " 7a ", "", None],
+        "variant": ["Refractor", "", None],
+        "serial": ["12/99", None],
+        "auto": ["yes", "no", "", None, True, 1, "Y"],
+        "mem": [False, "true", None],
+        "grade": ["", None, " PSA 9 ", "  "],
+        "cond": ["Near Mint", "ex", "RAW-ESTIMATE", "vg ", "poor", "", None, "NM"],
+        "notes": ["  Great  ", "", None],
+        "price_est": ["12.5", 0, "", None, "abc", 3],
+        "conf": ["0.82", 0.5, None, "x"],
+    }
+    raw = {}
+    for key, values in pools.items():
+        if rng.random() < 0.8:
+            raw[key] = rng.choice(values)
+    raw.setdefault("sku", "SKU-X")
+    raw.setdefault("cat", "other")
+    raw.setdefault("conf", 0.5)
+    if rng.random() < 0.2:
+        raw["extra"] = "ignored"
+    return raw
+
+
+def test_bulk_dump_matches_per_record_path():
+    rng = random.Random(7)
+    raws = [_random_raw(rng) for _ in range(2000)]
+
+    expected = [CardRecord(**raw).model_dump(mode="json", exclude_none=True) for raw in raws]
+    bulk = dump_records(raws)
+
+    assert bulk == expected
+    assert [list(row) for row in bulk] == [list(row) for row in expected]
+
+
+def test_bulk_dump_reports_missing_required_fields():
+    with pytest.raises(ValidationError) as excinfo:
+        dump_records(
+            [
+                {"sku": "A", "cat": "sports", "conf": 1},
+                {"sku": "B", "cat": "sports"},
+                {"sku": "C", "player": "Ash", "character": "Pikachu", "conf": 1},
+            ]
+        )
+    assert [error["loc"][:2] for error in excinfo.value.errors()] == [(1, "conf"), (2, "cat")]
@@ -0,0 +1,30 @@
+from pipeline.postprocess import _normalise
+from pipeline.schemas import compact
+
+
+def test_schema_is_strict():
+    schema = compact.SCHEMA
+    assert schema['additionalProperties'] is False
+    assert set(schema['required']) == set(schema['properties']) == set(compact.KEYS)
+    assert compact.RESPONSE_FORMAT['strict'] is True
+
+
+def test_expand_matches_full_record_after_normalise():
+    wire = {key: None for key in compact.KEYS}
+    wire.update({'c': 'M', 's': 'Marvel Masterpieces', 'y': 2020, 'ch': 'Storm', 'n': '12', 'cd': 'N', 'cf': 0.8, '_usage': {'output_tokens': 40}})
+    full = {
+        'sku': 'Box1-MM_0001',
+        'cat': 'marvel',
+        'set': 'Marvel Masterpieces',
+        'year': 2020,
+        'character': 'Storm',
+        'num': '12',
+        'cond': 'NM',
+        'conf': 0.8,
+    }
+
+    expanded = compact.expand(wire, 'Box1-MM_0001')
+
+    assert expanded.pop('_usage') == {'output_tokens': 40}
+    assert expanded == full
+    assert _normalise(expanded) == _normalise(full)
@@ -0,0 +1,69 @@
+import concurrent.futures
+import itertools
+import threading
+import time
+
+import pytest
+
+from pipeline.utils.hedging import Hedger, LatencyTracker
+
+
+def _warm(hedger, seconds=0.01, count=20):
+    for _ in range(count):
+        hedger.tracker.observe(seconds)
+
+
+def test_tracker_percentile():
+    tracker = LatencyTracker(window=100)
+    for value in range(1, 101):
+        tracker.observe(float(value))
+    assert tracker.percentile(50) == pytest.approx(51.0, abs=1)
+    assert tracker.percentile(95) == pytest.approx(95.0, abs=1)
+
+
+def test_slow_call_is_hedged_and_loser_cancelled():
+    hedger = Hedger(percentile=95, max_extra=1.0, min_samples=20)
+    _warm(hedger)
+    counter = itertools.count()
+    cancels = []
+
+    def attempt(cancel, deadline):
+        cancels.append(cancel)
+        if next(counter) == 0:
+            cancel.wait(2)
+            return 'slow'
+        return 'fast'
+
+    started = time.monotonic()
+    assert hedger.call(attempt, timeout=5) == 'fast'
+    assert time.monotonic() - started < 1
+    assert cancels[0].wait(1)
+    summary = hedger.summary()
+    assert summary['hedged'] == 1 and summary['backup_wins'] == 1
+
+
+def test_hedges_respect_extra_request_budget():
+    hedger = Hedger(percentile=50, max_extra=0.0, min_samples=20)
+    _warm(hedger)
+    launched = []
+
+    def attempt(cancel, deadline):
+        launched.append(threading.get_ident())
+        time.sleep(0.1)
+        return 'only'
+
+    assert hedger.call(attempt, timeout=5) == 'only'
+    assert len(launched) == 1
+    assert hedger.summary()['hedged'] == 0
+
+
+def test_no_hedging_before_enough_samples_and_timeout_raises():
+    hedger = Hedger(percentile=50, max_extra=1.0, min_samples=20)
+
+    def attempt(cancel, deadline):
+        cancel.wait(2)
+        return 'late'
+
+    with pytest.raises(concurrent.futures.TimeoutError):
+        hedger.call(attempt, timeout=0.1)
+    assert hedger.hedged == 0
@@ -0,0 +1,62 @@
+from PIL import Image, ImageDraw
+
+from pipeline.utils import images
+
+
+def _bed_with_card(angle=0.0):
+    bed = Image.new('RGB', (800, 1000), (235, 235, 235))
+    card = Image.new('RGB', (500, 700), (30, 70, 160))
+    ImageDraw.Draw(card).rectangle([40, 40, 460, 300], fill=(220, 200, 40))
+    if angle:
+        card = card.rotate(angle, expand=True, fillcolor=(235, 235, 235))
+    bed.paste(card, (120, 100))
+    return bed
+
+
+def test_crop_to_card_trims_scanner_bed():
+    cropped = images.crop_to_card(_bed_with_card(), margin=0.02)
+    width, height = cropped.size
+    assert 500 <= width <= 525
+    assert 700 <= height <= 735
+
+
+def test_crop_to_card_deskews_when_asked():
+    tilted = _bed_with_card(angle=4)
+    plain = images.crop_to_card(tilted, margin=0.0)
+    straightened = images.crop_to_card(tilted, margin=0.0, deskew=True)
+    assert straightened.size[0] * straightened.size[1] < plain.size[0] * plain.size[1]
+    assert abs(straightened.size[0] - 500) <= 12
+
+
+def test_crop_leaves_full_frame_cards_alone():
+    card = Image.new('RGB', (300, 400))
+    ImageDraw.Draw(card).rectangle([0, 0, 150, 400], fill=(255, 0, 0))
+    ImageDraw.Draw(card).rectangle([150, 0, 300, 400], fill=(0, 0, 255))
+    ImageDraw.Draw(card).rectangle([0, 0, 300, 30], fill=(0, 255, 0))
+    assert images.crop_to_card(card).size == (300, 400)
+
+
+def test_composite_size_respects_pixel_budget():
+    height, front_width, back_width = images.composite_size((700, 1000), (700, 1000), 500_000)
+    assert (front_width + back_width) * height <= 500_000
+    assert front_width == back_width
+
+
+def test_tiered_image_decodes_source_once(tmp_path, monkeypatch):
+    src = tmp_path / 'scan.png'
+    _bed_with_card().save(src)
+    opened = []
+    real_open = images.open_rgb
+    monkeypatch.setattr(images, 'open_rgb', lambda path: opened.append(path) or real_open(path))
+
+    tiered = images.TieredImage(src, tmp_path / 'out', crop_margin=0.02)
+    small = tiered.path_for(256)
+    large = tiered.path_for(768)
+    assert tiered.path_for(256) == small
+    tiered.close()
+
+    assert len(opened) == 1
+    with Image.open(small) as img:
+        assert 250 <= max(img.size) <= 256
+    with Image.open(large) as img:
+        assert max(img.size) <= 768
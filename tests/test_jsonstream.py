@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+from pipeline.utils.jsonstream import InvalidStreamOutput, StreamingJSONChecker
+
+RECORD = {
+    'sku': 'Box1-SP_0001',
+    'cat': 'sports',
+    'year': 2020,
+    'num': '7',
+    'auto': False,
+    'notes': 'corner "ding", \\ edge',
+    'price_est': -1.5e2,
+    'variant': None,
+    'conf': 0.91,
+}
+
+
+@pytest.mark.parametrize('size', [1, 3, 17, 1000])
+def test_valid_object_in_any_chunking(size):
+    text = json.dumps(RECORD, indent=1)
+    checker = StreamingJSONChecker(RECORD.keys())
+    for start in range(0, len(text), size):
+        checker.feed(text[start : start + size])
+    assert checker.done
+    assert checker.result() == RECORD
+
+
+@pytest.mark.parametrize(
+    'text, consumed',
+    [
+        ('Sure, here is the card: {"sku": "x"}', 1),
+        ('{"sku": "x", "title": "Nice card"}', len('{"sku": "x", "title"')),
+        ('{"sku": "x"} thanks', len('{"sku": "x"} t')),
+        ('{"conf": tru3}', len('{"conf": tru3')),
+        ('{"sku" "x"}', len('{"sku" "')),
+    ],
+)
+def test_invalid_output_fails_at_first_bad_character(text, consumed):
+    checker = StreamingJSONChecker(RECORD.keys())
+    fed = 0
+    with pytest.raises(InvalidStreamOutput):
+        for char in text:
+            fed += 1
+            checker.feed(char)
+    assert fed == consumed
+
+
+def test_truncated_output_fails_on_result():
+    checker = StreamingJSONChecker()
+    checker.feed('{"sku": "x", "num": "1')
+    with pytest.raises(InvalidStreamOutput):
+        checker.result()
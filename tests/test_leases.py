@@ -0,0 +1,46 @@
+import os
+
+from pipeline.utils.leases import LeaseStore
+
+
+def _age(store, sku, seconds):
+    path = store.claims / f'{sku}.lease'
+    stat = path.stat()
+    os.utime(path, (stat.st_atime - seconds, stat.st_mtime - seconds))
+
+
+def test_claims_are_exclusive_until_the_lease_expires(tmp_path):
+    first = LeaseStore(tmp_path, 'w1', lease_s=30)
+    second = LeaseStore(tmp_path, 'w2', lease_s=30)
+
+    assert first.claim('Box1-SP_0001')
+    assert not second.claim('Box1-SP_0001')
+
+    first.renew()
+    assert not second.claim('Box1-SP_0001')
+
+    _age(first, 'Box1-SP_0001', 60)
+    assert second.claim('Box1-SP_0001')
+    assert second.stolen == 1
+    first.renew()
+    assert first.lost == 1
+
+    first.release('Box1-SP_0001')
+    assert (tmp_path / 'claims' / 'Box1-SP_0001.lease').exists()
+    second.release('Box1-SP_0001')
+    assert not (tmp_path / 'claims' / 'Box1-SP_0001.lease').exists()
+
+
+def test_commit_and_finalize_happen_once(tmp_path):
+    first = LeaseStore(tmp_path, 'w1')
+    second = LeaseStore(tmp_path, 'w2')
+
+    assert first.commit('Box1-SP_0001', {'record': {'conf': 0.9}})
+    assert not second.commit('Box1-SP_0001', {'record': {'conf': 0.1}})
+    assert second.committed('Box1-SP_0001') == {'record': {'conf': 0.9}, 'worker': 'w1'}
+    assert not second.claim('Box1-SP_0001')
+    assert sorted(os.listdir(tmp_path / 'done')) == ['Box1-SP_0001.json']
+
+    assert second.finalize()
+    assert not first.finalize()
+    assert first.finalized()
@@ -0,0 +1,45 @@
+import hashlib
+import os
+
+from pipeline.utils import manifest as manifest_mod
+from pipeline.utils.manifest import ContentManifest, content_hash
+
+
+def test_content_hash_matches_blake2b(tmp_path):
+    path = tmp_path / 'scan.jpg'
+    path.write_bytes(os.urandom(3 * 1024 * 1024 + 17))
+    (tmp_path / 'empty.jpg').write_bytes(b'')
+
+    assert content_hash(path) == hashlib.blake2b(path.read_bytes(), digest_size=32).hexdigest()
+    assert content_hash(tmp_path / 'empty.jpg') == hashlib.blake2b(b'', digest_size=32).hexdigest()
+
+
+def test_manifest_hashes_only_new_or_changed_files(tmp_path, monkeypatch):
+    files = []
+    for index in range(4):
+        path = tmp_path / f'Box1-SP_{index:04d}_F.jpg'
+        path.write_bytes(os.urandom(4096))
+        files.append(path)
+    hashed = []
+    real_hash = manifest_mod.content_hash
+
+    def counting_hash(path):
+        hashed.append(path.name)
+        return real_hash(path)
+
+    monkeypatch.setattr(manifest_mod, 'content_hash', counting_hash)
+    db = tmp_path / 'cache' / 'manifest.sqlite'
+
+    store = ContentManifest(db)
+    first = store.hash_files(files, workers=3)
+    store.close()
+    assert sorted(hashed) == sorted(p.name for p in files)
+
+    files[1].write_bytes(os.urandom(5000))
+    hashed.clear()
+    store = ContentManifest(db)
+    second = store.hash_files(files)
+    assert hashed == [files[1].name]
+    assert store.lookup(files[0]) == first[str(files[0].resolve())]
+    assert second[str(files[1].resolve())] == real_hash(files[1])
+    store.close()
@@ -0,0 +1,59 @@
+import random
+
+from PIL import Image, ImageDraw
+
+from pipeline.utils.phash import HashIndex, PhashStore, hamming, image_signature
+
+
+def _card(seed: int) -> Image.Image:
+    rng = random.Random(seed)
+    img = Image.new('RGB', (300, 420), 'white')
+    draw = ImageDraw.Draw(img)
+    for _ in range(25):
+        x, y = rng.randint(0, 300), rng.randint(0, 420)
+        colour = tuple(rng.randint(0, 255) for _ in range(3))
+        draw.rectangle([x, y, x + rng.randint(10, 120), y + rng.randint(10, 120)], fill=colour)
+    return img
+
+
+def test_rescan_is_near_and_other_card_is_far():
+    original = image_signature(_card(1))[0]
+    rescan = image_signature(_card(1).resize((200, 280)))[0]
+    other = image_signature(_card(2))[0]
+
+    assert hamming(original, rescan) <= 3
+    assert hamming(original, other) > 10
+
+
+def test_hash_index_matches_brute_force():
+    rng = random.Random(7)
+    values = [rng.getrandbits(64) for _ in range(2000)]
+    index = HashIndex()
+    index.extend(values)
+
+    for radius in (2, 6):
+        probe = values[42] ^ 0b1011
+        expected = sorted(
+            (hamming(probe, value), position)
+            for position, value in enumerate(values)
+            if hamming(probe, value) <= radius
+        )
+        assert index.query(probe, radius) == [(position, distance) for distance, position in expected]
+
+
+def test_store_persists_and_respects_colour_tolerance(tmp_path):
+    db_path = tmp_path / 'phash.sqlite'
+    signature = image_signature(_card(3))
+    store = PhashStore(db_path, 'fronts')
+    store.add('Box1-SP_0001', signature, {'sku': 'Box1-SP_0001', 'set': 'Topps'})
+    store.close()
+
+    reopened = PhashStore(db_path, 'fronts')
+    match = reopened.nearest(signature, 3, max_color_delta=12)
+    assert match is not None
+    assert match[0] == 'Box1-SP_0001'
+    assert match[1]['set'] == 'Topps'
+
+    value, colour = signature
+    shifted = (value, tuple(channel + 40 for channel in colour))
+    assert reopened.nearest(shifted, 3, max_color_delta=12) is None
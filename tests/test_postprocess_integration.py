@@ -1,10 +1,15 @@
 import csv
 import json
+import os
+import threading
+import time
 from pathlib import Path
 
 from PIL import Image
 
-from pipeline import postprocess
+from pipeline import postprocess, prepare, stream
+from pipeline.utils.leases import LeaseStore
+from pipeline.utils.manifest import ContentManifest
 
 
 def _make_image(path: Path) -> None:
@@ -59,3 +64,787 @@ def test_process_batch_mock_provider(tmp_path, monkeypatch):
 
     txt_path = result_root / 'txt' / f'{sku}.txt'
     assert txt_path.exists()
+
+
+def _setup_job(tmp_path, monkeypatch, skus, config, job_id='batch_test'):
+    monkeypatch.chdir(tmp_path)
+    ready_dir = tmp_path / 'Scans_Ready'
+    batches_dir = tmp_path / 'pipeline' / 'output' / 'batches'
+    batches_dir.mkdir(parents=True)
+    with (batches_dir / f'{job_id}.jsonl').open('w', encoding='utf-8') as handle:
+        for sku in skus:
+            front_path = ready_dir / sku / f'{sku}_F.jpg'
+            back_path = ready_dir / sku / f'{sku}_B.jpg'
+            _make_image(front_path)
+            _make_image(back_path)
+            handle.write(json.dumps({'sku': sku, 'images': [front_path.name, back_path.name]}) + '\n')
+
+    config_path = tmp_path / 'pipeline' / 'config' / 'model.json'
+    config_path.parent.mkdir(parents=True)
+    config_path.write_text(json.dumps(config), encoding='utf-8')
+    monkeypatch.setattr(postprocess, 'CONFIG_PATH', config_path)
+    monkeypatch.setattr(postprocess, 'TMP_DIR', tmp_path / 'pipeline' / 'tmp')
+
+    def run():
+        return Path(
+            postprocess.process_batch(
+                job_id,
+                ready=str(ready_dir),
+                batches=str(batches_dir),
+                outroot=str(tmp_path / 'pipeline' / 'output'),
+            )
+        )
+
+    return run
+
+
+def test_targeted_retry_requests_only_missing_fields(tmp_path, monkeypatch):
+    sku = 'Box1-SP_0002'
+    run = _setup_job(tmp_path, monkeypatch, [sku], {'provider': 'GPT-5 Vision', 'retry_mode': 'targeted'})
+    calls = []
+
+    def fake_card(front, back, hints):
+        calls.append(('card', front, back))
+        return {'sku': sku, 'cat': 'sports', 'set': 'Topps Chrome', 'player': 'Someone', 'conf': 0.9}
+
+    def fake_fields(image, hints, fields):
+        calls.append(('fields', image, tuple(fields)))
+        return {'year': 2019, 'num': '150', 'conf': 0.88}
+
+    monkeypatch.setattr(postprocess, 'run_gpt5', fake_card)
+    monkeypatch.setattr(postprocess, 'run_gpt5_fields', fake_fields)
+
+    result_root = run()
+
+    assert [call[0] for call in calls] == ['card', 'fields']
+    assert calls[1][2] == ('year', 'num')
+    assert calls[1][1].endswith(f'{sku}_B.webp')
+    record = json.loads((result_root / 'json' / f'{sku}.json').read_text(encoding='utf-8'))
+    assert record['year'] == 2019
+    assert record['num'] == '150'
+    assert record['set'] == 'Topps Chrome'
+
+
+def test_resolution_tiers_escalate_only_when_needed(tmp_path, monkeypatch):
+    easy, hard = 'Box1-SP_0003', 'Box1-SP_0004'
+    run = _setup_job(
+        tmp_path,
+        monkeypatch,
+        [easy, hard],
+        {'provider': 'GPT-5 Vision', 'image_tiers': [1024, 256]},
+    )
+    sent = []
+
+    def fake_card(front, back, hints):
+        edge = int(Path(front).stem.rsplit('_', 1)[1])
+        sent.append((hints['sku'], edge))
+        conf = 0.9 if hints['sku'] == easy or edge == 1024 else 0.4
+        return {'sku': hints['sku'], 'cat': 'sports', 'set': 'Topps', 'year': 2020, 'num': '1', 'conf': conf}
+
+    monkeypatch.setattr(postprocess, 'run_gpt5', fake_card)
+
+    run()
+
+    assert sent == [(easy, 256), (hard, 256), (hard, 1024)]
+    assert postprocess._tier_summary({256: {'sent': 2, 'resolved': 1}})['256']['rate'] == 0.5
+
+
+def test_cascade_escalates_low_confidence_cards(tmp_path, monkeypatch):
+    easy, hard = 'Box1-SP_0005', 'Box1-SP_0006'
+    cascade = [
+        {'model_name': 'fast', 'min_conf': 0.8, 'require': ['player']},
+        {'model_name': 'large'},
+    ]
+    run = _setup_job(tmp_path, monkeypatch, [easy, hard], {'provider': 'GPT-5 Vision', 'cascade': cascade})
+    routed = []
+
+    def fake_card(front, back, hints):
+        routed.append((hints['sku'], hints['model_name']))
+        conf = 0.9 if hints['sku'] == easy or hints['model_name'] == 'large' else 0.7
+        return {
+            'sku': hints['sku'], 'cat': 'sports', 'set': 'Topps', 'year': 2020, 'num': '1',
+            'player': 'Someone', 'conf': conf,
+        }
+
+    monkeypatch.setattr(postprocess, 'run_gpt5', fake_card)
+
+    run()
+
+    assert routed == [(easy, 'fast'), (hard, 'fast'), (hard, 'large')]
+    events = [
+        json.loads(line)
+        for line in (tmp_path / 'pipeline' / 'logs' / 'pipeline.jsonl').read_text(encoding='utf-8').splitlines()
+    ]
+    summary = [event for event in events if event['status'] == 'summary'][-1]
+    assert summary['models']['fast']['acceptance'] == 0.5
+    assert summary['models']['large']['accepted'] == 1
+
+
+def test_composite_mode_sends_single_image(tmp_path, monkeypatch):
+    sku = 'Box1-SP_0007'
+    run = _setup_job(
+        tmp_path,
+        monkeypatch,
+        [sku],
+        {'provider': 'GPT-5 Vision', 'composite_images': ['sports'], 'composite_max_pixels': 1000},
+    )
+    sent = []
+
+    def fake_card(front, back, hints):
+        sent.append((front, back))
+        return {'sku': sku, 'cat': 'sports', 'set': 'Topps', 'year': 2020, 'num': '1', 'conf': 0.9}
+
+    monkeypatch.setattr(postprocess, 'run_gpt5', fake_card)
+
+    run()
+
+    assert len(sent) == 1
+    front, back = sent[0]
+    assert back is None
+    with Image.open(front) as img:
+        width, height = img.size
+    assert width == 2 * height
+    assert width * height <= 1000
+
+
+def test_packed_requests_fall_back_for_missing_cards(tmp_path, monkeypatch):
+    skus = ['Box1-SP_0010', 'Box1-MM_0011', 'Box1-SP_0012', 'Box1-SP_0013']
+    run = _setup_job(tmp_path, monkeypatch, skus, {'provider': 'GPT-5 Vision', 'pack_size': 4})
+    packed_calls = []
+    single_calls = []
+
+    def record_for(sku):
+        return {'sku': sku, 'cat': 'sports', 'set': 'Topps', 'year': 2020, 'num': '1', 'conf': 0.9}
+
+    def fake_packed(cards, hints):
+        packed_calls.append([card['sku'] for card in cards])
+        # Drop the last card and return a schema-invalid entry for the second.
+        return [record_for(cards[0]['sku']), {'sku': cards[1]['sku'], 'conf': 0.9}]
+
+    def fake_card(front, back, hints):
+        single_calls.append(hints['sku'])
+        return record_for(hints['sku'])
+
+    monkeypatch.setattr(postprocess, 'run_gpt5_packed', fake_packed)
+    monkeypatch.setattr(postprocess, 'run_gpt5', fake_card)
+
+    result_root = run()
+
+    assert packed_calls == [['Box1-SP_0010', 'Box1-SP_0012', 'Box1-SP_0013']]
+    assert single_calls == ['Box1-SP_0012', 'Box1-SP_0013', 'Box1-MM_0011']
+    for sku in skus:
+        assert (result_root / 'json' / f'{sku}.json').exists()
+
+
+
+def test_packed_cards_not_accepted_continue_up_the_cascade(tmp_path, monkeypatch):
+    easy, hard = 'Box1-SP_0014', 'Box1-SP_0015'
+    cascade = [{'model_name': 'fast', 'min_conf': 0.8}, {'model_name': 'large'}]
+    config = {'provider': 'GPT-5 Vision', 'pack_size': 2, 'cascade': cascade, 'retry_mode': 'targeted'}
+    run = _setup_job(tmp_path, monkeypatch, [easy, hard], config)
+    single_calls = []
+
+    def record_for(sku, conf):
+        return {'sku': sku, 'cat': 'sports', 'set': 'Topps', 'year': 2020, 'num': '1', 'conf': conf}
+
+    def fake_packed(cards, hints):
+        assert hints['model_name'] == 'fast'
+        return [record_for(easy, 0.9), record_for(hard, 0.7)]
+
+    def fake_card(front, back, hints):
+        single_calls.append((hints['sku'], hints['model_name']))
+        return record_for(hints['sku'], 0.95)
+
+    monkeypatch.setattr(postprocess, 'run_gpt5_packed', fake_packed)
+    monkeypatch.setattr(postprocess, 'run_gpt5', fake_card)
+
+    result_root = run()
+
+    assert single_calls == [(hard, 'large')]
+    record = json.loads((result_root / 'json' / f'{hard}.json').read_text(encoding='utf-8'))
+    assert record['conf'] == 0.95
+    models = _summary_event(tmp_path)['models']
+    assert models['fast']['cards'] == 2
+    assert models['fast']['accepted'] == 1
+    assert models['large']['accepted'] == 1
+
+def test_dedupe_reuses_cataloged_record(tmp_path, monkeypatch):
+    first, copy = 'Box1-SP_0020', 'Box1-SP_0021'
+    run = _setup_job(tmp_path, monkeypatch, [first, copy], {'provider': 'GPT-5 Vision', 'dedupe': True})
+    called = []
+
+    def fake_card(front, back, hints):
+        called.append(hints['sku'])
+        return {'sku': hints['sku'], 'cat': 'sports', 'set': 'Topps', 'year': 2020, 'num': '7', 'conf': 0.9}
+
+    monkeypatch.setattr(postprocess, 'run_gpt5', fake_card)
+
+    result_root = run()
+
+    assert called == [first]
+    record = json.loads((result_root / 'json' / f'{copy}.json').read_text(encoding='utf-8'))
+    assert record['sku'] == copy
+    assert record['num'] == '7'
+
+
+
+def test_dedupe_keeps_per_copy_fields_of_each_copy(tmp_path, monkeypatch):
+    first, copy, numbered, numbered_copy = 'Box1-SP_0022', 'Box1-SP_0023', 'Box1-SP_0024', 'Box1-SP_0025'
+    run = _setup_job(
+        tmp_path, monkeypatch, [first, copy, numbered, numbered_copy], {'provider': 'GPT-5 Vision', 'dedupe': True}
+    )
+    ready_dir = tmp_path / 'Scans_Ready'
+    for sku in (numbered, numbered_copy):
+        for side in ('F', 'B'):
+            Image.new('RGB', (32, 32), color='navy').save(ready_dir / sku / f'{sku}_{side}.jpg')
+    called = []
+
+    def fake_card(front, back, hints):
+        sku = hints['sku']
+        called.append(sku)
+        record = {'sku': sku, 'cat': 'sports', 'set': 'Topps', 'year': 2020, 'num': '7', 'conf': 0.9}
+        if sku == first:
+            record.update(cond='NM', grade='PSA 9', notes='centered', price_est=40.0)
+        if sku in (numbered, numbered_copy):
+            record.update(serial='12/99' if sku == numbered else '40/99', auto=True)
+        return record
+
+    monkeypatch.setattr(postprocess, 'run_gpt5', fake_card)
+
+    result_root = run()
+
+    assert called == [first, numbered, numbered_copy]
+    record = json.loads((result_root / 'json' / f'{copy}.json').read_text(encoding='utf-8'))
+    assert (record['set'], record['year'], record['num']) == ('Topps', 2020, '7')
+    assert record.get('cond') is None
+    assert record['grade'] == 'raw'
+    assert record.get('notes') is None and record.get('price_est') is None
+    numbered_record = json.loads((result_root / 'json' / f'{numbered_copy}.json').read_text(encoding='utf-8'))
+    assert numbered_record['serial'] == '40/99'
+
+def test_back_template_crops_back_after_enough_support(tmp_path, monkeypatch):
+    skus = ['Box1-SP_0030', 'Box1-SP_0031', 'Box1-SP_0032']
+    run = _setup_job(tmp_path, monkeypatch, skus, {'provider': 'GPT-5 Vision', 'back_templates': 'crop'})
+    sent = []
+
+    def fake_card(front, back, hints):
+        sent.append((back, hints.get('back_label'), hints['capsule'].get('back_template')))
+        return {'sku': hints['sku'], 'cat': 'sports', 'brand': 'Topps', 'set': 'Topps', 'year': 2020, 'num': '1', 'conf': 0.9}
+
+    monkeypatch.setattr(postprocess, 'run_gpt5', fake_card)
+
+    run()
+
+    assert [label for _, label, _ in sent] == [None, None, 'back_number_crop']
+    assert sent[2][0].endswith('_number.webp')
+    assert sent[2][2] == {'set': 'Topps', 'brand': 'Topps', 'year': 2020}
+
+
+def test_quality_gate_moves_bad_scans_to_error(tmp_path, monkeypatch):
+    good, bad = 'Box1-SP_0040', 'Box1-SP_0041'
+    run = _setup_job(tmp_path, monkeypatch, [good, bad], {'provider': 'GPT-5 Vision', 'quality_gate': True})
+    for side in ('F', 'B'):
+        img = Image.new('RGB', (64, 64), (190, 190, 190))
+        for x in range(0, 64, 4):
+            for y in range(64):
+                img.putpixel((x, y), (60, 60, 60))
+        img.save(tmp_path / 'Scans_Ready' / good / f'{good}_{side}.jpg')
+    called = []
+
+    def fake_card(front, back, hints):
+        called.append(hints['sku'])
+        return {'sku': hints['sku'], 'cat': 'sports', 'set': 'Topps', 'year': 2020, 'num': '1', 'conf': 0.9}
+
+    monkeypatch.setattr(postprocess, 'run_gpt5', fake_card)
+
+    result_root = run()
+
+    assert called == [good]
+    error_dir = tmp_path / 'Scans_Error' / bad
+    assert (error_dir / f'{bad}_F.jpg').exists()
+    assert 'blurry' in (error_dir / 'error.txt').read_text(encoding='utf-8')
+    assert not (tmp_path / 'Scans_Ready' / bad).exists()
+    assert not (result_root / 'json' / f'{bad}.json').exists()
+
+
+def test_pair_time_derivatives_are_reused_until_source_changes(tmp_path, monkeypatch):
+    prepared_sku, stale_sku = 'Box1-SP_0050', 'Box1-SP_0051'
+    config = {'provider': 'GPT-5 Vision'}
+    run = _setup_job(tmp_path, monkeypatch, [prepared_sku, stale_sku], config)
+    ready_dir = tmp_path / 'Scans_Ready'
+    merged = postprocess._load_config()
+    prepare.prepare_many([ready_dir / prepared_sku, ready_dir / stale_sku], merged)
+    Image.new('RGB', (48, 48), color='white').save(ready_dir / stale_sku / f'{stale_sku}_F.jpg')
+    sent = {}
+
+    def fake_card(front, back, hints):
+        sent[hints['sku']] = (front, back)
+        return {'sku': hints['sku'], 'cat': 'sports', 'set': 'Topps', 'year': 2020, 'num': '1', 'conf': 0.9}
+
+    monkeypatch.setattr(postprocess, 'run_gpt5', fake_card)
+
+    run()
+
+    front, back = sent[prepared_sku]
+    assert Path(front).parent == ready_dir / prepared_sku / prepare.PREPARED_SUBDIR
+    assert Path(back).parent == ready_dir / prepared_sku / prepare.PREPARED_SUBDIR
+    assert prepare.PREPARED_SUBDIR not in Path(sent[stale_sku][0]).parts
+
+
+
+def test_touched_scans_keep_derivatives_through_content_hashes(tmp_path, monkeypatch):
+    sku = 'Box1-SP_0052'
+    run = _setup_job(tmp_path, monkeypatch, [sku], {'provider': 'GPT-5 Vision'})
+    folder = tmp_path / 'Scans_Ready' / sku
+    merged = postprocess._load_config()
+    prepare.prepare_many([folder], merged)
+    front, back = folder / f'{sku}_F.jpg', folder / f'{sku}_B.jpg'
+    later = front.stat().st_mtime_ns + 5_000_000_000
+    for scan in (front, back):
+        os.utime(scan, ns=(later, later))
+    sent = {}
+
+    def fake_card(front, back, hints):
+        sent[hints['sku']] = (front, back)
+        return {'sku': hints['sku'], 'cat': 'sports', 'set': 'Topps', 'year': 2020, 'num': '1', 'conf': 0.9}
+
+    monkeypatch.setattr(postprocess, 'run_gpt5', fake_card)
+
+    run()
+
+    assert all(Path(path).parent == folder / prepare.PREPARED_SUBDIR for path in sent[sku])
+    manifest = ContentManifest()
+    try:
+        # post re-hashed the touched scans, so this is a stat-only lookup.
+        hashes = {key: manifest.lookup(Path(key)) for key in (str(front.resolve()), str(back.resolve()))}
+    finally:
+        manifest.close()
+    assert all(hashes.values())
+    assert prepare.prepare_sku(folder, merged, hashes) == 0
+    assert prepare.read_manifest(folder)['sources'][front.name]['mtime_ns'] == later
+
+def _summary_event(tmp_path):
+    lines = (tmp_path / 'pipeline' / 'logs' / 'pipeline.jsonl').read_text(encoding='utf-8').splitlines()
+    return [json.loads(line) for line in lines if '"summary"' in line][-1]
+
+
+def test_concurrent_cards_respect_memory_budget(tmp_path, monkeypatch):
+    skus = [f'Box1-SP_{index:04d}' for index in range(60, 66)]
+    # Each 32x32 pair is estimated at ~7 KB decoded, so 0.01 MB admits one card at a time.
+    config = {'provider': 'GPT-5 Vision', 'concurrency': 3, 'memory_budget_mb': 0.01}
+    run = _setup_job(tmp_path, monkeypatch, skus, config)
+    lock = threading.Lock()
+    active = {'now': 0, 'max': 0}
+
+    def fake_card(front, back, hints):
+        with lock:
+            active['now'] += 1
+            active['max'] = max(active['max'], active['now'])
+        time.sleep(0.02)
+        with lock:
+            active['now'] -= 1
+        return {'sku': hints['sku'], 'cat': 'sports', 'set': 'Topps', 'year': 2020, 'num': '1', 'conf': 0.9}
+
+    monkeypatch.setattr(postprocess, 'run_gpt5', fake_card)
+
+    result_root = run()
+
+    assert active['max'] == 1
+    for sku in skus:
+        assert (result_root / 'json' / f'{sku}.json').exists()
+    memory = _summary_event(tmp_path)['memory']
+    assert memory['waits'] > 0
+    assert memory['peak_mb'] <= 0.02
+
+
+def test_concurrency_runs_cards_in_parallel_under_budget(tmp_path, monkeypatch):
+    skus = [f'Box1-SP_{index:04d}' for index in range(70, 76)]
+    run = _setup_job(tmp_path, monkeypatch, skus, {'provider': 'GPT-5 Vision', 'concurrency': 3})
+    barrier = threading.Barrier(3, timeout=2)
+
+    def fake_card(front, back, hints):
+        barrier.wait()
+        return {'sku': hints['sku'], 'cat': 'sports', 'set': 'Topps', 'year': 2020, 'num': '1', 'conf': 0.9}
+
+    monkeypatch.setattr(postprocess, 'run_gpt5', fake_card)
+
+    result_root = run()
+
+    rows = list(csv.DictReader((result_root / 'csv' / 'batch.csv').open(encoding='utf-8')))
+    assert sorted(row['sku'] for row in rows) == skus
+    assert _summary_event(tmp_path)['processed'] == len(skus)
+
+
+def test_hedging_reports_backup_requests(tmp_path, monkeypatch):
+    skus = ['Box1-SP_0080', 'Box1-SP_0081', 'Box1-SP_0082']
+    config = {'provider': 'GPT-5 Vision', 'hedge_percentile': 90, 'hedge_max_extra': 1.0, 'hedge_min_samples': 2}
+    run = _setup_job(tmp_path, monkeypatch, skus, config)
+    attempts = []
+
+    def fake_card(front, back, hints):
+        attempts.append(hints['sku'])
+        if hints['sku'] == skus[2] and attempts.count(skus[2]) == 1:
+            hints['cancel'].wait(5)
+        return {'sku': hints['sku'], 'cat': 'sports', 'set': 'Topps', 'year': 2020, 'num': '1', 'conf': 0.9}
+
+    monkeypatch.setattr(postprocess, 'run_gpt5', fake_card)
+
+    result_root = run()
+
+    assert attempts.count(skus[2]) == 2
+    assert (result_root / 'json' / f'{skus[2]}.json').exists()
+    hedging = _summary_event(tmp_path)['hedging']
+    assert hedging['hedged'] == 1 and hedging['backup_wins'] == 1
+
+
+def test_replay_rebuilds_outputs_without_provider_calls(tmp_path, monkeypatch):
+    skus = [f'Box1-SP_{index:04d}' for index in range(1, 7)]
+    run = _setup_job(tmp_path, monkeypatch, skus, {'provider': 'GPT-5 Vision'})
+
+    def fake_card(front, back, hints):
+        sku = hints['sku']
+        if hints.get('nudge'):
+            return {'sku': sku, 'cat': 'sports', 'set': 'Chrome', 'year': 2020, 'num': '9', 'conf': 0.9}
+        if sku.endswith('2'):
+            return {'sku': sku, 'cat': 'sports', 'set': 'Chrome', 'conf': 0.5}
+        if sku.endswith('3'):
+            return {'cat': 'sports', 'conf': 0.9}
+        return {'sku': sku, 'cat': 'Sports Cards', 'set': ' Prizm ', 'year': '2019', 'num': 7, 'conf': '0.91'}
+
+    monkeypatch.setattr(postprocess, 'run_gpt5', fake_card)
+    result_root = run()
+    live = {path.name: path.read_text(encoding='utf-8') for path in (result_root / 'json').iterdir()}
+    live_csv = (result_root / 'csv' / 'batch.csv').read_text(encoding='utf-8')
+    assert json.loads(live['Box1-SP_0002.json'])['year'] == 2020
+
+    def no_network(*args, **kwargs):
+        raise AssertionError('replay must not call the provider')
+
+    monkeypatch.setattr(postprocess, 'run_gpt5', no_network)
+    outroot = str(tmp_path / 'pipeline' / 'output')
+    for workers in (1, 2):
+        replayed_root = Path(postprocess.replay_batch('batch_test', outroot=outroot, workers=workers))
+        replayed = {path.name: path.read_text(encoding='utf-8') for path in (replayed_root / 'json').iterdir()}
+        assert replayed == live
+        assert (replayed_root / 'csv' / 'batch.csv').read_text(encoding='utf-8') == live_csv
+        summary = _summary_event(tmp_path)
+        assert summary['replay'] is True
+        assert summary['processed'] == len(skus)
+        assert summary['schema_errors'] == 1
+
+
+def test_canonical_names_snap_without_retry(tmp_path, monkeypatch):
+    vocab = Path(__file__).resolve().parents[1] / 'pipeline' / 'config' / 'vocab.json'
+    skus = ['Box1-MM_0001', 'Box1-SP_0002']
+    run = _setup_job(tmp_path, monkeypatch, skus, {'provider': 'GPT-5 Vision', 'canonical_names': True})
+    monkeypatch.setattr(postprocess, 'VOCAB_PATH', vocab)
+    calls = []
+
+    def fake_card(front, back, hints):
+        calls.append(hints['sku'])
+        if hints['sku'] == 'Box1-MM_0001':
+            return {'sku': hints['sku'], 'cat': 'marvel', 'brand': 'UD', 'set': 'UD Marvl', 'year': 1995,
+                    'num': '12', 'character': 'Storm', 'conf': 0.9}
+        return {'sku': hints['sku'], 'cat': 'sports', 'set': 'Fleer Ultr', 'year': 1994, 'num': '7',
+                'player': 'Someone', 'conf': 0.9}
+
+    monkeypatch.setattr(postprocess, 'run_gpt5', fake_card)
+    result_root = run()
+
+    assert calls == skus
+    marvel = json.loads((result_root / 'json' / 'Box1-MM_0001.json').read_text(encoding='utf-8'))
+    sports = json.loads((result_root / 'json' / 'Box1-SP_0002.json').read_text(encoding='utf-8'))
+    assert (marvel['brand'], marvel['set']) == ('Upper Deck', 'Upper Deck Marvel')
+    assert sports['set'] == 'Fleer Ultra'
+    assert _summary_event(tmp_path)['canonical'] == {'snapped': 3, 'ambiguous': 0}
+
+
+def test_scheduled_jobs_serve_priority_box_first(tmp_path, monkeypatch):
+    early = [f'Box1-SP_{index:04d}' for index in range(1, 4)]
+    rush = [f'Box2-SP_{index:04d}' for index in range(1, 3)]
+    config = {'provider': 'Mock', 'box_priorities': {'Box2': 5}}
+    _setup_job(tmp_path, monkeypatch, early + rush, config, job_id='combined')
+    batches_dir = tmp_path / 'pipeline' / 'output' / 'batches'
+    lines = (batches_dir / 'combined.jsonl').read_text(encoding='utf-8').splitlines()
+    (batches_dir / 'combined.jsonl').unlink()
+    (batches_dir / 'job_early.jsonl').write_text('\n'.join(lines[:3]) + '\n', encoding='utf-8')
+    (batches_dir / 'job_rush.jsonl').write_text('\n'.join(lines[3:]) + '\n', encoding='utf-8')
+    outroot = tmp_path / 'pipeline' / 'output'
+
+    assert postprocess.pending_jobs(str(batches_dir), str(outroot)) == ['job_early', 'job_rush']
+    roots = postprocess.process_batches(
+        ['job_early', 'job_rush'],
+        ready=str(tmp_path / 'Scans_Ready'),
+        batches=str(batches_dir),
+        outroot=str(outroot),
+    )
+
+    events = [
+        json.loads(line)
+        for line in (tmp_path / 'pipeline' / 'logs' / 'pipeline.jsonl').read_text(encoding='utf-8').splitlines()
+    ]
+    done = [event['sku'] for event in events if event.get('status') in ('ok', 'needs_review')]
+    assert done == rush + early
+    assert [Path(root).parent.name for root in roots] == ['job_early', 'job_rush']
+    assert sorted(path.stem for path in (Path(roots[1]) / 'json').iterdir()) == rush
+    assert postprocess.pending_jobs(str(batches_dir), str(outroot)) == []
+    schedule = [event for event in events if event.get('status') == 'schedule'][-1]
+    assert schedule['boxes']['Box2']['first_s'] <= schedule['boxes']['Box1']['first_s']
+
+
+def test_distributed_workers_commit_each_card_once(tmp_path, monkeypatch):
+    skus = [f'Box1-SP_{index:04d}' for index in range(1, 9)]
+    config = {'provider': 'GPT-5 Vision', 'lease_s': 30, 'lease_poll_s': 0.05}
+    _setup_job(tmp_path, monkeypatch, skus, config)
+    outroot = tmp_path / 'pipeline' / 'output'
+    calls = []
+
+    def fake_card(front, back, hints):
+        calls.append(hints['sku'])
+        time.sleep(0.02)
+        return {'sku': hints['sku'], 'cat': 'sports', 'set': 'Chrome', 'year': 2020, 'num': '1', 'conf': 0.9}
+
+    monkeypatch.setattr(postprocess, 'run_gpt5', fake_card)
+    # A dead worker left a lease behind long ago; it must be reclaimed.
+    claims = outroot / 'batch_test' / 'leases' / 'claims'
+    claims.mkdir(parents=True)
+    stale = claims / f'{skus[3]}.lease'
+    stale.write_text('ghost', encoding='utf-8')
+    os.utime(stale, (time.time() - 3600, time.time() - 3600))
+
+    def work(name):
+        postprocess.process_batches(
+            ['batch_test'],
+            ready=str(tmp_path / 'Scans_Ready'),
+            batches=str(tmp_path / 'pipeline' / 'output' / 'batches'),
+            outroot=str(outroot),
+            worker=name,
+        )
+
+    threads = [threading.Thread(target=work, args=(f'w{index}',)) for index in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    result_root = outroot / 'batch_test' / 'results'
+    assert sorted(path.stem for path in (result_root / 'json').iterdir()) == skus
+    with (result_root / 'csv' / 'batch.csv').open(newline='', encoding='utf-8') as handle:
+        assert [row['sku'] for row in csv.DictReader(handle)] == skus
+    events = [
+        json.loads(line)
+        for line in (tmp_path / 'pipeline' / 'logs' / 'pipeline.jsonl').read_text(encoding='utf-8').splitlines()
+    ]
+    committed = [event['sku'] for event in events if event.get('status') == 'ok']
+    assert sorted(committed) == skus
+    assert len([event for event in events if event.get('status') == 'finalized']) == 1
+    summaries = [event for event in events if event.get('status') == 'summary']
+    assert sum(summary['processed'] for summary in summaries) == len(skus)
+    assert sum(summary['worker']['stolen'] for summary in summaries) == 1
+    assert postprocess.pending_jobs(str(outroot / 'batches'), str(outroot), unfinished=True) == []
+
+    replayed = Path(postprocess.replay_batch('batch_test', outroot=str(outroot), workers=1))
+    assert sorted(path.stem for path in (replayed / 'json').iterdir()) == skus
+
+
+def _setup_stream(tmp_path, monkeypatch, skus, config):
+    monkeypatch.chdir(tmp_path)
+    for sku in skus:
+        _make_image(tmp_path / 'Scans_Inbox' / f'{sku}_F.jpg')
+        _make_image(tmp_path / 'Scans_Inbox' / f'{sku}_B.jpg')
+    config_path = tmp_path / 'pipeline' / 'config' / 'model.json'
+    config_path.parent.mkdir(parents=True)
+    config_path.write_text(json.dumps(dict({'stream_poll_s': 0.02}, **config)), encoding='utf-8')
+    monkeypatch.setattr(postprocess, 'CONFIG_PATH', config_path)
+    monkeypatch.setattr(postprocess, 'TMP_DIR', tmp_path / 'pipeline' / 'tmp')
+
+    def run(**kwargs):
+        return Path(
+            stream.run_stream(
+                inbox=str(tmp_path / 'Scans_Inbox'),
+                ready=str(tmp_path / 'Scans_Ready'),
+                error=str(tmp_path / 'Scans_Error'),
+                batches=str(tmp_path / 'pipeline' / 'output' / 'batches'),
+                outroot=str(tmp_path / 'pipeline' / 'output'),
+                **kwargs,
+            )
+        )
+
+    return run
+
+
+def _stream_summary(tmp_path):
+    lines = (tmp_path / 'pipeline' / 'logs' / 'pipeline.jsonl').read_text(encoding='utf-8').splitlines()
+    events = [json.loads(line) for line in lines]
+    return [event for event in events if event['step'] == 'stream' and event.get('status') == 'summary'][-1]
+
+
+def test_stream_pairs_queues_and_posts_inbox_cards(tmp_path, monkeypatch):
+    skus = ['Box1-SP_0001', 'Box1-SP_0002', 'Box2-BD_0001']
+    run = _setup_stream(tmp_path, monkeypatch, skus, {'provider': 'Mock'})
+
+    result_root = run(idle_exit=0.3)
+
+    assert sorted(path.stem for path in (result_root / 'json').iterdir()) == skus
+    with (result_root / 'csv' / 'batch.csv').open(newline='', encoding='utf-8') as handle:
+        assert sorted(row['sku'] for row in csv.DictReader(handle)) == skus
+    job_id = result_root.parent.name
+    assert job_id.startswith('stream_')
+    batch_file = tmp_path / 'pipeline' / 'output' / 'batches' / f'{job_id}.jsonl'
+    lines = [json.loads(line) for line in batch_file.read_text(encoding='utf-8').splitlines()]
+    assert sorted(line['sku'] for line in lines) == skus
+    summary = _stream_summary(tmp_path)
+    assert summary['paired'] == summary['processed'] == 3
+    assert summary['max_latency_s'] >= summary['p50_latency_s'] > 0
+
+    # The inbox keeps its originals; an unchanged pair already in Scans_Ready is not re-sent.
+    again = run(idle_exit=0.2)
+    assert not (again / 'json').exists()
+    assert _stream_summary(tmp_path)['paired'] == 0
+
+
+def test_stream_backpressure_holds_pairs_in_inbox(tmp_path, monkeypatch):
+    skus = [f'Box1-SP_{index:04d}' for index in range(1, 7)]
+    run = _setup_stream(tmp_path, monkeypatch, skus, {'provider': 'GPT-5 Vision', 'stream_queue': 1})
+
+    def slow_card(front, back, hints):
+        time.sleep(0.05)
+        sku = Path(front).name.rsplit('_', 1)[0]
+        return {'sku': sku, 'cat': 'sports', 'year': 2020, 'set': 'Topps', 'num': '1', 'conf': 0.9}
+
+    monkeypatch.setattr(postprocess, 'run_gpt5', slow_card)
+
+    result_root = run(idle_exit=0.3, max_cards=5)
+
+    summary = _stream_summary(tmp_path)
+    assert summary['paired'] == summary['processed'] == 5
+    assert summary['ingest_waits'] > 0
+    assert len(list((result_root / 'json').iterdir())) == 5
+
+
+def test_post_streams_batch_file_and_reports_byte_progress(tmp_path, monkeypatch):
+    skus = [f'Box1-SP_{index:04d}' for index in range(1, 5)]
+    run = _setup_job(tmp_path, monkeypatch, skus, {'provider': 'Mock', 'progress_interval_s': 0.0})
+    batch_file = tmp_path / 'pipeline' / 'output' / 'batches' / 'batch_test.jsonl'
+
+    result_root = run()
+
+    assert sorted(path.stem for path in (result_root / 'json').iterdir()) == skus
+    events = [
+        json.loads(line)
+        for line in (tmp_path / 'pipeline' / 'logs' / 'pipeline.jsonl').read_text(encoding='utf-8').splitlines()
+    ]
+    progress = [event for event in events if event.get('status') == 'progress']
+    assert [event['cards'] for event in progress] == [1, 2, 3, 4]
+    done = [event['bytes_done'] for event in progress]
+    assert done == sorted(done) and done[-1] == batch_file.stat().st_size
+    assert progress[-1]['pct'] == 100.0 and progress[-1]['eta_s'] == 0.0
+
+
+def _run_stream_bounded(run, **kwargs):
+    outcome = {}
+    thread = threading.Thread(target=lambda: outcome.setdefault('root', run(**kwargs)), daemon=True)
+    thread.start()
+    thread.join(timeout=20)
+    assert not thread.is_alive(), 'stream run did not finish'
+    return outcome['root']
+
+
+def test_stream_moves_unreadable_scan_to_error_and_finishes(tmp_path, monkeypatch):
+    skus = ['Box1-SP_0001', 'Box1-SP_0002']
+    run = _setup_stream(tmp_path, monkeypatch, skus, {'provider': 'Mock'})
+    (tmp_path / 'Scans_Inbox' / 'Box1-SP_0001_F.jpg').write_bytes(b'not an image')
+
+    result_root = _run_stream_bounded(run, idle_exit=0.3)
+
+    assert [path.stem for path in (result_root / 'json').iterdir()] == ['Box1-SP_0002']
+    error_dir = tmp_path / 'Scans_Error' / 'Box1-SP_0001'
+    assert (error_dir / 'error.txt').read_text(encoding='utf-8').startswith('Post failed:')
+    assert not (tmp_path / 'Scans_Ready' / 'Box1-SP_0001').exists()
+    summary = _stream_summary(tmp_path)
+    assert summary['processed'] == 1 and summary['failed'] == 1
+
+    # The inbox original matches the copy in Scans_Error, so it is not retried.
+    _run_stream_bounded(run, idle_exit=0.2)
+    assert _stream_summary(tmp_path)['paired'] == 0
+
+
+def test_stream_prepare_error_fails_only_that_sku(tmp_path, monkeypatch):
+    skus = ['Box1-SP_0001', 'Box1-SP_0002']
+    run = _setup_stream(tmp_path, monkeypatch, skus, {'provider': 'Mock'})
+    (tmp_path / 'Scans_Inbox' / 'Box1-SP_0002_B.jpg').write_bytes(b'not an image')
+
+    result_root = _run_stream_bounded(run, idle_exit=0.3, prepare_derivatives=True)
+
+    assert [path.stem for path in (result_root / 'json').iterdir()] == ['Box1-SP_0001']
+    error_dir = tmp_path / 'Scans_Error' / 'Box1-SP_0002'
+    assert (error_dir / 'error.txt').read_text(encoding='utf-8').startswith('Prepare failed:')
+    assert _stream_summary(tmp_path)['paired'] == 1
+
+
+def test_finalizing_worker_restores_outputs_of_a_crashed_commit(tmp_path, monkeypatch):
+    skus = ['Box1-SP_0001', 'Box1-SP_0002']
+    _setup_job(tmp_path, monkeypatch, skus, {'provider': 'Mock'})
+    outroot = tmp_path / 'pipeline' / 'output'
+    # A worker committed the first card and died before writing its files.
+    record = {'sku': skus[0], 'cat': 'sports', 'set': 'Chrome', 'year': 2020, 'num': '7', 'conf': 0.9}
+    LeaseStore(outroot / 'batch_test' / 'leases', 'ghost').commit(skus[0], {'record': record, 'needs_review': False})
+
+    result_root = Path(
+        postprocess.process_batches(
+            ['batch_test'],
+            ready=str(tmp_path / 'Scans_Ready'),
+            batches=str(outroot / 'batches'),
+            outroot=str(outroot),
+            worker='w1',
+        )[0]
+    )
+
+    assert json.loads((result_root / 'json' / f'{skus[0]}.json').read_text(encoding='utf-8'))['num'] == '7'
+    assert (result_root / 'txt' / f'{skus[0]}.txt').exists()
+    with (result_root / 'csv' / 'batch.csv').open(newline='', encoding='utf-8') as handle:
+        assert [row['sku'] for row in csv.DictReader(handle)] == skus
+
+
+def test_tiers_and_retry_share_one_deadline_per_card(tmp_path, monkeypatch):
+    sku = 'Box1-SP_0003'
+    config = {'provider': 'GPT-5 Vision', 'image_tiers': [16, 32], 'retry_mode': 'targeted', 'per_item_timeout': 30}
+    run = _setup_job(tmp_path, monkeypatch, [sku], config)
+    deadlines = []
+
+    def fake_card(front, back, hints):
+        deadlines.append(hints['deadline'])
+        time.sleep(0.01)
+        return {'sku': sku, 'cat': 'sports', 'set': 'Topps Chrome', 'conf': 0.9}
+
+    def fake_fields(image, hints, fields):
+        deadlines.append(hints['deadline'])
+        return {'year': 2019, 'num': '150', 'conf': 0.88}
+
+    monkeypatch.setattr(postprocess, 'run_gpt5', fake_card)
+    monkeypatch.setattr(postprocess, 'run_gpt5_fields', fake_fields)
+
+    run()
+
+    assert len(deadlines) == 3
+    assert len(set(deadlines)) == 1
+
+
+def test_hedged_timeout_is_logged_as_timeout(tmp_path, monkeypatch):
+    sku = 'Box1-SP_0004'
+    config = {'provider': 'GPT-5 Vision', 'hedge_percentile': 95, 'per_item_timeout': 1}
+    run = _setup_job(tmp_path, monkeypatch, [sku], config)
+
+    def stuck_card(front, back, hints):
+        hints['cancel'].wait(5)
+        return {}
+
+    monkeypatch.setattr(postprocess, 'run_gpt5', stuck_card)
+
+    run()
+
+    events = [
+        json.loads(line)
+        for line in (tmp_path / 'pipeline' / 'logs' / 'pipeline.jsonl').read_text(encoding='utf-8').splitlines()
+    ]
+    assert [event['status'] for event in events if event.get('sku') == sku][0] == 'timeout'
@@ -0,0 +1,176 @@
+import json
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from PIL import Image
+
+from pipeline import postprocess
+from pipeline.models import provider_gpt5_vision as provider
+
+
+class _FakeResponses:
+    def __init__(self):
+        self.requests = []
+
+    def create(self, **request):
+        self.requests.append(request)
+        text = json.dumps({'sku': 'Box1-SP_0001', 'cat': 'sports', 'conf': 0.9})
+        return SimpleNamespace(output=[{'content': [{'type': 'output_text', 'text': text}]}], usage=None)
+
+
+def test_prepared_payload_encodes_each_image_once(tmp_path, monkeypatch):
+    front, back = tmp_path / 'front.webp', tmp_path / 'back.webp'
+    for path in (front, back):
+        Image.new('RGB', (16, 16), 'white').save(path, format='WEBP')
+    responses = _FakeResponses()
+    monkeypatch.setattr(provider, '_make_client', lambda: SimpleNamespace(responses=responses))
+    encoded = []
+    real_encode = provider._encode_image
+    monkeypatch.setattr(provider, '_encode_image', lambda path: encoded.append(path) or real_encode(path))
+
+    prepared = provider.PreparedPayload()
+    hints = {'sku': 'Box1-SP_0001', 'capsule': {'likely_cat': 'sports'}, 'rules': 'Return JSON.', 'prepared': prepared}
+    provider.analyze_card(str(front), str(back), hints)
+    provider.analyze_card(str(front), str(back), dict(hints, nudge='Check the year.'))
+    provider.analyze_fields(str(back), dict(hints, known={'cat': 'sports'}), ['year'])
+
+    assert encoded == [str(front), str(back)]
+    first, nudged = responses.requests[0]['input'][1]['content'], responses.requests[1]['input'][1]['content']
+    assert first[-1] is nudged[-1]
+    assert any(part.get('text', '').startswith('Nudge:') for part in nudged)
+    assert not any(part.get('text', '').startswith('Nudge:') for part in first)
+
+    prepared.release()
+    provider.analyze_card(str(front), str(back), hints)
+    assert len(encoded) == 4
+
+
+class _Flaky(Exception):
+    pass
+
+
+class _FailingResponses:
+    def __init__(self):
+        self.timeouts = []
+
+    def create(self, **request):
+        self.timeouts.append(request['timeout'])
+        raise _Flaky('rate limited')
+
+
+def test_deadline_caps_http_timeout_and_skips_backoff_past_it(monkeypatch):
+    monkeypatch.setattr(provider, 'RateLimitError', _Flaky)
+    responses = _FailingResponses()
+    started = time.monotonic()
+
+    with pytest.raises(_Flaky):
+        provider._send_with_retries(
+            SimpleNamespace(responses=responses), {'timeout': 45}, deadline=time.monotonic() + 0.5
+        )
+
+    assert len(responses.timeouts) == 1
+    assert responses.timeouts[0] <= 0.5
+    assert time.monotonic() - started < 0.5
+
+
+def test_cancel_interrupts_backoff(monkeypatch):
+    monkeypatch.setattr(provider, 'RateLimitError', _Flaky)
+    responses = _FailingResponses()
+    cancel = threading.Event()
+    threading.Timer(0.05, cancel.set).start()
+    started = time.monotonic()
+
+    with pytest.raises(provider.DeadlineExceeded):
+        provider._send_with_retries(
+            SimpleNamespace(responses=responses), {'timeout': 45}, deadline=time.monotonic() + 30, cancel=cancel
+        )
+
+    assert len(responses.timeouts) == 1
+    assert time.monotonic() - started < 0.5
+
+
+def test_timed_out_call_is_cancelled(monkeypatch):
+    seen = {}
+
+    def slow_card(front, back, hints):
+        seen['cancel'] = hints['cancel']
+        seen['budget'] = hints['deadline'] - time.monotonic()
+        hints['cancel'].wait(5)
+        return {}
+
+    monkeypatch.setattr(postprocess, 'run_gpt5', slow_card)
+
+    with pytest.raises(TimeoutError):
+        postprocess._call_provider(Path('front.webp'), None, {'sku': 'Box1-SP_0001'}, time.monotonic() + 0.1)
+
+    assert seen['cancel'].wait(1)
+    assert seen['budget'] <= 0.1
+
+
+class _FakeStream:
+    def __init__(self, deltas):
+        self.events = [{'type': 'response.created'}]
+        self.events += [{'type': 'response.output_text.delta', 'delta': delta} for delta in deltas]
+        self.events.append({'type': 'response.completed', 'response': {'usage': {'input_tokens': 5, 'output_tokens': 7}}})
+        self.consumed = 0
+        self.closed = False
+
+    def __iter__(self):
+        for event in self.events:
+            self.consumed += 1
+            yield event
+
+    def close(self):
+        self.closed = True
+
+
+class _StreamingResponses:
+    def __init__(self, streams):
+        self.streams = list(streams)
+        self.opened = []
+
+    def create(self, **request):
+        assert request['stream'] is True
+        stream = self.streams.pop(0)
+        self.opened.append(stream)
+        return stream
+
+
+def test_streaming_aborts_bad_output_early_and_retries(tmp_path, monkeypatch):
+    front = tmp_path / 'front.webp'
+    Image.new('RGB', (16, 16), 'white').save(front, format='WEBP')
+    good = json.dumps({'sku': 'Box1-SP_0001', 'cat': 'sports', 'conf': 0.9})
+    bad = _FakeStream(['Here is ', 'the card: ', good])
+    responses = _StreamingResponses([bad, _FakeStream([good[:10], good[10:]])])
+    monkeypatch.setattr(provider, '_make_client', lambda: SimpleNamespace(responses=responses))
+
+    data = provider.analyze_card(str(front), None, {'sku': 'Box1-SP_0001', 'rules': 'Return JSON.', 'stream': True})
+
+    assert bad.closed and bad.consumed == 2
+    assert data['cat'] == 'sports'
+    assert data[provider.USAGE_KEY] == {'input_tokens': 5, 'output_tokens': 7}
+    timing = data[provider.TIMING_KEY]
+    assert timing['aborted'] == 1
+    assert timing['ttft_s'] >= 0 and timing['generation_s'] >= 0
+
+
+def test_compact_output_requests_strict_schema_and_expands(tmp_path, monkeypatch):
+    front = tmp_path / 'front.webp'
+    Image.new('RGB', (16, 16), 'white').save(front, format='WEBP')
+    requests = []
+
+    class CompactResponses:
+        def create(self, **request):
+            requests.append(request)
+            text = json.dumps({'c': 'S', 's': 'Topps', 'y': 2021, 'n': '5', 'a': None, 'cd': None, 'cf': 0.9})
+            return SimpleNamespace(output=[{'content': [{'type': 'output_text', 'text': text}]}], usage=None)
+
+    monkeypatch.setattr(provider, '_make_client', lambda: SimpleNamespace(responses=CompactResponses()))
+
+    data = provider.analyze_card(str(front), None, {'sku': 'Box1-SP_0009', 'rules': 'Return JSON.', 'compact': True})
+
+    assert requests[0]['text']['format']['strict'] is True
+    assert data == {'sku': 'Box1-SP_0009', 'cat': 'sports', 'set': 'Topps', 'year': 2021, 'num': '5', 'conf': 0.9}
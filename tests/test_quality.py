@@ -0,0 +1,49 @@
+import random
+
+from PIL import Image, ImageDraw, ImageFilter
+
+from pipeline.utils import quality
+
+
+def _scan(card_box=(40, 40, 360, 480), size=(400, 520), seed=1):
+    rng = random.Random(seed)
+    img = Image.new('RGB', size, (235, 235, 235))
+    card = Image.new('RGB', (card_box[2] - card_box[0], card_box[3] - card_box[1]), (200, 60, 40))
+    draw = ImageDraw.Draw(card)
+    for _ in range(40):
+        x, y = rng.randint(0, card.width), rng.randint(0, card.height)
+        draw.rectangle([x, y, x + 30, y + 12], fill=tuple(rng.randint(0, 255) for _ in range(3)))
+    img.paste(card, card_box[:2])
+    return img
+
+
+def test_good_scan_passes():
+    scores = quality.score_image(_scan())
+    assert quality.rejection_reason(scores, {}) is None
+    assert 0.6 < scores['coverage'] < 0.75
+
+
+def test_blurry_scan_is_rejected():
+    blurred = _scan().filter(ImageFilter.GaussianBlur(6))
+    reason = quality.rejection_reason(quality.score_image(blurred), {})
+    assert reason is not None and reason.startswith('blurry')
+
+
+def test_overexposed_scan_is_rejected():
+    blown = _scan().point(lambda value: min(255, value * 4))
+    reason = quality.rejection_reason(quality.score_image(blown), {})
+    assert reason is not None and 'exposed' in reason
+
+
+def test_small_card_on_bed_is_rejected():
+    scan = _scan(card_box=(150, 200, 230, 300), size=(400, 520))
+    reason = quality.rejection_reason(quality.score_image(scan), {})
+    assert reason is not None and reason.startswith('mis-cropped')
+
+
+def test_card_bbox_finds_card():
+    box = quality.card_bbox(quality.gray_array(_scan(), max_edge=1024))
+    assert box is not None
+    left, top, right, bottom = box
+    assert abs(left - 40) <= 2 and abs(top - 40) <= 2
+    assert abs(right - 360) <= 2 and abs(bottom - 480) <= 2
@@ -0,0 +1,52 @@
+from pipeline.scheduler import FairScheduler, box_of
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _drain(scheduler, clock=None, step=0.0):
+    order = []
+    while True:
+        item = scheduler.next()
+        if item is None:
+            return order
+        order.append(item)
+        if clock is not None:
+            clock.now += step
+
+
+def test_priority_box_goes_first_and_equal_boxes_share():
+    scheduler = FairScheduler({'Box9': 3})
+    for index in range(3):
+        scheduler.submit('Box1', f'a{index}')
+        scheduler.submit('Box2', f'b{index}')
+    scheduler.submit('Box9', 'rush0')
+    scheduler.submit('Box9', 'rush1')
+
+    assert _drain(scheduler) == ['rush0', 'rush1', 'a0', 'b0', 'a1', 'b1', 'a2', 'b2']
+    summary = scheduler.summary()
+    assert summary['Box9']['priority'] == 3
+    assert summary['Box1']['items'] == 3
+
+
+def test_aging_prevents_starvation():
+    clock = _Clock()
+    scheduler = FairScheduler({'Box9': 2}, aging_s=10, clock=clock)
+    for index in range(20):
+        scheduler.submit('Box9', f'rush{index}')
+    scheduler.submit('Box1', 'low')
+
+    order = _drain(scheduler, clock, step=4.0)
+    # Box1 reaches Box9's level after 2 * aging_s of waiting, long before the rush box drains.
+    assert order.index('low') == 5
+    assert scheduler.level('Box1') == 0
+
+
+def test_box_of_falls_back_for_unparsed_skus():
+    assert box_of('Box12-SP_0001') == 'Box12'
+    assert box_of('loose-scan') == ''
@@ -0,0 +1,66 @@
+from pathlib import Path
+
+from pipeline.utils.vocab import TrigramIndex, Vocabulary, load_vocabulary
+
+SETS = {
+    'Fleer Ultra': ['Ultra'],
+    'Upper Deck Marvel': [],
+    'Topps Series 1': [],
+    'Topps Series 2': [],
+    'Evolving Skies': [],
+}
+
+
+def test_lookup_snaps_near_misses_and_abbreviations():
+    index = TrigramIndex(SETS, {'UD': 'Upper Deck'})
+
+    assert index.lookup('Fleer Ultr').name == 'Fleer Ultra'
+    assert index.lookup('fleer  ULTRA!') == ('Fleer Ultra', 1.0, False)
+    assert index.lookup('UD Marvel') == ('Upper Deck Marvel', 1.0, False)
+    assert index.lookup('Evolving Skys').ambiguous is False
+    assert index.lookup('Topps Series').ambiguous is True
+    assert index.lookup('Something Else Entirely') is None
+
+
+def test_snap_lowers_confidence_only_for_ambiguous_matches():
+    vocabulary = Vocabulary({'abbreviations': {'UD': 'Upper Deck'}, 'set': SETS, 'brand': {'Upper Deck': []}})
+
+    clear = {'set': 'Fleer Ultr', 'brand': 'UD', 'conf': 0.9}
+    changes = vocabulary.snap(clear)
+    assert clear == {'set': 'Fleer Ultra', 'brand': 'Upper Deck', 'conf': 0.9}
+    assert [change['field'] for change in changes] == ['set', 'brand']
+
+    ambiguous = {'set': 'Topps Series', 'conf': 0.9}
+    vocabulary.snap(ambiguous, penalty=0.2)
+    assert ambiguous['set'].startswith('Topps Series ')
+    assert ambiguous['conf'] == 0.7
+
+    canonical = {'set': 'Fleer Ultra', 'conf': 0.9}
+    assert vocabulary.snap(canonical) == []
+
+
+def test_shipped_vocabulary_loads(tmp_path):
+    vocabulary = load_vocabulary(Path(__file__).resolve().parents[1] / 'pipeline' / 'config' / 'vocab.json')
+    assert vocabulary is not None
+    assert {'set', 'brand', 'variant'} <= set(vocabulary.fields)
+    assert load_vocabulary(tmp_path / 'missing.json') is None
+
+
+def test_short_values_do_not_snap_to_longer_names_or_other_categories():
+    vocabulary = load_vocabulary(Path(__file__).resolve().parents[1] / 'pipeline' / 'config' / 'vocab.json')
+
+    silver = {'cat': 'sports', 'variant': 'Silver', 'conf': 0.9}
+    assert vocabulary.snap(silver) == []
+    assert silver['variant'] == 'Silver'
+
+    base = {'cat': 'sports', 'set': 'Base', 'conf': 0.9}
+    assert vocabulary.snap(base) == []
+    assert base['set'] == 'Base'
+
+    sports_typo = {'cat': 'sports', 'set': 'Base Sett', 'conf': 0.9}
+    assert vocabulary.snap(sports_typo) == []
+
+    pokemon = {'cat': 'pokemon', 'set': 'Base Sett', 'variant': 'Reverse Holo', 'conf': 0.9}
+    vocabulary.snap(pokemon)
+    assert pokemon['set'] == 'Base Set'
+    assert vocabulary.fields['set'].lookup('Topps Chrom', category='sports').name == 'Topps Chrome'